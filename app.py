@@ -49,6 +49,55 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def render_query_monitor():
+    """사이드바에 쿼리 지문별 지연 시간 요약과 캐시 통계 표시"""
+    from modules.database import get_query_cache
+    from modules.query_log import get_query_log
+    from modules.sql_cache import get_sql_cache
+    
+    query_log = get_query_log()
+    
+    with st.sidebar.expander("🛠️ 쿼리 성능 모니터"):
+        summary = query_log.summary()
+        
+        if summary.empty:
+            st.caption("아직 기록된 쿼리가 없습니다.")
+        else:
+            st.caption(f"최근 {len(query_log.records()):,}건 기준 (캐시 적중 제외)")
+            st.dataframe(
+                summary[['origin', 'count', 'p50_ms', 'p95_ms', 'max_ms', 'sql']].round(1),
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        cache_stats = get_query_cache("data/spotify.db").stats()
+        st.caption(
+            f"결과 캐시: 적중률 {cache_stats['hit_rate']:.0%} · "
+            f"{cache_stats['entries']}개 · {cache_stats['bytes'] / (1024 * 1024):.1f} MB"
+        )
+        sql_stats = get_sql_cache().stats()
+        st.caption(
+            f"SQL 생성 캐시: 적중률 {sql_stats['hit_rate']:.0%} "
+            f"(유사 질문 {sql_stats['similar_hits']:,}회 포함) · "
+            f"{sql_stats['entries']}개 · 절약 {sql_stats['saved_seconds']:.1f}초 "
+            f"(누적 적중 {sql_stats['total_hits']:,}회)"
+        )
+        if 'llm' in st.session_state:
+            generation_stats = st.session_state.llm.generation_stats()
+            if generation_stats['count']:
+                def seconds(value):
+                    return "-" if value is None else f"{value / 1000:.2f}초"
+                
+                st.caption(
+                    f"AI 분석 생성: 첫 응답 p50 {seconds(generation_stats['ttft_p50_ms'])} · "
+                    f"전체 p50 {seconds(generation_stats['total_p50_ms'])} · "
+                    f"p95 {seconds(generation_stats['total_p95_ms'])} "
+                    f"({generation_stats['count']:,}회)"
+                )
+        st.caption(f"느린 쿼리 로그: `{query_log.slow_log_path}` "
+                   f"({query_log.slow_threshold * 1000:.0f}ms 이상)")
+
+
 # 메인 페이지
 def main():
     # 헤더
@@ -156,7 +205,7 @@ def main():
     try:
         from modules.database import DatabaseManager
         
-        db = DatabaseManager(str(db_path))
+        db = DatabaseManager(str(db_path), origin="home")
         info = db.get_database_info()
         
         col1, col2, col3, col4 = st.columns(4)
@@ -182,6 +231,9 @@ def main():
     except Exception as e:
         st.error(f"데이터베이스 정보 로드 실패: {e}")
     
+    # 쿼리 성능 모니터 (사이드바)
+    render_query_monitor()
+    
     st.markdown("---")
     
     # 푸터
@@ -0,0 +1,249 @@
+"""
+선언형 데이터 정제 규칙 모듈
+"""
+import json
+import os
+import time
+from typing import Optional, List, Dict, Any
+
+import numpy as np
+import pandas as pd
+
+
+# 기본 정제 규칙 (규칙 파일을 지정하지 않으면 사용)
+# not_null: 값이 있어야 함 / range: min 이상 max 이하 (값이 없으면 실패) / allowed: values 중 하나
+DEFAULT_RULES = [
+    {'name': 'track_name_required', 'type': 'not_null', 'column': 'track_name'},
+    {'name': 'artists_required', 'type': 'not_null', 'column': 'artists'},
+    {'name': 'popularity_range', 'type': 'range', 'column': 'popularity', 'min': 0, 'max': 100},
+    {'name': 'danceability_range', 'type': 'range', 'column': 'danceability', 'min': 0, 'max': 1},
+    {'name': 'energy_range', 'type': 'range', 'column': 'energy', 'min': 0, 'max': 1},
+    {'name': 'speechiness_range', 'type': 'range', 'column': 'speechiness', 'min': 0, 'max': 1},
+    {'name': 'acousticness_range', 'type': 'range', 'column': 'acousticness', 'min': 0, 'max': 1},
+    {'name': 'instrumentalness_range', 'type': 'range', 'column': 'instrumentalness',
+     'min': 0, 'max': 1},
+    {'name': 'liveness_range', 'type': 'range', 'column': 'liveness', 'min': 0, 'max': 1},
+    {'name': 'valence_range', 'type': 'range', 'column': 'valence', 'min': 0, 'max': 1},
+]
+
+RULE_TYPES = ('not_null', 'range', 'allowed')
+
+# 실패 규칙을 비트 하나씩으로 기록하므로 규칙 수는 64개까지
+MAX_RULES = 64
+
+# 제외된 행 파일에서 실패한 규칙 이름을 담는 컬럼 (여러 개면 '|'로 구분)
+REJECTED_RULES_COLUMN = 'rejected_rules'
+REJECTED_SUFFIX = '.rejected.csv'
+
+
+def rejected_path(output_path: str) -> str:
+    """정제 결과 파일 경로에 대응하는 제외 행 파일 경로"""
+    root, _ = os.path.splitext(output_path)
+    return root + REJECTED_SUFFIX
+
+
+class CleaningRule:
+    """
+    컬럼 하나에 대한 정제 규칙
+
+    Attributes:
+        name: 규칙 이름 (보고서와 제외 행 파일에 표시)
+        rule_type: 규칙 종류 (RULE_TYPES 중 하나)
+        column: 검사할 컬럼
+        min: range 규칙의 하한 (None이면 제한 없음)
+        max: range 규칙의 상한 (None이면 제한 없음)
+        values: allowed 규칙의 허용 값 목록
+    """
+
+    def __init__(self, name: str, rule_type: str, column: str,
+                 min: Optional[float] = None, max: Optional[float] = None,
+                 values: Optional[List[Any]] = None):
+        if rule_type not in RULE_TYPES:
+            raise Exception(f"알 수 없는 규칙 종류입니다: {rule_type} ({name})")
+        if rule_type == 'range' and min is None and max is None:
+            raise Exception(f"range 규칙에는 min 또는 max가 필요합니다: {name}")
+        if rule_type == 'allowed' and not values:
+            raise Exception(f"allowed 규칙에는 values가 필요합니다: {name}")
+        self.name = name
+        self.rule_type = rule_type
+        self.column = column
+        self.min = min
+        self.max = max
+        self.values = list(values) if values else None
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> 'CleaningRule':
+        """규칙 설정 딕셔너리에서 생성"""
+        try:
+            return cls(config['name'], config['type'], config['column'],
+                       config.get('min'), config.get('max'), config.get('values'))
+        except KeyError as e:
+            raise Exception(f"규칙 설정에 {e} 항목이 없습니다: {config}")
+
+    def describe(self) -> str:
+        """사람이 읽을 조건 설명"""
+        if self.rule_type == 'not_null':
+            return f"{self.column} 값 필수"
+        if self.rule_type == 'range':
+            low = '' if self.min is None else self.min
+            high = '' if self.max is None else self.max
+            return f"{self.column} {low}~{high}"
+        return f"{self.column} ∈ {{{', '.join(map(str, self.values))}}}"
+
+    def failures(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """
+        규칙을 만족하지 않는 행 마스크
+
+        Args:
+            df: 검사할 데이터프레임
+
+        Returns:
+            실패 행 bool 배열 (컬럼이 없어 적용할 수 없으면 None)
+        """
+        if self.column not in df.columns:
+            if self.rule_type == 'not_null':
+                raise Exception(f"필수 컬럼이 없습니다: {self.column}")
+            return None
+
+        series = df[self.column]
+        if self.rule_type == 'not_null':
+            return series.isna().to_numpy()
+        if self.rule_type == 'allowed':
+            return ~series.isin(self.values).to_numpy(bool)
+
+        # 값이 없으면 비교 결과가 False가 되도록 NaN 실수 배열로 비교
+        values = series.to_numpy(np.float64, na_value=np.nan)
+        passed = ~np.isnan(values)
+        if self.min is not None:
+            passed &= values >= self.min
+        if self.max is not None:
+            passed &= values <= self.max
+        return ~passed
+
+
+class RuleSet:
+    """
+    정제 규칙 묶음
+
+    모든 규칙의 실패 여부를 행마다 비트 하나씩 모은 비트마스크로 한 번에 계산하므로
+    규칙을 늘려도 데이터프레임 필터링과 복사는 한 번뿐입니다. 청크 단위로 여러 번
+    평가하면 규칙별 실패 행 수와 소요 시간이 누적됩니다.
+    """
+
+    def __init__(self, rules: List[CleaningRule]):
+        """
+        Args:
+            rules: 정제 규칙 목록 (비트 순서 = 목록 순서)
+        """
+        if len(rules) > MAX_RULES:
+            raise Exception(f"규칙은 최대 {MAX_RULES}개까지 지정할 수 있습니다: {len(rules)}개")
+        names = [rule.name for rule in rules]
+        duplicated = sorted({name for name in names if names.count(name) > 1})
+        if duplicated:
+            raise Exception(f"규칙 이름이 중복됩니다: {', '.join(duplicated)}")
+        self.rules = list(rules)
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config: List[Dict[str, Any]]) -> 'RuleSet':
+        """규칙 설정 딕셔너리 목록에서 생성"""
+        return cls([CleaningRule.from_dict(item) for item in config])
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'RuleSet':
+        """
+        규칙 파일(JSON 목록)에서 생성
+
+        Args:
+            path: 규칙 JSON 파일 경로 (None이면 DEFAULT_RULES)
+
+        Returns:
+            RuleSet 인스턴스
+        """
+        if path is None:
+            return cls.from_config(DEFAULT_RULES)
+        with open(path, encoding='utf-8') as f:
+            return cls.from_config(json.load(f))
+
+    @property
+    def required_columns(self) -> List[str]:
+        """not_null 규칙이 걸린 컬럼 (결측치 대체 대상에서 제외)"""
+        return [rule.column for rule in self.rules if rule.rule_type == 'not_null']
+
+    def reset(self):
+        """누적 통계 초기화"""
+        self.rows = 0
+        self.rejected = 0
+        self.failed = np.zeros(len(self.rules), dtype=np.int64)
+        self.seconds = np.zeros(len(self.rules), dtype=np.float64)
+
+    def required_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """not_null 규칙만 통과한 행 마스크 (결측치 대체용 통계 계산에 사용, 통계 누적 안 함)"""
+        columns = self.required_columns
+        if not columns:
+            return np.ones(len(df), dtype=bool)
+        return df[columns].notna().all(axis=1).to_numpy()
+
+    def evaluate(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        모든 규칙을 평가해 행별 실패 비트마스크 계산
+
+        Args:
+            df: 검사할 데이터프레임
+
+        Returns:
+            행별 uint64 비트마스크 (i번째 비트 = i번째 규칙 실패, 0이면 통과)
+        """
+        bits = np.zeros(len(df), dtype=np.uint64)
+        for i, rule in enumerate(self.rules):
+            start = time.perf_counter()
+            failures = rule.failures(df)
+            if failures is not None:
+                bits |= failures.astype(np.uint64) << np.uint64(i)
+                self.failed[i] += int(failures.sum())
+            self.seconds[i] += time.perf_counter() - start
+        self.rows += len(df)
+        self.rejected += int(np.count_nonzero(bits))
+        return bits
+
+    def rule_names(self, bits: np.ndarray) -> List[str]:
+        """비트마스크를 실패한 규칙 이름 문자열('|' 구분)로 변환"""
+        names = {}
+        result = []
+        for value in bits.tolist():
+            if value not in names:
+                names[value] = '|'.join(rule.name for i, rule in enumerate(self.rules)
+                                        if value >> i & 1)
+            result.append(names[value])
+        return result
+
+    def split(self, df: pd.DataFrame) -> tuple:
+        """
+        규칙을 평가해 통과 행과 제외 행으로 분리
+
+        Args:
+            df: 검사할 데이터프레임
+
+        Returns:
+            (통과 행 데이터프레임, REJECTED_RULES_COLUMN이 추가된 제외 행 데이터프레임)
+        """
+        bits = self.evaluate(df)
+        passed = bits == 0
+        rejected = df[~passed].copy()
+        rejected[REJECTED_RULES_COLUMN] = self.rule_names(bits[~passed])
+        return df[passed], rejected
+
+    def report(self) -> pd.DataFrame:
+        """규칙별 누적 실패 행 수와 소요 시간"""
+        return pd.DataFrame({
+            'rule': [rule.name for rule in self.rules],
+            'condition': [rule.describe() for rule in self.rules],
+            'failed': self.failed,
+            'ms': (self.seconds * 1000).round(2),
+        })
+
+    def print_report(self):
+        """규칙별 결과 출력"""
+        print(f"\n정제 규칙 {len(self.rules)}개 평가: {self.rows:,}행 중 {self.rejected:,}행 제외")
+        for row in self.report().itertuples():
+            print(f"  - {row.rule} ({row.condition}): {row.failed:,}행 실패, {row.ms:.2f}ms")
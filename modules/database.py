@@ -1,57 +1,1476 @@
 """
 데이터베이스 연결 및 쿼리 실행 모듈
 """
+import asyncio
+import functools
+import hashlib
+import re
 import sqlite3
+import sys
+import threading
+import time
+import numpy as np
 import pandas as pd
-from typing import Optional, List, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterator, Tuple, Union, TextIO
 import os
 
+from modules.query_log import QueryLog, get_query_log
+from modules.query_plan import QueryPlanCost, estimate_plan_cost, query_limit
+from modules.schema_linker import DEFAULT_SCHEMA_TOKEN_BUDGET, SchemaLinker
+
+
+# 읽기 전용 연결에 적용할 PRAGMA 설정
+READ_PRAGMAS = {
+    'cache_size': -65536,       # 연결당 페이지 캐시 64MB (음수 = KiB 단위)
+    'mmap_size': 268435456,     # 256MB 메모리 맵 I/O
+    'temp_store': 'MEMORY',     # 정렬/임시 B-tree를 메모리에서 처리
+    'query_only': 1,            # 쓰기 시도 차단
+}
+
+
+class _PooledConnection(sqlite3.Connection):
+    """연결을 열 당시의 DB 파일 식별 정보를 함께 보관하는 연결"""
+    file_identity: Optional[tuple] = None
+
+
+def file_identity(db_path: str) -> Optional[tuple]:
+    """DB 파일의 (장치, inode) 식별 정보 (파일이 없으면 None)"""
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+class ConnectionPool:
+    """
+    프로세스 전역 읽기 전용 SQLite 연결 풀
+
+    연결은 `mode=ro` URI로 열리며, 한 번에 하나의 스레드만 체크아웃한
+    연결을 사용합니다. 빌드 스크립트는 임시 파일에 DB를 만든 뒤 원자적
+    rename으로 교체하므로 앱은 재구축 중에도 이전 파일을 계속 읽을 수 있습니다.
+    파일이 교체되면(inode 변경) 이전 파일을 가리키는 연결은 반환 시점이나
+    다음 체크아웃 시점에 폐기됩니다.
+    """
+
+    def __init__(self, db_path: str, max_size: int = 8,
+                 idle_timeout: float = 300.0, health_check_interval: float = 30.0):
+        """
+        Args:
+            db_path: 데이터베이스 파일 경로
+            max_size: 동시에 열 수 있는 최대 연결 수
+            idle_timeout: 유휴 연결을 닫기까지의 시간 (초)
+            health_check_interval: 이 시간 이상 유휴였던 연결은 체크아웃 시 상태 확인 (초)
+        """
+        self.db_path = db_path
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+
+        self._uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        self._idle: List[tuple] = []  # (연결, 반환 시각)
+        self._in_use = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+
+    def _open(self, identity: Optional[tuple]) -> sqlite3.Connection:
+        """새 읽기 전용 연결 생성 및 PRAGMA 적용"""
+        conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False,
+                               factory=_PooledConnection)
+        conn.file_identity = identity
+        for name, value in READ_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        """연결 상태 확인"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _evict_idle(self, now: float, identity: Optional[tuple]) -> List[sqlite3.Connection]:
+        """
+        idle_timeout을 넘겼거나 교체 전 DB 파일을 가리키는 유휴 연결을 풀에서 분리
+        (잠금 상태에서 호출)
+        """
+        expired = []
+        keep = []
+        for conn, since in self._idle:
+            if now - since > self.idle_timeout or conn.file_identity != identity:
+                expired.append(conn)
+            else:
+                keep.append((conn, since))
+        self._idle = keep
+        return expired
+
+    def acquire(self, timeout: Optional[float] = 30.0) -> sqlite3.Connection:
+        """
+        풀에서 연결 체크아웃
+
+        Args:
+            timeout: 모든 연결이 사용 중일 때 기다릴 최대 시간 (초, None이면 무한 대기)
+
+        Returns:
+            읽기 전용 SQLite 연결
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        identity = file_identity(self.db_path)
+
+        with self._cond:
+            if self._closed:
+                raise Exception("연결 풀이 이미 종료되었습니다.")
+
+            stale = self._evict_idle(time.monotonic(), identity)
+
+            while not self._idle and self._in_use >= self.max_size:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise Exception(
+                        f"연결 풀 대기 시간 초과: {self.max_size}개 연결이 모두 사용 중입니다."
+                    )
+                self._cond.wait(remaining)
+
+            conn, since = self._idle.pop() if self._idle else (None, 0.0)
+            self._in_use += 1
+
+        for old in stale:
+            old.close()
+
+        try:
+            if conn is not None and time.monotonic() - since > self.health_check_interval:
+                if not self._is_healthy(conn):
+                    conn.close()
+                    conn = None
+            if conn is None:
+                conn = self._open(identity)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """
+        체크아웃한 연결을 풀에 반환
+
+        Args:
+            conn: acquire()로 얻은 연결
+        """
+        # 중단된 읽기 트랜잭션이 남아 있으면 정리
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+
+        replaced = getattr(conn, 'file_identity', None) != file_identity(self.db_path)
+
+        with self._cond:
+            self._in_use -= 1
+            if self._closed or replaced:
+                conn.close()
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = 30.0) -> Iterator[sqlite3.Connection]:
+        """with 문에서 사용할 수 있는 체크아웃/반환 컨텍스트"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """유휴 연결을 모두 닫고 풀 종료 (사용 중인 연결은 반환 시 닫힘)"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        """풀 상태 조회"""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+            }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_registry_lock = threading.Lock()
+
+
+def get_pool(db_path: str, **kwargs) -> ConnectionPool:
+    """
+    DB 파일별 프로세스 전역 연결 풀 조회 (없으면 생성)
+
+    Args:
+        db_path: 데이터베이스 파일 경로
+        **kwargs: 풀을 새로 만들 때 ConnectionPool에 전달할 설정
+
+    Returns:
+        ConnectionPool 인스턴스
+    """
+    key = str(Path(db_path).resolve())
+    with _registry_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path, **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_query_executor(max_workers: int = 8) -> ThreadPoolExecutor:
+    """
+    비동기/동시 쿼리 실행에 사용할 프로세스 전역 스레드 풀
+
+    Args:
+        max_workers: 처음 생성할 때의 최대 작업 스레드 수 (연결 풀 크기와 맞추는 것을 권장)
+
+    Returns:
+        ThreadPoolExecutor 인스턴스
+    """
+    global _executor
+    with _registry_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="db-query")
+        return _executor
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_LITERAL_RE = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_NUMBER_RE = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(query: str, strip_literals: bool = False) -> str:
+    """
+    캐시 키 계산을 위한 SQL 정규화
+
+    문자열 리터럴은 그대로 두고, 그 밖의 공백을 하나로 합치고
+    키워드 대소문자와 끝의 세미콜론 차이를 없앱니다.
+
+    Args:
+        query: SQL 쿼리
+        strip_literals: 문자열/숫자 리터럴을 ?로 바꿔 쿼리 형태만 남길지 여부
+
+    Returns:
+        정규화된 SQL 문자열
+    """
+    parts = _LITERAL_RE.split(query.strip().rstrip(';').strip())
+    for i in range(len(parts)):
+        if i % 2 == 0:
+            parts[i] = _WHITESPACE_RE.sub(' ', parts[i]).upper()
+            if strip_literals:
+                parts[i] = _NUMBER_RE.sub('?', parts[i])
+        elif strip_literals and parts[i].startswith("'"):
+            parts[i] = '?'
+    return ''.join(parts).strip()
+
+
+def query_shape_fingerprint(query: str) -> str:
+    """
+    리터럴 값을 제외한 쿼리 형태의 지문 (실행 기록 집계용)
+
+    Args:
+        query: SQL 쿼리
+
+    Returns:
+        16진수 해시 문자열
+    """
+    return hashlib.sha1(normalize_sql(query, strip_literals=True).encode('utf-8')).hexdigest()
+
+
+def sql_fingerprint(query: str, params: Optional[Any] = None) -> str:
+    """
+    정규화된 SQL과 파라미터로 만든 쿼리 지문
+
+    Args:
+        query: SQL 쿼리
+        params: 쿼리 파라미터
+
+    Returns:
+        16진수 해시 문자열
+    """
+    key = normalize_sql(query) + "\x00" + repr(params)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def database_version(db_path: str) -> tuple:
+    """
+    DB 파일 식별 정보 (inode, 크기, 수정 시각 + WAL 파일 상태)
+
+    풀의 연결마다 값이 다른 `PRAGMA data_version` 대신, 모든 연결과 프로세스가
+    공유하는 파일 메타데이터로 변경 여부를 판단합니다.
+
+    Args:
+        db_path: 데이터베이스 파일 경로
+
+    Returns:
+        변경 감지용 튜플 (파일이 없으면 빈 튜플)
+    """
+    version = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        version.append((st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns))
+    return tuple(version)
+
+
+class QueryCache:
+    """
+    쿼리 결과 DataFrame 캐시
+
+    항목 수가 아닌 DataFrame 메모리 합계(바이트)를 기준으로 LRU 방식으로
+    제거하며, DB 파일이 바뀌면 전체 캐시를 자동으로 비웁니다.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = 128 * 1024 * 1024,
+                 max_entry_fraction: float = 0.25):
+        """
+        Args:
+            db_path: 데이터베이스 파일 경로 (변경 감지용)
+            max_bytes: 캐시 전체 메모리 한도 (바이트)
+            max_entry_fraction: 항목 하나가 차지할 수 있는 한도 비율
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # 지문 -> (DataFrame, 바이트)
+        self._bytes = 0
+        self._version = database_version(db_path)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self):
+        """DB 파일이 바뀌었으면 캐시 비우기 (잠금 상태에서 호출)"""
+        version = database_version(self.db_path)
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        캐시 조회
+
+        Args:
+            key: sql_fingerprint()로 만든 지문
+
+        Returns:
+            캐시된 결과의 복사본 (없으면 None)
+        """
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            df = entry[0]
+        # 호출자가 결과를 수정해도 캐시가 오염되지 않도록 복사본 반환
+        return df.copy()
+
+    def put(self, key: str, df: pd.DataFrame):
+        """
+        결과 저장 (한도를 넘으면 오래 사용되지 않은 항목부터 제거)
+
+        Args:
+            key: sql_fingerprint()로 만든 지문
+            df: 쿼리 결과
+        """
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_entry_bytes:
+            return
+
+        df = df.copy()
+        with self._lock:
+            self._check_version()
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            while self._entries and self._bytes + size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+            self._entries[key] = (df, size)
+            self._bytes += size
+
+    def clear(self):
+        """캐시 전체 비우기"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """캐시 통계 조회"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+_caches: Dict[str, QueryCache] = {}
+
+
+def get_query_cache(db_path: str, **kwargs) -> QueryCache:
+    """
+    DB 파일별 프로세스 전역 결과 캐시 조회 (없으면 생성)
+
+    Args:
+        db_path: 데이터베이스 파일 경로
+        **kwargs: 캐시를 새로 만들 때 QueryCache에 전달할 설정
+
+    Returns:
+        QueryCache 인스턴스
+    """
+    key = str(Path(db_path).resolve())
+    with _registry_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = QueryCache(db_path, **kwargs)
+            _caches[key] = cache
+        return cache
+
+
+# LLM이 생성한 SQL 등 신뢰할 수 없는 쿼리에 적용할 기본 한도
+DEFAULT_QUERY_TIMEOUT = 10.0            # 초
+DEFAULT_MAX_ROWS = 100000
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024   # 100MB
+
+# 비용 기반 승인 제어: 예상 방문 행 수가 이 값을 넘으면 거부하거나 LIMIT을 추가
+DEFAULT_MAX_QUERY_COST = 10_000_000
+DEFAULT_AUTO_LIMIT = 1000
+
+# 진행 핸들러 호출 간격 (SQLite VM 명령 수)
+PROGRESS_HANDLER_STEPS = 1000
+
+
+class QueryLimitError(Exception):
+    """
+    쿼리가 시간/행/바이트 한도를 넘었거나 취소되었을 때 발생하는 오류
+
+    Attributes:
+        kind: 'timeout', 'cancelled', 'max_rows', 'max_bytes' 중 하나
+        limit: 적용된 한도 값 (취소의 경우 None)
+    """
+
+    MESSAGES = {
+        'timeout': "쿼리 실행 시간이 {limit}초 제한을 초과하여 중단되었습니다.",
+        'cancelled': "사용자 요청으로 쿼리가 취소되었습니다.",
+        'max_rows': "쿼리 결과가 최대 {limit:,}행 제한을 초과했습니다. LIMIT 절을 추가하세요.",
+        'max_bytes': "쿼리 결과 크기가 {limit_mb:.1f}MB 제한을 초과했습니다. 조회할 컬럼이나 행을 줄이세요.",
+    }
+
+    def __init__(self, kind: str, limit: Optional[float] = None):
+        self.kind = kind
+        self.limit = limit
+        message = self.MESSAGES[kind].format(
+            limit=limit, limit_mb=(limit or 0) / (1024 * 1024)
+        )
+        super().__init__(message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """UI 표시나 로그 기록용 딕셔너리"""
+        return {'kind': self.kind, 'limit': self.limit, 'message': str(self)}
+
+
+class CancelToken:
+    """
+    실행 중인 쿼리를 다른 스레드에서 취소하기 위한 토큰
+
+    UI 스레드가 cancel()을 호출하면, 토큰이 연결된 쿼리는 진행 핸들러와
+    sqlite3.Connection.interrupt()를 통해 즉시 중단됩니다.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    @property
+    def cancelled(self) -> bool:
+        """취소 요청 여부"""
+        return self._event.is_set()
+
+    def cancel(self):
+        """취소 요청 및 실행 중인 쿼리 중단"""
+        self._event.set()
+        with self._lock:
+            for conn in self._connections:
+                conn.interrupt()
+
+    def _attach(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._connections.append(conn)
+
+    def _detach(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._connections.remove(conn)
+
+
+@contextmanager
+def query_guard(conn: sqlite3.Connection, timeout: Optional[float] = None,
+                cancel_token: Optional[CancelToken] = None) -> Iterator[None]:
+    """
+    연결에 실행 시간 제한과 취소 처리를 적용하는 컨텍스트
+
+    SQLite 진행 핸들러가 마감 시각 초과나 취소 요청을 감지하면 쿼리를 중단하고,
+    그 결과로 발생한 오류를 QueryLimitError로 바꿔 올립니다.
+
+    Args:
+        conn: 쿼리를 실행할 연결
+        timeout: 실행 시간 제한 (초, None이면 제한 없음)
+        cancel_token: 취소 토큰
+    """
+    if timeout is None and cancel_token is None:
+        yield
+        return
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    aborted = {}
+
+    def handler() -> int:
+        if cancel_token is not None and cancel_token.cancelled:
+            aborted['kind'] = 'cancelled'
+            return 1
+        if deadline is not None and time.monotonic() > deadline:
+            aborted['kind'] = 'timeout'
+            return 1
+        return 0
+
+    if cancel_token is not None:
+        if cancel_token.cancelled:
+            raise QueryLimitError('cancelled')
+        cancel_token._attach(conn)
+    conn.set_progress_handler(handler, PROGRESS_HANDLER_STEPS)
+    try:
+        yield
+    except Exception:
+        if cancel_token is not None and cancel_token.cancelled:
+            aborted.setdefault('kind', 'cancelled')
+        if 'kind' in aborted:
+            raise QueryLimitError(aborted['kind'], timeout if aborted['kind'] == 'timeout' else None)
+        raise
+    finally:
+        # 풀로 반환되는 연결에 핸들러가 남지 않도록 해제
+        conn.set_progress_handler(None, 0)
+        if cancel_token is not None:
+            cancel_token._detach(conn)
+
+
+# 값이 차원 테이블에서 오는 텍스트 컬럼 -> (차원 테이블, 값 컬럼)
+# 차원 테이블이 있으면 결과를 category로 반환하고, 값 목록을 스키마 축소 어휘로 사용
+CATEGORY_COLUMNS = {
+    'track_genre': ('genres', 'genre_name'),
+}
+
+# SQLite 선언 타입 -> 결과 dtype
+DECLARED_TYPE_DTYPES = {
+    'INTEGER': 'int64',
+    'REAL': 'float64',
+    'TEXT': 'object',
+}
+
+
+class _TypedColumn:
+    """
+    결과 컬럼 하나를 미리 할당한 NumPy 배열에 채우는 버퍼
+
+    dtype이 정해진 컬럼은 배치마다 np.fromiter로 바로 변환해 넣고,
+    값이 dtype과 맞지 않으면(NULL이 섞인 정수, 계산식 결과 등) 더 넓은
+    dtype이나 object로 한 번만 전환합니다.
+    """
+
+    def __init__(self, dtype: Optional[str], capacity: int):
+        self.kind = 'infer' if dtype is None else (
+            'category' if dtype == 'category' else
+            'object' if dtype == 'object' else 'numeric'
+        )
+        self.dtype = np.dtype(dtype) if self.kind == 'numeric' else None
+        self.size = 0
+        self.categories: Dict[Any, int] = {}
+
+        if self.kind == 'numeric':
+            self.data = np.empty(capacity, dtype=self.dtype)
+        elif self.kind == 'category':
+            self.data = np.empty(capacity, dtype=np.int32)
+        else:
+            self.data = np.empty(capacity, dtype=object)
+
+    def _reserve(self, n: int):
+        needed = self.size + n
+        if needed > len(self.data):
+            grown = np.empty(max(needed, len(self.data) * 2), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+
+    def _fallback(self, kind: str, dtype: Optional[np.dtype] = None):
+        """기존에 채운 값을 보존하며 더 넓은 표현으로 전환"""
+        filled = self.data[:self.size]
+        if kind == 'numeric':
+            self.data = np.empty(len(self.data), dtype=dtype)
+            self.data[:self.size] = filled
+            self.dtype = dtype
+        else:
+            if self.kind == 'category':
+                lookup = np.empty(len(self.categories) + 1, dtype=object)
+                lookup[-1] = None
+                for value, code in self.categories.items():
+                    lookup[code] = value
+                filled = lookup[filled]
+            self.data = np.empty(len(self.data), dtype=object)
+            self.data[:self.size] = filled
+        self.kind = kind
+
+    def append(self, values: tuple) -> int:
+        """
+        배치 값 추가
+
+        Returns:
+            이번 배치가 추가한 대략적인 메모리 (바이트)
+        """
+        n = len(values)
+        self._reserve(n)
+        start = self.size
+
+        if self.kind == 'numeric':
+            try:
+                if self.dtype.kind in 'iu':
+                    # 정수는 int64로 바로 변환해 2**53보다 큰 값도 잘림 없이 보존
+                    try:
+                        if any(isinstance(v, float) for v in values):
+                            raise TypeError("REAL 값 포함")
+                        as_int = np.fromiter(values, dtype=np.int64, count=n)
+                    except TypeError:
+                        # 실수나 NULL이 섞여 있으면 float64로 전환
+                        as_float = np.fromiter(values, dtype=np.float64, count=n)
+                        self._fallback('numeric', np.dtype(np.float64))
+                        self.data[start:start + n] = as_float
+                    else:
+                        info = np.iinfo(self.dtype)
+                        if as_int.size and (as_int.min() < info.min or as_int.max() > info.max):
+                            self._fallback('numeric', np.dtype(np.int64))
+                        self.data[start:start + n] = as_int
+                else:
+                    self.data[start:start + n] = np.fromiter(values, dtype=self.dtype, count=n)
+                self.size += n
+                return n * self.data.itemsize
+            except (TypeError, ValueError, OverflowError):
+                self._fallback('object')
+
+        if self.kind == 'category':
+            try:
+                codes = self.categories
+                before = len(codes)
+                self.data[start:start + n] = [
+                    -1 if v is None else codes.setdefault(v, len(codes)) for v in values
+                ]
+                new_values = list(codes)[before:]
+                self.size += n
+                return n * 4 + sum(map(sys.getsizeof, new_values))
+            except TypeError:
+                self._fallback('object')
+
+        self.data[start:start + n] = values
+        self.size += n
+        return n * 8 + sum(map(sys.getsizeof, values))
+
+    def finish(self):
+        """채운 부분을 복사 없이 배열/Categorical로 반환"""
+        if self.kind == 'category':
+            # 카테고리는 처음 나온 순서로 쌓이므로, object 컬럼과 같은 정렬/그룹 순서가
+            # 되도록 값 순서로 정렬하고 코드를 다시 매김
+            try:
+                categories = sorted(self.categories)
+            except TypeError:
+                # 비교할 수 없는 값이 섞인 계산식 결과는 object로 반환
+                self._fallback('object')
+                return self.data[:self.size]
+            lookup = np.empty(len(categories) + 1, dtype=np.int32)
+            lookup[-1] = -1
+            for new_code, value in enumerate(categories):
+                lookup[self.categories[value]] = new_code
+            codes = lookup[self.data[:self.size]]
+            return pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object))
+        data = self.data[:self.size]
+        if self.kind == 'infer':
+            return pd.Series(data, copy=False).infer_objects()
+        return data
+
+
+def fetch_typed_frame(cursor: sqlite3.Cursor, dtypes: Dict[str, str],
+                      batch_size: int = 10000, max_rows: Optional[int] = None,
+                      max_bytes: Optional[int] = None,
+                      stats: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+    """
+    커서 결과를 컬럼별 NumPy 배열에 직접 채워 DataFrame으로 변환
+
+    pd.read_sql_query처럼 행 단위 object 배열을 만든 뒤 변환하지 않고,
+    컬럼별 dtype(INTEGER는 int64, REAL은 float64, 장르는 category 등)으로
+    배치마다 바로 채웁니다. dtype 맵에 없는 컬럼은 pandas가 추론합니다.
+
+    Args:
+        cursor: 쿼리를 실행한 커서
+        dtypes: {컬럼 이름: dtype 문자열}
+        batch_size: 한 번에 가져올 행 수
+        max_rows: 허용할 최대 행 수
+        max_bytes: 허용할 최대 결과 크기 (바이트)
+        stats: 전달하면 'rows', 'bytes' 키에 결과 행 수와 대략적인 크기를 기록
+
+    Returns:
+        결과 DataFrame
+
+    Raises:
+        QueryLimitError: 행/바이트 한도 초과
+    """
+    names = [desc[0] for desc in cursor.description or []]
+    columns = [_TypedColumn(dtypes.get(name), batch_size) for name in names]
+    total_rows = 0
+    total_bytes = 0
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+
+        total_rows += len(rows)
+        if max_rows is not None and total_rows > max_rows:
+            raise QueryLimitError('max_rows', max_rows)
+
+        for column, values in zip(columns, zip(*rows)):
+            total_bytes += column.append(values)
+        if max_bytes is not None and total_bytes > max_bytes:
+            raise QueryLimitError('max_bytes', max_bytes)
+
+    if stats is not None:
+        stats['rows'] = total_rows
+        stats['bytes'] = total_bytes
+
+    return pd.DataFrame(
+        {name: column.finish() for name, column in zip(names, columns)},
+        columns=names,
+        copy=False,
+    )
+
+
+# 빌드 시점의 테이블별 행 수를 저장하는 메타데이터 테이블
+STATS_TABLE = 'table_stats'
+
+# 사용자/LLM에게 노출하지 않는 내부 테이블
+INTERNAL_TABLES = {STATS_TABLE}
+
+# 트랙/아티스트/앨범 이름 전문 검색용 FTS5 테이블 (rowid = tracks.rowid)
+FTS_TABLE = 'tracks_fts'
+FTS_SHADOW_SUFFIXES = ('_data', '_idx', '_content', '_docsize', '_config')
+
+# 검색 컬럼별 bm25 가중치 (track_id는 UNINDEXED라 0)
+FTS_WEIGHTS = {'track_id': 0.0, 'track_name': 3.0, 'artists': 2.0, 'album_name': 1.0}
+
+_FTS_TOKEN_RE = re.compile(r'\w+')
+
+
+def fts_match_query(text: str, columns: Optional[List[str]] = None) -> str:
+    """
+    사용자 입력을 FTS5 MATCH 식으로 변환
+
+    단어마다 따옴표로 감싸 FTS 문법 문자를 무력화하고, 한글 조사나 어미가 붙은
+    단어도 찾도록 접두어 검색(*)으로 만듭니다. 모든 단어가 포함된 행만 찾습니다.
+
+    Args:
+        text: 검색어
+        columns: 검색할 컬럼 목록 (None이면 전체)
+
+    Returns:
+        MATCH 식 (검색할 단어가 없으면 빈 문자열)
+    """
+    tokens = _FTS_TOKEN_RE.findall(text)
+    if not tokens:
+        return ""
+    expr = " ".join(f'"{token}"*' for token in tokens)
+    if columns:
+        expr = f"{{{' '.join(columns)}}} : ({expr})"
+    return expr
+
+# LLM 스키마에 함께 안내할 테이블 관계 (모두 존재해야 하는 테이블, 설명)
+SCHEMA_RELATIONSHIPS = [
+    (('tracks', 'track_artists', 'artists'),
+     "track_artists.track_id = tracks.track_id, track_artists.artist_id = artists.artist_id "
+     "(트랙-아티스트 다대다 연결, position 0이 대표 아티스트)"),
+    (('tracks', 'track_artists', 'artists'),
+     "특정 아티스트의 곡이나 아티스트별 집계는 tracks.artists LIKE 대신 "
+     "artists.artist_name 조건으로 track_artists와 tracks를 조인"),
+    (('artists',),
+     "artists의 track_count, avg_popularity 등은 아티스트별로 미리 계산된 집계값"),
+    (('tracks', FTS_TABLE),
+     f"{FTS_TABLE}.rowid = tracks.rowid. 곡/아티스트/앨범 이름에 특정 단어가 들어간 트랙은 "
+     f"LIKE '%단어%' 대신 `{FTS_TABLE} MATCH '\"단어\"*'`로 찾고 "
+     f"ORDER BY bm25({FTS_TABLE})로 관련도순 정렬 "
+     f"(특정 컬럼만 검색: MATCH 'track_name : \"단어\"*')"),
+    (('genre_summary',),
+     "장르별 트랙 수/평균은 tracks를 GROUP BY 하지 말고 미리 계산된 genre_stats 뷰 사용 "
+     "(track_genre, track_count, avg_popularity, avg_danceability, avg_energy, avg_tempo, "
+     "avg_valence, avg_acousticness)"),
+    (('popularity_summary',),
+     "인기도 구간별 트랙 수/평균은 popularity_stats 뷰 사용 (popularity_range, track_count, "
+     "avg_danceability, avg_energy, avg_valence, avg_tempo)"),
+    (('tracks', 'genres'), "genres.genre_name = tracks.track_genre"),
+    (('tracks', 'albums'), "albums.album_name = tracks.album_name"),
+]
+
+
+class SchemaCatalog:
+    """
+    DB 버전별로 한 번만 구성되는 스키마 카탈로그
+
+    테이블 이름, 스키마, 행 수, LLM용 스키마 문자열을 메모리에서 제공합니다.
+    행 수는 빌드 스크립트가 기록한 table_stats 테이블에서 읽고,
+    기록이 없는 테이블만 COUNT(*)로 계산합니다.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, version: tuple):
+        """
+        Args:
+            conn: 카탈로그를 구성할 때 사용할 연결
+            version: database_version()으로 얻은 DB 버전
+        """
+        self.version = version
+
+        rows = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type='table' ORDER BY rowid"
+        ).fetchall()
+        all_tables = [name for name, _ in rows]
+        self.virtual_tables: List[str] = [
+            name for name, sql in rows
+            if sql and sql.upper().startswith('CREATE VIRTUAL TABLE')
+        ]
+        # FTS5가 내부 저장용으로 만드는 섀도 테이블은 노출하지 않음
+        shadow_tables = {
+            vt + suffix for vt in self.virtual_tables for suffix in FTS_SHADOW_SUFFIXES
+        }
+        self.tables: List[str] = [
+            name for name in all_tables
+            if name not in INTERNAL_TABLES and name not in shadow_tables
+            and not name.startswith('sqlite_')
+        ]
+
+        self.schemas: Dict[str, pd.DataFrame] = {
+            table: pd.read_sql_query(f'PRAGMA table_info("{table}")', conn)
+            for table in self.tables
+        }
+
+        stored_counts = {}
+        if STATS_TABLE in all_tables:
+            stored_counts = dict(conn.execute(
+                f"SELECT table_name, row_count FROM {STATS_TABLE}"
+            ).fetchall())
+
+        self.row_counts: Dict[str, int] = {}
+        for table in self.tables:
+            if table in stored_counts:
+                self.row_counts[table] = int(stored_counts[table])
+            else:
+                self.row_counts[table] = conn.execute(
+                    f'SELECT COUNT(*) FROM "{table}"'
+                ).fetchone()[0]
+
+        self.column_dtypes = self._build_column_dtypes()
+
+        # 차원 테이블 값 목록 (질문에 나온 장르 이름 등을 컬럼에 연결할 때 사용)
+        self.column_values: Dict[str, List[str]] = {}
+        for column, (table, value_column) in CATEGORY_COLUMNS.items():
+            if table in self.tables:
+                self.column_values[column] = sorted(
+                    str(value) for (value,) in conn.execute(
+                        f'SELECT DISTINCT "{value_column}" FROM "{table}" '
+                        f'WHERE "{value_column}" IS NOT NULL'
+                    )
+                )
+
+        # ANALYZE 통계가 있으면 인덱스 선택도 추정에 사용
+        self.index_stats: Dict[str, List[int]] = {}
+        if 'sqlite_stat1' in all_tables:
+            for idx, stat in conn.execute(
+                "SELECT idx, stat FROM sqlite_stat1 WHERE idx IS NOT NULL"
+            ).fetchall():
+                numbers = [int(v) for v in str(stat).split() if v.isdigit()]
+                if numbers:
+                    self.index_stats[idx] = numbers
+
+        # LLM 스키마에 안내할 관계 (관련 테이블이 모두 있는 것만)
+        self.relationships: List[Tuple[Tuple[str, ...], str]] = [
+            (required, text) for required, text in SCHEMA_RELATIONSHIPS
+            if all(table in self.tables for table in required)
+        ]
+        self.llm_schema = self.render_llm_schema()
+        self._linkers: Dict[int, SchemaLinker] = {}
+        self._linker_lock = threading.Lock()
+
+    def _build_column_dtypes(self) -> Dict[str, str]:
+        """
+        컬럼 이름 -> 결과 dtype 맵 생성
+
+        소스 테이블의 선언 타입을 그대로 따르므로 정수는 int64, 실수는 float64로
+        반환되어 결과로 계산해도 넘치거나 정밀도를 잃지 않습니다 (작은 dtype은
+        특성 컬럼 저장소에서만 사용). 차원 테이블이 있는 텍스트 컬럼은 category로
+        반환하고, 테이블마다 선언 타입이 다른 같은 이름의 컬럼은 추론에 맡깁니다.
+        """
+        dtypes: Dict[str, Optional[str]] = {}
+        for table, schema_df in self.schemas.items():
+            # 가상 테이블은 선언 타입이 없으므로 일반 테이블의 타입을 따름
+            if table in self.virtual_tables:
+                continue
+            for name, declared in zip(schema_df['name'], schema_df['type']):
+                dtype = DECLARED_TYPE_DTYPES.get(str(declared).upper())
+                if dtype == 'object' and CATEGORY_COLUMNS.get(name, ('',))[0] in self.tables:
+                    dtype = 'category'
+                if name in dtypes and dtypes[name] != dtype:
+                    dtype = None
+                dtypes[name] = dtype
+        return {name: dtype for name, dtype in dtypes.items() if dtype is not None}
+
+    def render_llm_schema(self, selection: Optional[Dict[str, List[str]]] = None) -> str:
+        """
+        LLM 프롬프트용 스키마 문자열 생성
+
+        Args:
+            selection: 포함할 테이블 -> 컬럼 목록 (None이면 전체 스키마)
+
+        Returns:
+            스키마 문자열 (관계 설명은 관련 테이블이 모두 포함된 것만)
+        """
+        if selection is None:
+            schema_text = "데이터베이스 스키마:\n\n"
+            tables = self.tables
+        else:
+            schema_text = "데이터베이스 스키마 (질문과 관련된 테이블/컬럼만 표시):\n\n"
+            tables = [table for table in self.tables if table in selection]
+
+        for table in tables:
+            schema_df = self.schemas[table]
+            if table in self.virtual_tables:
+                schema_text += f"테이블: {table} (FTS5 전문 검색 가상 테이블)\n"
+            else:
+                schema_text += f"테이블: {table}\n"
+            schema_text += "컬럼:\n"
+
+            for col_name, col_type, pk, notnull in zip(
+                schema_df['name'], schema_df['type'], schema_df['pk'], schema_df['notnull']
+            ):
+                if selection is not None and col_name not in selection[table]:
+                    continue
+                is_pk = " (PRIMARY KEY)" if pk == 1 else ""
+                not_null = " NOT NULL" if notnull == 1 else ""
+                type_text = f": {col_type}" if col_type else ""
+                schema_text += f"  - {col_name}{type_text}{is_pk}{not_null}\n"
+
+            schema_text += "\n"
+
+        relationships = [
+            text for required, text in self.relationships
+            if all(table in tables for table in required)
+        ]
+        if relationships:
+            schema_text += "관계:\n"
+            for text in relationships:
+                schema_text += f"  - {text}\n"
+            schema_text += "\n"
+
+        return schema_text
+
+    def schema_for_question(self, question: str,
+                            token_budget: int = DEFAULT_SCHEMA_TOKEN_BUDGET) -> str:
+        """
+        질문과 관련된 테이블/컬럼만 남긴 LLM용 스키마 (토큰 예산별 SchemaLinker 재사용)
+
+        Args:
+            question: 자연어 질문
+            token_budget: 최대 추정 토큰 수
+
+        Returns:
+            축소한 스키마 문자열
+        """
+        with self._linker_lock:
+            linker = self._linkers.get(token_budget)
+            if linker is None:
+                linker = SchemaLinker(self, token_budget)
+                self._linkers[token_budget] = linker
+        return linker.prune(question)
+
+
+_catalogs: Dict[str, SchemaCatalog] = {}
+
 
 class DatabaseManager:
     """SQLite 데이터베이스 관리 클래스"""
     
-    def __init__(self, db_path: str = "data/spotify.db"):
+    def __init__(self, db_path: str = "data/spotify.db", origin: str = "app"):
         """
         Args:
             db_path: 데이터베이스 파일 경로
+            origin: 실행 기록에 남길 기본 쿼리 출처 ('report', 'explorer' 등)
         """
         self.db_path = db_path
+        self.origin = origin
+        self.pool = get_pool(db_path)
+        self.cache = get_query_cache(db_path)
+        self.query_log: QueryLog = get_query_log()
         self.connection = None
         
     def connect(self) -> sqlite3.Connection:
-        """데이터베이스 연결"""
+        """
+        데이터베이스 연결
+
+        풀에서 연결 하나를 체크아웃해 close() 호출 전까지 이 인스턴스가 보유합니다.
+        쿼리 실행에는 필요할 때만 연결을 빌려 쓰는 execute_query()를 권장합니다.
+        """
         if self.connection is None:
-            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.connection = self.pool.acquire()
         return self.connection
     
     def close(self):
-        """데이터베이스 연결 종료"""
+        """보유 중인 연결을 풀에 반환"""
         if self.connection:
-            self.connection.close()
+            self.pool.release(self.connection)
             self.connection = None
+
+    @contextmanager
+    def _borrow(self) -> Iterator[sqlite3.Connection]:
+        """connect()로 보유 중인 연결이 있으면 재사용하고, 없으면 풀에서 잠시 빌림"""
+        if self.connection is not None:
+            yield self.connection
+        else:
+            with self.pool.connection() as conn:
+                yield conn
     
-    def execute_query(self, query: str) -> pd.DataFrame:
+    def execute_query(self, query: str, params: Optional[Any] = None,
+                      use_cache: bool = True, timeout: Optional[float] = None,
+                      max_rows: Optional[int] = None, max_bytes: Optional[int] = None,
+                      cancel_token: Optional[CancelToken] = None,
+                      origin: Optional[str] = None) -> pd.DataFrame:
         """
         SQL 쿼리 실행 및 결과 반환
         
         Args:
             query: 실행할 SQL 쿼리
+            params: 쿼리 파라미터 (? 또는 :name 바인딩)
+            use_cache: 결과 캐시 사용 여부
+            timeout: 실행 시간 제한 (초)
+            max_rows: 허용할 최대 결과 행 수
+            max_bytes: 허용할 최대 결과 크기 (바이트)
+            cancel_token: 다른 스레드에서 쿼리를 취소할 때 사용할 토큰
+            origin: 실행 기록에 남길 쿼리 출처 (None이면 인스턴스 기본값)
             
         Returns:
             쿼리 결과를 담은 DataFrame
+
+        Raises:
+            QueryLimitError: 한도 초과 또는 취소
         """
+        origin = origin or self.origin
+        start = time.perf_counter()
+
+        key = sql_fingerprint(query, params) if use_cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._record(query, origin, start, rows=len(cached), cached=True, params=params)
+                if max_rows is not None and len(cached) > max_rows:
+                    raise QueryLimitError('max_rows', max_rows)
+                if max_bytes is not None and cached.memory_usage(deep=True).sum() > max_bytes:
+                    raise QueryLimitError('max_bytes', max_bytes)
+                return cached
+
+        stats: Dict[str, int] = {}
         try:
-            conn = self.connect()
-            df = pd.read_sql_query(query, conn)
-            return df
+            dtypes = self.get_catalog().column_dtypes
+            with self._borrow() as conn, query_guard(conn, timeout, cancel_token):
+                cursor = conn.execute(query, params if params is not None else ())
+                try:
+                    df = fetch_typed_frame(cursor, dtypes, max_rows=max_rows,
+                                           max_bytes=max_bytes, stats=stats)
+                finally:
+                    cursor.close()
+        except QueryLimitError as e:
+            self._record(query, origin, start, error=e.kind, params=params)
+            raise
         except Exception as e:
+            self._record(query, origin, start, error=str(e), params=params)
             raise Exception(f"쿼리 실행 오류: {str(e)}")
-    
+
+        self._record(query, origin, start, rows=stats.get('rows', len(df)),
+                     result_bytes=stats.get('bytes', 0), params=params)
+
+        if key is not None:
+            self.cache.put(key, df)
+        return df
+
+    def _record(self, query: str, origin: str, start: float, rows: int = 0,
+                result_bytes: int = 0, cached: bool = False, error: Optional[str] = None,
+                params: Optional[Any] = None):
+        """실행 기록 저장 (느린 쿼리는 실행 계획도 함께 기록)"""
+        elapsed = time.perf_counter() - start
+
+        plan = None
+        if not cached and self.query_log.is_slow(elapsed):
+            try:
+                with self.pool.connection() as conn:
+                    plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}",
+                                                            params or ())]
+            except Exception:
+                plan = None
+
+        self.query_log.record(
+            fingerprint=query_shape_fingerprint(query),
+            sql=query,
+            origin=origin,
+            elapsed=elapsed,
+            rows=rows,
+            result_bytes=result_bytes,
+            cached=cached,
+            error=error,
+            plan=plan,
+            params=params,
+        )
+
+    def execute_untrusted_query(self, query: str,
+                                cancel_token: Optional[CancelToken] = None) -> pd.DataFrame:
+        """
+        LLM이 생성했거나 사용자가 수정한 SQL을 기본 한도와 함께 실행
+
+        Args:
+            query: 실행할 SQL 쿼리
+            cancel_token: 취소 토큰
+
+        Returns:
+            쿼리 결과 DataFrame
+        """
+        return self.execute_query(
+            query,
+            timeout=DEFAULT_QUERY_TIMEOUT,
+            max_rows=DEFAULT_MAX_ROWS,
+            max_bytes=DEFAULT_MAX_BYTES,
+            cancel_token=cancel_token,
+            origin='llm',
+        )
+
+    async def execute_query_async(self, query: str, params: Optional[Any] = None,
+                                  **kwargs) -> pd.DataFrame:
+        """
+        execute_query의 asyncio 버전
+
+        쿼리는 공유 스레드 풀에서 풀의 연결로 실행되므로 asyncio.gather로
+        서로 독립적인 쿼리를 동시에 실행할 수 있습니다. 대기 중인 태스크가
+        취소되면 실행 중인 SQLite 쿼리도 중단됩니다.
+
+        Args:
+            query: 실행할 SQL 쿼리
+            params: 쿼리 파라미터
+            **kwargs: execute_query에 전달할 추가 인자 (timeout, max_rows 등)
+
+        Returns:
+            쿼리 결과를 담은 DataFrame
+        """
+        token = kwargs.pop('cancel_token', None) or CancelToken()
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self.execute_query, query, params,
+                                 cancel_token=token, **kwargs)
+        try:
+            return await loop.run_in_executor(get_query_executor(self.pool.max_size), call)
+        except asyncio.CancelledError:
+            token.cancel()
+            raise
+
+    async def execute_queries_async(self, queries: Dict[str, str],
+                                    **kwargs) -> Dict[str, pd.DataFrame]:
+        """
+        여러 쿼리를 동시에 실행 (asyncio)
+
+        Args:
+            queries: {이름: SQL 쿼리}
+            **kwargs: 각 execute_query 호출에 전달할 추가 인자
+
+        Returns:
+            {이름: 결과 DataFrame}
+        """
+        names = list(queries)
+        results = await asyncio.gather(
+            *(self.execute_query_async(queries[name], **kwargs) for name in names)
+        )
+        return dict(zip(names, results))
+
+    def execute_queries(self, queries: Dict[str, str], **kwargs) -> Dict[str, pd.DataFrame]:
+        """
+        여러 쿼리를 동시에 실행 (동기 호출용)
+
+        Streamlit 페이지처럼 이벤트 루프가 없는 코드에서 사용합니다.
+        전체 소요 시간은 대략 가장 느린 쿼리 하나의 시간이 됩니다.
+
+        Args:
+            queries: {이름: SQL 쿼리}
+            **kwargs: 각 execute_query 호출에 전달할 추가 인자
+
+        Returns:
+            {이름: 결과 DataFrame}
+        """
+        executor = get_query_executor(self.pool.max_size)
+        futures = {
+            name: executor.submit(self.execute_query, query, **kwargs)
+            for name, query in queries.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+    def _iter_batches(self, query: str, params: Optional[Any] = None,
+                      batch_size: int = 10000) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        커서에서 batch_size 행씩 가져오는 내부 제너레이터
+
+        반복이 끝나거나 제너레이터가 닫힐 때까지 연결 하나를 점유합니다.
+
+        Yields:
+            (컬럼 이름 목록, 행 튜플 목록)
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size는 1 이상이어야 합니다.")
+
+        with self._borrow() as conn:
+            try:
+                cursor = conn.execute(query, params if params is not None else ())
+            except Exception as e:
+                raise Exception(f"쿼리 실행 오류: {str(e)}")
+
+            try:
+                columns = [desc[0] for desc in cursor.description or []]
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield columns, rows
+            finally:
+                cursor.close()
+
+    def iter_rows(self, query: str, params: Optional[Any] = None,
+                  batch_size: int = 10000) -> Iterator[List[tuple]]:
+        """
+        쿼리 결과를 행 튜플 묶음으로 스트리밍
+
+        Args:
+            query: 실행할 SQL 쿼리
+            params: 쿼리 파라미터
+            batch_size: 한 번에 가져올 최대 행 수
+
+        Yields:
+            최대 batch_size개의 행 튜플 리스트
+        """
+        for _, rows in self._iter_batches(query, params, batch_size):
+            yield rows
+
+    def iter_columns(self, query: str, params: Optional[Any] = None,
+                     batch_size: int = 10000) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        쿼리 결과를 컬럼별 NumPy 배열 묶음으로 스트리밍
+
+        Args:
+            query: 실행할 SQL 쿼리
+            params: 쿼리 파라미터
+            batch_size: 한 번에 가져올 최대 행 수
+
+        Yields:
+            {컬럼 이름: 배열} 딕셔너리 (각 배열 길이는 최대 batch_size)
+        """
+        for columns, rows in self._iter_batches(query, params, batch_size):
+            yield {
+                name: np.asarray(values)
+                for name, values in zip(columns, zip(*rows))
+            }
+
+    def iter_dataframes(self, query: str, params: Optional[Any] = None,
+                        batch_size: int = 10000) -> Iterator[pd.DataFrame]:
+        """
+        쿼리 결과를 DataFrame 묶음으로 스트리밍
+
+        Args:
+            query: 실행할 SQL 쿼리
+            params: 쿼리 파라미터
+            batch_size: 한 번에 가져올 최대 행 수
+
+        Yields:
+            최대 batch_size행의 DataFrame
+        """
+        for columns, rows in self._iter_batches(query, params, batch_size):
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def export_csv(self, query: str, output: Union[str, TextIO],
+                   params: Optional[Any] = None, batch_size: int = 10000) -> int:
+        """
+        쿼리 결과를 메모리에 모두 올리지 않고 CSV로 저장
+
+        Args:
+            query: 실행할 SQL 쿼리
+            output: 파일 경로 또는 텍스트 스트림
+            params: 쿼리 파라미터
+            batch_size: 한 번에 가져올 최대 행 수
+
+        Returns:
+            기록한 행 수
+        """
+        if isinstance(output, str):
+            with open(output, 'w', encoding='utf-8-sig', newline='') as f:
+                return self.export_csv(query, f, params, batch_size)
+
+        total = 0
+        for i, chunk in enumerate(self.iter_dataframes(query, params, batch_size)):
+            chunk.to_csv(output, index=False, header=(i == 0))
+            total += len(chunk)
+        return total
+
+    def compute_numeric_stats(self, query: str, params: Optional[Any] = None,
+                              batch_size: int = 50000) -> pd.DataFrame:
+        """
+        숫자형 컬럼의 count/mean/std/min/max를 고정 메모리로 계산
+
+        배치마다 구한 통계를 병렬 분산 공식(Chan et al.)으로 합칩니다.
+
+        Args:
+            query: 실행할 SQL 쿼리
+            params: 쿼리 파라미터
+            batch_size: 한 번에 가져올 최대 행 수
+
+        Returns:
+            컬럼별 통계 DataFrame (행: 컬럼, 열: count/mean/std/min/max)
+        """
+        acc: Dict[str, List[float]] = {}  # 컬럼 -> [count, mean, M2, min, max]
+
+        for chunk in self.iter_dataframes(query, params, batch_size):
+            for col in chunk.select_dtypes(include='number').columns:
+                values = chunk[col].dropna().to_numpy(dtype=np.float64)
+                if len(values) == 0:
+                    continue
+                n_b = len(values)
+                mean_b = values.mean()
+                m2_b = ((values - mean_b) ** 2).sum()
+
+                if col not in acc:
+                    acc[col] = [n_b, mean_b, m2_b, values.min(), values.max()]
+                    continue
+
+                n_a, mean_a, m2_a, min_a, max_a = acc[col]
+                n = n_a + n_b
+                delta = mean_b - mean_a
+                acc[col] = [
+                    n,
+                    mean_a + delta * n_b / n,
+                    m2_a + m2_b + delta ** 2 * n_a * n_b / n,
+                    min(min_a, values.min()),
+                    max(max_a, values.max()),
+                ]
+
+        stats = {
+            col: {
+                'count': n,
+                'mean': mean,
+                'std': float(np.sqrt(m2 / (n - 1))) if n > 1 else float('nan'),
+                'min': vmin,
+                'max': vmax,
+            }
+            for col, (n, mean, m2, vmin, vmax) in acc.items()
+        }
+        return pd.DataFrame.from_dict(stats, orient='index',
+                                      columns=['count', 'mean', 'std', 'min', 'max'])
+
+    def search_tracks(self, text: str, limit: int = 50,
+                      columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        곡/아티스트/앨범 이름 전문 검색 (FTS5, bm25 관련도순)
+
+        Args:
+            text: 검색어 (여러 단어면 모두 포함된 트랙만 검색)
+            limit: 최대 결과 수
+            columns: 검색할 컬럼 목록 ('track_name', 'artists', 'album_name' 중, None이면 전체)
+
+        Returns:
+            트랙 정보와 관련도 점수(score, 높을수록 관련도 높음)를 담은 DataFrame
+        """
+        catalog = self.get_catalog()
+        if FTS_TABLE not in catalog.tables:
+            raise Exception("검색 인덱스가 없습니다. 데이터베이스를 다시 구축하세요.")
+
+        match = fts_match_query(text, columns)
+        if not match:
+            return pd.DataFrame(columns=['track_id', 'track_name', 'artists', 'album_name',
+                                         'track_genre', 'popularity', 'score'])
+
+        fts_columns = catalog.schemas[FTS_TABLE]['name'].tolist()
+        weights = ", ".join(str(FTS_WEIGHTS.get(col, 1.0)) for col in fts_columns)
+        query = f"""
+        SELECT t.track_id, t.track_name, t.artists, t.album_name, t.track_genre, t.popularity,
+            -bm25({FTS_TABLE}, {weights}) AS score
+        FROM {FTS_TABLE}
+        JOIN tracks t ON t.rowid = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH ?
+        ORDER BY bm25({FTS_TABLE}, {weights})
+        LIMIT ?
+        """
+        return self.execute_query(query, (match, int(limit)))
+
+    def get_catalog(self) -> SchemaCatalog:
+        """
+        현재 DB 버전의 스키마 카탈로그 조회 (DB 파일이 바뀌었을 때만 재구성)
+
+        Returns:
+            SchemaCatalog 인스턴스
+        """
+        key = str(Path(self.db_path).resolve())
+        version = database_version(self.db_path)
+
+        catalog = _catalogs.get(key)
+        if catalog is not None and catalog.version == version:
+            return catalog
+
+        with self._borrow() as conn:
+            catalog = SchemaCatalog(conn, version)
+        with _registry_lock:
+            _catalogs[key] = catalog
+        return catalog
+
     def get_table_names(self) -> List[str]:
         """데이터베이스의 모든 테이블 이름 조회"""
-        query = "SELECT name FROM sqlite_master WHERE type='table'"
-        df = self.execute_query(query)
-        return df['name'].tolist()
+        return list(self.get_catalog().tables)
     
     def get_table_schema(self, table_name: str) -> pd.DataFrame:
         """
@@ -63,6 +1482,9 @@ class DatabaseManager:
         Returns:
             스키마 정보 DataFrame
         """
+        schema = self.get_catalog().schemas.get(table_name)
+        if schema is not None:
+            return schema.copy()
         query = f"PRAGMA table_info({table_name})"
         return self.execute_query(query)
     
@@ -90,6 +1512,9 @@ class DatabaseManager:
         Returns:
             전체 행 수
         """
+        count = self.get_catalog().row_counts.get(table_name)
+        if count is not None:
+            return count
         query = f"SELECT COUNT(*) as count FROM {table_name}"
         df = self.execute_query(query)
         return int(df['count'].iloc[0])
@@ -101,17 +1526,17 @@ class DatabaseManager:
         Returns:
             데이터베이스 정보 딕셔너리
         """
-        tables = self.get_table_names()
+        catalog = self.get_catalog()
         info = {
             'database_path': self.db_path,
             'database_size': os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0,
             'tables': {}
         }
         
-        for table in tables:
+        for table in catalog.tables:
             info['tables'][table] = {
-                'row_count': self.get_table_count(table),
-                'schema': self.get_table_schema(table).to_dict('records')
+                'row_count': catalog.row_counts[table],
+                'schema': catalog.schemas[table].to_dict('records')
             }
         
         return info
@@ -123,24 +1548,32 @@ class DatabaseManager:
         Returns:
             스키마 정보 문자열
         """
-        tables = self.get_table_names()
-        schema_text = "데이터베이스 스키마:\n\n"
+        return self.get_catalog().llm_schema
+    
+    def get_schema_for_question(self, question: str,
+                                token_budget: int = DEFAULT_SCHEMA_TOKEN_BUDGET) -> str:
+        """
+        질문과 관련된 테이블/컬럼만 남긴 LLM용 스키마 (프롬프트 크기 축소)
         
-        for table in tables:
-            schema_df = self.get_table_schema(table)
-            schema_text += f"테이블: {table}\n"
-            schema_text += "컬럼:\n"
-            
-            for _, row in schema_df.iterrows():
-                col_name = row['name']
-                col_type = row['type']
-                is_pk = " (PRIMARY KEY)" if row['pk'] == 1 else ""
-                not_null = " NOT NULL" if row['notnull'] == 1 else ""
-                schema_text += f"  - {col_name}: {col_type}{is_pk}{not_null}\n"
+        Args:
+            question: 자연어 질문
+            token_budget: 스키마 문자열의 최대 추정 토큰 수
             
-            schema_text += "\n"
+        Returns:
+            축소한 스키마 문자열 (관련 테이블을 찾지 못하면 전체 스키마)
+        """
+        return self.get_catalog().schema_for_question(question, token_budget)
+    
+    @staticmethod
+    def _check_keywords(query: str) -> Optional[str]:
+        """쓰기/DDL 키워드가 있으면 오류 메시지 반환"""
+        dangerous_keywords = ['DROP', 'DELETE', 'INSERT', 'UPDATE', 'ALTER', 'CREATE', 'TRUNCATE']
+        query_upper = query.upper()
         
-        return schema_text
+        for keyword in dangerous_keywords:
+            if keyword in query_upper:
+                return f"보안상 {keyword} 명령어는 사용할 수 없습니다."
+        return None
     
     def validate_query(self, query: str) -> tuple[bool, str]:
         """
@@ -153,19 +1586,73 @@ class DatabaseManager:
             (유효성 여부, 오류 메시지)
         """
         # 위험한 키워드 체크
-        dangerous_keywords = ['DROP', 'DELETE', 'INSERT', 'UPDATE', 'ALTER', 'CREATE', 'TRUNCATE']
-        query_upper = query.upper()
-        
-        for keyword in dangerous_keywords:
-            if keyword in query_upper:
-                return False, f"보안상 {keyword} 명령어는 사용할 수 없습니다."
+        error = self._check_keywords(query)
+        if error:
+            return False, error
         
         # 쿼리 실행 테스트
         try:
-            conn = self.connect()
-            cursor = conn.cursor()
-            cursor.execute(f"EXPLAIN QUERY PLAN {query}")
+            with self._borrow() as conn:
+                conn.execute(f"EXPLAIN QUERY PLAN {query}")
             return True, "유효한 쿼리입니다."
         except Exception as e:
             return False, f"쿼리 오류: {str(e)}"
-
+    
+    def estimate_query_cost(self, query: str) -> QueryPlanCost:
+        """
+        EXPLAIN QUERY PLAN과 테이블 행 수/인덱스 통계로 쿼리 비용 추정
+        
+        Args:
+            query: 추정할 SQL 쿼리
+            
+        Returns:
+            QueryPlanCost 인스턴스
+        """
+        catalog = self.get_catalog()
+        with self._borrow() as conn:
+            plan_rows = conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+        return estimate_plan_cost(query, plan_rows, catalog.row_counts, catalog.index_stats)
+    
+    def admit_query(self, query: str, max_cost: float = DEFAULT_MAX_QUERY_COST,
+                    auto_limit: Optional[int] = DEFAULT_AUTO_LIMIT) -> tuple[bool, str, str]:
+        """
+        유효성 검사 후 추정 비용이 예산 안에 있는 쿼리만 승인
+        
+        예산을 넘는 쿼리에 LIMIT이 없으면 auto_limit을 붙여 다시 추정하고,
+        그래도 예산을 넘으면 거부합니다.
+        
+        Args:
+            query: 검사할 SQL 쿼리
+            max_cost: 허용할 최대 추정 비용
+            auto_limit: 자동으로 추가할 LIMIT 값 (None이면 재작성하지 않음)
+            
+        Returns:
+            (승인 여부, 실행할 쿼리, 메시지)
+        """
+        query = query.strip().rstrip(';').strip()
+        
+        error = self._check_keywords(query)
+        if error:
+            return False, query, error
+        
+        try:
+            estimate = self.estimate_query_cost(query)
+        except Exception as e:
+            return False, query, f"쿼리 오류: {str(e)}"
+        
+        if estimate.cost <= max_cost:
+            return True, query, f"유효한 쿼리입니다. ({estimate.describe()})"
+        
+        if auto_limit is not None and query_limit(query) is None:
+            limited = f"{query}\nLIMIT {auto_limit}"
+            limited_estimate = self.estimate_query_cost(limited)
+            if limited_estimate.cost <= max_cost:
+                return True, limited, (
+                    f"예상 비용이 커서 LIMIT {auto_limit}을 자동으로 추가했습니다. "
+                    f"({limited_estimate.describe()})"
+                )
+        
+        return False, query, (
+            f"쿼리 예상 비용이 허용 범위({max_cost:,.0f})를 초과합니다. "
+            f"조건이나 LIMIT을 추가하세요. ({estimate.describe()})"
+        )
@@ -0,0 +1,374 @@
+"""
+오디오 특성 컬럼 저장소 모듈 (메모리 매핑 NumPy 배열)
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Optional, List, Dict, Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+from modules.database import file_identity
+
+
+# 컬럼 저장소에 담을 숫자 컬럼 (모두 float32, NULL은 NaN)
+FEATURE_COLUMNS = ['popularity', 'danceability', 'energy', 'key', 'loudness', 'mode',
+                   'speechiness', 'acousticness', 'instrumentalness', 'liveness',
+                   'valence', 'tempo', 'duration_ms']
+
+# 저장소 위치 (DB 파일과 같은 폴더)
+DEFAULT_STORE_DIR = 'data/feature_store'
+MANIFEST_FILENAME = 'manifest.json'
+STORE_FORMAT_VERSION = 1
+
+# 장르가 없는 트랙의 장르 코드
+NO_GENRE = -1
+
+# tracks 테이블을 읽어 올 청크 크기
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def _fsync_directory(path: str):
+    """디렉터리 항목 변경(파일 생성/교체)을 디스크에 반영 (지원하지 않는 OS는 무시)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_feature_store(conn: sqlite3.Connection, store_dir: str,
+                        db_identity: Optional[tuple] = None,
+                        chunksize: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    tracks 테이블을 컬럼별 연속 배열 파일로 내보내기
+
+    새 세대 폴더에 배열을 모두 쓴 뒤 manifest.json을 원자적으로 교체하므로,
+    저장소를 읽고 있는 앱은 항상 완전한 한 세대만 보게 됩니다.
+
+    Args:
+        conn: 데이터베이스 연결
+        store_dir: 저장소 폴더 경로
+        db_identity: 이 저장소와 짝이 되는 DB 파일 식별 정보 (file_identity() 결과)
+        chunksize: 한 번에 읽어 올 행 수
+
+    Returns:
+        기록한 매니페스트 딕셔너리
+    """
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(tracks)")}
+    features = [col for col in FEATURE_COLUMNS if col in existing]
+    rows = conn.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+    genres = [row[0] for row in conn.execute(
+        "SELECT DISTINCT track_genre FROM tracks WHERE track_genre IS NOT NULL ORDER BY track_genre"
+    )]
+    id_width = conn.execute("SELECT MAX(LENGTH(track_id)) FROM tracks").fetchone()[0] or 1
+
+    os.makedirs(store_dir, exist_ok=True)
+    generation = f"gen-{time.time_ns()}"
+    gen_dir = os.path.join(store_dir, generation)
+    os.makedirs(gen_dir)
+
+    def open_array(name: str, dtype) -> np.memmap:
+        return np.lib.format.open_memmap(os.path.join(gen_dir, f"{name}.npy"), mode='w+',
+                                         dtype=dtype, shape=(rows,))
+
+    arrays = {col: open_array(col, np.float32) for col in features}
+    track_ids = open_array('track_id', f"S{id_width}")
+    genre_codes = open_array('genre_code', np.int16)
+    genre_lookup = pd.Index(genres)
+
+    select_cols = ", ".join(f'"{col}"' for col in ['track_id', 'track_genre'] + features)
+    offset = 0
+    for chunk in pd.read_sql_query(f"SELECT {select_cols} FROM tracks ORDER BY rowid",
+                                   conn, chunksize=chunksize):
+        end = offset + len(chunk)
+        for col in features:
+            arrays[col][offset:end] = pd.to_numeric(chunk[col], errors='coerce').to_numpy(np.float32)
+        track_ids[offset:end] = chunk['track_id'].fillna('').str.encode('utf-8').to_numpy()
+        genre_codes[offset:end] = genre_lookup.get_indexer(chunk['track_genre'])
+        offset = end
+
+    # track_id 검색용 정렬 순서 (searchsorted로 행 위치 조회)
+    order = open_array('track_order', np.int32)
+    order[:] = np.argsort(track_ids, kind='stable')
+
+    for array in [*arrays.values(), track_ids, genre_codes, order]:
+        array.flush()
+    del arrays, array, track_ids, genre_codes, order
+    for name in os.listdir(gen_dir):
+        with open(os.path.join(gen_dir, name), 'rb') as f:
+            os.fsync(f.fileno())
+    _fsync_directory(gen_dir)
+
+    manifest = {
+        'format': STORE_FORMAT_VERSION,
+        'generation': generation,
+        'rows': rows,
+        'features': features,
+        'genres': genres,
+        'db_identity': list(db_identity) if db_identity else None,
+        'created_at': time.time(),
+    }
+    manifest_path = os.path.join(store_dir, MANIFEST_FILENAME)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest_path)
+    _fsync_directory(store_dir)
+
+    # 이전 세대 정리 (이미 매핑한 프로세스는 파일이 지워져도 계속 읽을 수 있음)
+    for name in os.listdir(store_dir):
+        if name.startswith('gen-') and name != generation:
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+
+    return manifest
+
+
+class FeatureStore:
+    """
+    메모리 매핑된 오디오 특성 컬럼 저장소
+
+    각 특성은 float32 연속 배열 하나이며, column()은 파일을 그대로 매핑한 읽기 전용
+    뷰를 돌려주므로 전체 데이터에 대한 히스토그램/상관관계/분위수를 복사 없이 계산할 수
+    있습니다. 행 순서는 tracks 테이블의 rowid 순서와 같습니다.
+    """
+
+    def __init__(self, store_dir: str, manifest: Dict[str, Any]):
+        """
+        Args:
+            store_dir: 저장소 폴더 경로
+            manifest: manifest.json 내용
+        """
+        self.store_dir = store_dir
+        self.manifest = manifest
+        self.rows: int = manifest['rows']
+        self.features: List[str] = manifest['features']
+        self.genres: List[str] = manifest['genres']
+        self._gen_dir = os.path.join(store_dir, manifest['generation'])
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name: str) -> np.ndarray:
+        with self._lock:
+            array = self._arrays.get(name)
+            if array is None:
+                array = np.load(os.path.join(self._gen_dir, f"{name}.npy"), mmap_mode='r')
+                self._arrays[name] = array
+            return array
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        특성 컬럼의 읽기 전용 뷰
+
+        Args:
+            name: 특성 이름
+
+        Returns:
+            길이 rows의 float32 배열 (NULL은 NaN)
+        """
+        if name not in self.features:
+            raise Exception(f"컬럼 저장소에 없는 특성입니다: {name}")
+        return self._load(name)
+
+    def columns(self, names: Iterable[str]) -> Dict[str, np.ndarray]:
+        """여러 특성 컬럼 뷰 {이름: 배열}"""
+        return {name: self.column(name) for name in names}
+
+    @property
+    def track_ids(self) -> np.ndarray:
+        """행별 track_id (UTF-8 바이트 문자열 배열)"""
+        return self._load('track_id')
+
+    @property
+    def genre_codes(self) -> np.ndarray:
+        """행별 장르 코드 (genres 목록의 위치, 장르가 없으면 NO_GENRE)"""
+        return self._load('genre_code')
+
+    def genre_mask(self, genres: Iterable[str]) -> np.ndarray:
+        """
+        지정한 장르에 속하는 행 마스크
+
+        Args:
+            genres: 장르 이름 목록
+
+        Returns:
+            길이 rows의 bool 배열
+        """
+        codes = pd.Index(self.genres).get_indexer(list(genres))
+        return np.isin(self.genre_codes, codes[codes >= 0])
+
+    def positions(self, track_ids: Iterable[str]) -> np.ndarray:
+        """
+        track_id의 행 위치 조회
+
+        Args:
+            track_ids: 조회할 track_id 목록
+
+        Returns:
+            행 위치 배열 (없는 ID는 -1)
+        """
+        ids = self.track_ids
+        order = self._load('track_order')
+        keys = np.array([str(t).encode('utf-8') for t in track_ids], dtype=ids.dtype)
+        if self.rows == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(ids, keys, sorter=order), self.rows - 1)
+        result = order[found].astype(np.int64)
+        result[ids[result] != keys] = -1
+        return result
+
+    def _select(self, name: str, mask: Optional[np.ndarray]) -> np.ndarray:
+        values = self.column(name)
+        if mask is not None:
+            values = values[mask]
+        return values[~np.isnan(values)]
+
+    def frame(self, names: Iterable[str], mask: Optional[np.ndarray] = None,
+              include_genre: bool = False) -> pd.DataFrame:
+        """
+        특성 컬럼을 DataFrame으로 변환 (차트에 행 단위 데이터가 필요할 때)
+
+        Args:
+            names: 특성 이름 목록
+            mask: 행 마스크 (None이면 전체)
+            include_genre: track_genre 범주형 컬럼 포함 여부
+
+        Returns:
+            DataFrame
+        """
+        data = {}
+        for name in names:
+            values = self.column(name)
+            data[name] = values if mask is None else values[mask]
+        if include_genre:
+            codes = self.genre_codes if mask is None else self.genre_codes[mask]
+            data['track_genre'] = pd.Categorical.from_codes(codes, categories=self.genres)
+        return pd.DataFrame(data, copy=False)
+
+    def histogram(self, name: str, bins: int = 50,
+                  mask: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        특성 히스토그램
+
+        Args:
+            name: 특성 이름
+            bins: 구간 수
+            mask: 행 마스크 (None이면 전체)
+
+        Returns:
+            bin_start, bin_end, count 컬럼의 DataFrame
+        """
+        counts, edges = np.histogram(self._select(name, mask), bins=bins)
+        return pd.DataFrame({'bin_start': edges[:-1], 'bin_end': edges[1:], 'count': counts})
+
+    def box_stats(self, names: Iterable[str], mask: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        박스 플롯용 요약 통계 (사분위수와 1.5 IQR 수염)
+
+        Args:
+            names: 특성 이름 목록
+            mask: 행 마스크 (None이면 전체)
+
+        Returns:
+            feature, count, mean, std, min, q1, median, q3, max, lower_fence, upper_fence 컬럼의 DataFrame
+        """
+        rows = []
+        for name in names:
+            values = self._select(name, mask)
+            if len(values) == 0:
+                continue
+            q1, median, q3 = np.percentile(values, [25, 50, 75])
+            iqr = q3 - q1
+            inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+            rows.append({
+                'feature': name,
+                'count': len(values),
+                'mean': float(values.mean(dtype=np.float64)),
+                'std': float(values.std(dtype=np.float64, ddof=1)) if len(values) > 1 else 0.0,
+                'min': float(values.min()),
+                'q1': float(q1),
+                'median': float(median),
+                'q3': float(q3),
+                'max': float(values.max()),
+                'lower_fence': float(inside.min()),
+                'upper_fence': float(inside.max()),
+            })
+        return pd.DataFrame(rows)
+
+    def correlation(self, names: List[str], mask: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        특성 간 피어슨 상관계수 (NaN이 있는 행은 제외)
+
+        Args:
+            names: 특성 이름 목록
+            mask: 행 마스크 (None이면 전체)
+
+        Returns:
+            names x names 상관계수 DataFrame
+        """
+        matrix = np.column_stack([self.column(name) if mask is None else self.column(name)[mask]
+                                  for name in names])
+        matrix = matrix[~np.isnan(matrix).any(axis=1)]
+        corr = np.corrcoef(matrix.astype(np.float64), rowvar=False)
+        return pd.DataFrame(np.atleast_2d(corr), index=names, columns=names)
+
+
+def read_manifest(store_dir: str) -> Optional[Dict[str, Any]]:
+    """저장소 매니페스트 (없거나 형식이 다르면 None)"""
+    try:
+        with open(os.path.join(store_dir, MANIFEST_FILENAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != STORE_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+_stores: Dict[str, FeatureStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_feature_store(store_dir: str = DEFAULT_STORE_DIR,
+                      db_path: Optional[str] = None) -> Optional[FeatureStore]:
+    """
+    저장소 폴더별 공유 FeatureStore 조회
+
+    매니페스트가 바뀌면 새 세대로 다시 엽니다. db_path를 주면 저장소가 현재 DB 파일과
+    함께 만들어진 것인지 확인하고, 아니면(증분 갱신 직후 등) None을 돌려주어 호출 측이
+    SQL 조회로 대신하도록 합니다.
+
+    Args:
+        store_dir: 저장소 폴더 경로
+        db_path: 짝이 되는 데이터베이스 파일 경로
+
+    Returns:
+        FeatureStore 인스턴스 (저장소가 없거나 오래된 경우 None)
+    """
+    manifest = read_manifest(store_dir)
+    if manifest is None:
+        return None
+    if db_path is not None:
+        identity = file_identity(db_path)
+        if manifest.get('db_identity') is None or identity is None \
+                or tuple(manifest['db_identity']) != identity:
+            return None
+
+    key = os.path.abspath(store_dir)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None or store.manifest['generation'] != manifest['generation']:
+            store = FeatureStore(store_dir, manifest)
+            _stores[key] = store
+        return store
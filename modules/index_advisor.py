@@ -0,0 +1,473 @@
+"""
+쿼리 실행 기록 기반 인덱스 추천 모듈
+"""
+import json
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+
+from modules.database import normalize_sql, query_shape_fingerprint
+from modules.query_plan import estimate_plan_cost, resolve_aliases
+
+
+# 인덱스 추천에 사용할 실행 기록 파일 (QueryLog의 워크로드 로그와 느린 쿼리 로그)
+DEFAULT_WORKLOAD_PATHS = ['data/query_workload.jsonl', 'data/query_workload.jsonl.1',
+                          'data/slow_queries.jsonl']
+
+# 채택한 인덱스 목록 파일 (DB 파일과 같은 폴더, 빌드 스크립트가 전체 재구축 후 다시 생성)
+ADVISED_INDEXES_FILENAME = 'advised_indexes.json'
+
+# 추천 인덱스 최대 컬럼 수 (커버링 인덱스가 너무 넓어지지 않도록 제한)
+MAX_INDEX_COLUMNS = 6
+
+# 전체 워크로드 비용 대비 이보다 적게 줄이는 인덱스는 추천하지 않음
+DEFAULT_MIN_GAIN = 0.01
+
+DEFAULT_MAX_INDEXES = 5
+
+# 채택한 인덱스 이름 접두어
+INDEX_PREFIX = 'idx_adv_'
+
+_CLAUSE_RE = re.compile(
+    r'\b(WHERE|ON|GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|UNION|EXCEPT|INTERSECT|WINDOW)\b',
+    re.IGNORECASE
+)
+_COLUMN_REF_RE = re.compile(r'(?:\b([A-Za-z_]\w*)\s*\.\s*)?"?\b([A-Za-z_]\w*)\b"?')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_TABLE_NAME_RE = re.compile(r'\b(FROM|JOIN)\s+"?[A-Za-z_]\w*"?', re.IGNORECASE)
+
+
+class WorkloadQuery:
+    """
+    형태(리터럴 제외)가 같은 쿼리 묶음
+
+    Attributes:
+        fingerprint: 쿼리 형태 지문
+        sql: 대표 SQL (가장 최근 기록)
+        params: 대표 SQL의 파라미터
+        count: 실행 횟수
+        total_ms: 누적 실행 시간 (밀리초)
+        origins: 쿼리 출처 집합
+    """
+
+    def __init__(self, fingerprint: str, sql: str, params: Optional[Any] = None):
+        self.fingerprint = fingerprint
+        self.sql = sql
+        self.params = params
+        self.count = 0
+        self.total_ms = 0.0
+        self.origins = set()
+
+
+class IndexCandidate:
+    """
+    추천 후보 인덱스
+
+    Attributes:
+        table: 테이블 이름
+        columns: 인덱스 컬럼 목록 (순서 중요)
+        benefit: 워크로드 추정 비용 감소량 (실행 횟수 가중)
+        gain: 전체 워크로드 비용 대비 감소 비율
+        size_bytes: 인덱스 크기 (바이트)
+        improved: 비용이 줄어든 쿼리 형태 수
+    """
+
+    def __init__(self, table: str, columns: List[str]):
+        self.table = table
+        self.columns = list(columns)
+        self.benefit = 0.0
+        self.gain = 0.0
+        self.size_bytes = 0
+        self.improved = 0
+
+    @property
+    def key(self) -> Tuple[str, Tuple[str, ...]]:
+        return self.table, tuple(self.columns)
+
+    @property
+    def name(self) -> str:
+        return f"{INDEX_PREFIX}{self.table}_{'_'.join(self.columns)}"[:120]
+
+    def create_sql(self) -> str:
+        """인덱스 생성 SQL"""
+        cols = ", ".join(f'"{col}"' for col in self.columns)
+        return f'CREATE INDEX IF NOT EXISTS "{self.name}" ON "{self.table}" ({cols})'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """저장/출력용 딕셔너리"""
+        return {
+            'name': self.name,
+            'table': self.table,
+            'columns': self.columns,
+            'benefit': self.benefit,
+            'gain': self.gain,
+            'size_bytes': self.size_bytes,
+            'improved': self.improved,
+        }
+
+
+def load_workload(paths: Optional[List[str]] = None) -> List[WorkloadQuery]:
+    """
+    실행 기록 JSONL 파일에서 SELECT 쿼리를 형태별로 모음
+
+    캐시 적중이나 오류로 끝난 기록은 제외합니다. 같은 실행이 워크로드 로그와
+    느린 쿼리 로그에 모두 남은 경우는 타임스탬프로 한 번만 셉니다.
+
+    Args:
+        paths: JSONL 파일 경로 목록 (None이면 기본 경로, 없는 파일은 무시)
+
+    Returns:
+        실행 횟수 내림차순 WorkloadQuery 목록
+    """
+    workload: Dict[str, WorkloadQuery] = {}
+    seen = set()
+
+    for path in paths or DEFAULT_WORKLOAD_PATHS:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                sql = entry.get('sql') or ''
+                if entry.get('cached') or entry.get('error'):
+                    continue
+                if not normalize_sql(sql).startswith(('SELECT', 'WITH')):
+                    continue
+
+                run_key = (entry.get('timestamp'), sql)
+                if run_key in seen:
+                    continue
+                seen.add(run_key)
+
+                fingerprint = entry.get('fingerprint') or query_shape_fingerprint(sql)
+                item = workload.get(fingerprint)
+                if item is None:
+                    item = workload[fingerprint] = WorkloadQuery(fingerprint, sql)
+                item.sql = sql
+                item.params = entry.get('params')
+                item.count += 1
+                item.total_ms += float(entry.get('elapsed_ms') or 0.0)
+                item.origins.add(entry.get('origin') or '')
+
+    return sorted(workload.values(), key=lambda q: q.count, reverse=True)
+
+
+def _split_clauses(sql: str) -> Dict[str, str]:
+    """최상위 절 키워드(WHERE/ON/GROUP BY/ORDER BY 등) 기준으로 SQL 본문 분리"""
+    clauses = {'SELECT': ''}
+    current = 'SELECT'
+    pos = 0
+    for match in _CLAUSE_RE.finditer(sql):
+        clauses[current] = clauses.get(current, '') + ' ' + sql[pos:match.start()]
+        current = ' '.join(match.group(1).upper().split())
+        pos = match.end()
+    clauses[current] = clauses.get(current, '') + ' ' + sql[pos:]
+    return clauses
+
+
+def extract_candidates(sql: str, table_columns: Dict[str, List[str]]) -> List[IndexCandidate]:
+    """
+    쿼리의 조건/그룹/정렬/조회 컬럼으로 복합·커버링 인덱스 후보 생성
+
+    조건의 등호 컬럼을 앞에 두고, 범위 조건·GROUP BY·ORDER BY 컬럼을 뒤에 붙인
+    복합 인덱스와, 여기에 쿼리가 읽는 나머지 컬럼을 덧붙인 커버링 인덱스를
+    만듭니다. 조건 없이 집계만 하는 쿼리는 읽는 컬럼만 담은 커버링 인덱스를
+    후보로 냅니다.
+
+    Args:
+        sql: SQL 쿼리
+        table_columns: {테이블 이름: 컬럼 목록} (인덱스를 만들 수 있는 일반 테이블)
+
+    Returns:
+        IndexCandidate 목록 (중복 제거 전)
+    """
+    text = _STRING_RE.sub("''", sql)
+    aliases = resolve_aliases(text, list(table_columns))
+    tables = set(aliases.values())
+    if not tables:
+        return []
+
+    def resolve(qualifier: Optional[str], column: str) -> Optional[str]:
+        if qualifier:
+            table = aliases.get(qualifier)
+            return table if table and column in table_columns[table] else None
+        owners = [t for t in tables if column in table_columns[t]]
+        return owners[0] if len(owners) == 1 else None
+
+    def refs(fragment: str) -> List[Tuple[str, str, int, int]]:
+        found = []
+        for match in _COLUMN_REF_RE.finditer(fragment):
+            table = resolve(match.group(1), match.group(2))
+            if table:
+                found.append((table, match.group(2), match.start(), match.end()))
+        return found
+
+    # FROM/JOIN 뒤의 테이블 이름이 같은 이름의 컬럼(tracks.artists 등)으로 잡히지 않도록 제거
+    text = _TABLE_NAME_RE.sub(r'\1 ', text)
+    clauses = _split_clauses(text)
+    eq: Dict[str, List[str]] = {t: [] for t in tables}
+    rng: Dict[str, List[str]] = {t: [] for t in tables}
+    for name in ('WHERE', 'ON'):
+        fragment = clauses.get(name, '')
+        for table, column, _, end in refs(fragment):
+            rest = fragment[end:end + 12].lstrip().upper()
+            if rest.startswith(('=', 'IN ', 'IN(', 'IS ')) and not rest.startswith('IS NOT'):
+                if column not in eq[table]:
+                    eq[table].append(column)
+            elif rest.startswith(('<', '>', 'BETWEEN', 'LIKE')):
+                if column not in rng[table]:
+                    rng[table].append(column)
+
+    group = {t: [c for tt, c, _, _ in refs(clauses.get('GROUP BY', '')) if tt == t] for t in tables}
+    order = {t: [c for tt, c, _, _ in refs(clauses.get('ORDER BY', '')) if tt == t] for t in tables}
+    referenced = {t: [] for t in tables}
+    for table, column, _, _ in refs(text):
+        if column not in referenced[table]:
+            referenced[table].append(column)
+
+    candidates = []
+    for table in tables:
+        bases = []
+        if eq[table] or rng[table]:
+            bases.append(eq[table] + rng[table][:1])
+        if group[table]:
+            bases.append(eq[table] + [c for c in group[table] if c not in eq[table]])
+        elif order[table]:
+            bases.append(eq[table] + [c for c in order[table] if c not in eq[table]])
+        if not bases and referenced[table]:
+            # 조건 없는 집계/조회: 읽는 컬럼만 담은 좁은 인덱스 스캔
+            bases.append([])
+
+        for base in bases:
+            base = list(dict.fromkeys(base))
+            if base and len(base) <= MAX_INDEX_COLUMNS:
+                candidates.append(IndexCandidate(table, base))
+            covering = base + [c for c in referenced[table] if c not in base]
+            if covering != base and len(covering) <= MAX_INDEX_COLUMNS:
+                candidates.append(IndexCandidate(table, covering))
+
+    return candidates
+
+
+class IndexAdvisor:
+    """
+    가상 인덱스 평가기
+
+    DB를 메모리로 복사한 뒤 후보 인덱스를 실제로 만들어 ANALYZE하고, 워크로드의
+    EXPLAIN QUERY PLAN 비용(query_plan 모듈의 추정치)이 얼마나 줄어드는지와
+    인덱스가 차지하는 페이지 수를 측정합니다. 원본 DB는 읽기만 합니다.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: 분석할 데이터베이스 파일 경로
+        """
+        self.db_path = db_path
+        source = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+        self.conn = sqlite3.connect(":memory:")
+        try:
+            source.backup(self.conn)
+        finally:
+            source.close()
+
+        # 계획기가 통계를 가지고 판단하도록 복사본에서 먼저 ANALYZE
+        self.conn.execute("ANALYZE")
+        self.page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+
+        rows = self.conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        virtual = {name for name, sql in rows if sql and sql.upper().startswith('CREATE VIRTUAL')}
+        shadow = {name for name, _ in rows for vt in virtual if name.startswith(vt + '_')}
+
+        self.table_columns: Dict[str, List[str]] = {}
+        self.row_counts: Dict[str, int] = {}
+        for name, _ in rows:
+            if name in virtual or name in shadow:
+                continue
+            self.table_columns[name] = [
+                row[1] for row in self.conn.execute(f'PRAGMA table_info("{name}")')
+            ]
+            self.row_counts[name] = self.conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+        for name in virtual:
+            self.row_counts[name] = self.conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+
+        self.existing = self._existing_indexes()
+
+    def close(self):
+        """메모리 복사본 닫기"""
+        self.conn.close()
+
+    def _existing_indexes(self) -> List[Tuple[str, Tuple[str, ...]]]:
+        """(테이블, 컬럼 튜플) 형태의 기존 인덱스 목록"""
+        indexes = []
+        for table in self.table_columns:
+            for row in self.conn.execute(f'PRAGMA index_list("{table}")'):
+                cols = tuple(r[2] for r in self.conn.execute(f'PRAGMA index_info("{row[1]}")'))
+                if cols and None not in cols:
+                    indexes.append((table, cols))
+        return indexes
+
+    def _covered(self, candidate: IndexCandidate) -> bool:
+        """같은 컬럼으로 시작하는 기존 인덱스가 있으면 새로 만들 필요 없음"""
+        cols = tuple(candidate.columns)
+        return any(table == candidate.table and existing[:len(cols)] == cols
+                   for table, existing in self.existing)
+
+    def _index_stats(self) -> Dict[str, List[int]]:
+        stats = {}
+        for idx, stat in self.conn.execute(
+            "SELECT idx, stat FROM sqlite_stat1 WHERE idx IS NOT NULL"
+        ).fetchall():
+            numbers = [int(v) for v in str(stat).split() if v.isdigit()]
+            if numbers:
+                stats[idx] = numbers
+        return stats
+
+    def _used_bytes(self) -> int:
+        page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - freelist) * self.page_size
+
+    def workload_costs(self, workload: List[WorkloadQuery]) -> Dict[str, float]:
+        """
+        쿼리 형태별 추정 비용 (현재 복사본의 인덱스 기준, 계획을 만들 수 없는 쿼리는 제외)
+
+        Args:
+            workload: load_workload() 결과
+
+        Returns:
+            {지문: 1회 실행 추정 비용}
+        """
+        index_stats = self._index_stats()
+        costs = {}
+        for query in workload:
+            params = query.params if query.params is not None else ()
+            try:
+                plan = self.conn.execute(f"EXPLAIN QUERY PLAN {query.sql}", params).fetchall()
+            except (sqlite3.Error, ValueError, TypeError):
+                continue
+            costs[query.fingerprint] = estimate_plan_cost(
+                query.sql, plan, self.row_counts, index_stats
+            ).cost
+        return costs
+
+    def candidates(self, workload: List[WorkloadQuery]) -> List[IndexCandidate]:
+        """워크로드 전체에서 중복과 기존 인덱스를 제외한 후보 목록"""
+        unique: Dict[Tuple[str, Tuple[str, ...]], IndexCandidate] = {}
+        for query in workload:
+            for candidate in extract_candidates(query.sql, self.table_columns):
+                if candidate.key not in unique and not self._covered(candidate):
+                    unique[candidate.key] = candidate
+        return list(unique.values())
+
+    def evaluate(self, candidate: IndexCandidate, workload: List[WorkloadQuery],
+                 baseline: Dict[str, float], total_cost: float) -> IndexCandidate:
+        """
+        후보 인덱스를 복사본에 만들어 비용 감소량과 크기를 측정한 뒤 제거
+
+        Args:
+            candidate: 평가할 후보
+            workload: load_workload() 결과
+            baseline: 현재 인덱스 기준 workload_costs()
+            total_cost: 실행 횟수를 곱한 현재 전체 워크로드 비용
+
+        Returns:
+            benefit/gain/size_bytes/improved가 채워진 후보
+        """
+        before = self._used_bytes()
+        self.conn.execute(candidate.create_sql())
+        self.conn.execute(f'ANALYZE "{candidate.name}"')
+        candidate.size_bytes = self._used_bytes() - before
+
+        costs = self.workload_costs(workload)
+        candidate.benefit = 0.0
+        candidate.improved = 0
+        for query in workload:
+            old = baseline.get(query.fingerprint)
+            new = costs.get(query.fingerprint)
+            if old is None or new is None or new >= old:
+                continue
+            candidate.benefit += (old - new) * query.count
+            candidate.improved += 1
+        candidate.gain = candidate.benefit / total_cost if total_cost else 0.0
+
+        self.conn.execute(f'DROP INDEX "{candidate.name}"')
+        return candidate
+
+    def recommend(self, workload: List[WorkloadQuery], max_indexes: int = DEFAULT_MAX_INDEXES,
+                  min_gain: float = DEFAULT_MIN_GAIN) -> List[IndexCandidate]:
+        """
+        크기 대비 비용 감소가 큰 후보부터 하나씩 채택 (탐욕적 선택)
+
+        채택한 인덱스는 복사본에 남겨 두고 나머지 후보를 다시 평가하므로, 이미
+        채택한 인덱스와 효과가 겹치는 후보는 이득이 줄어 자연스럽게 탈락합니다.
+
+        Args:
+            workload: load_workload() 결과
+            max_indexes: 최대 추천 개수
+            min_gain: 전체 워크로드 비용 대비 최소 감소 비율
+
+        Returns:
+            채택 순서대로 정렬된 IndexCandidate 목록
+        """
+        remaining = self.candidates(workload)
+        chosen: List[IndexCandidate] = []
+
+        while remaining and len(chosen) < max_indexes:
+            baseline = self.workload_costs(workload)
+            total_cost = sum(baseline.get(q.fingerprint, 0.0) * q.count for q in workload)
+            evaluated = [self.evaluate(c, workload, baseline, total_cost) for c in remaining]
+            useful = [c for c in evaluated if c.gain >= min_gain]
+            if not useful:
+                break
+
+            best = max(useful, key=lambda c: c.benefit / max(c.size_bytes, self.page_size))
+            self.conn.execute(best.create_sql())
+            self.conn.execute(f'ANALYZE "{best.name}"')
+            self.existing.append(best.key)
+            chosen.append(best)
+            remaining = [c for c in useful if c is not best and not self._covered(c)]
+
+        # 나중에 채택된 인덱스의 앞부분과 같은 인덱스는 중복이므로 제외
+        return [c for c in chosen
+                if not any(o is not c and o.table == c.table
+                           and len(o.columns) > len(c.columns)
+                           and o.columns[:len(c.columns)] == c.columns for o in chosen)]
+
+
+def load_advised_indexes(path: str) -> List[Dict[str, Any]]:
+    """저장된 채택 인덱스 목록 (파일이 없으면 빈 목록)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_advised_indexes(path: str, candidates: List[IndexCandidate]) -> List[Dict[str, Any]]:
+    """
+    채택한 인덱스를 기존 목록에 합쳐 저장 (같은 이름은 새 측정값으로 교체)
+
+    Args:
+        path: JSON 파일 경로
+        candidates: 채택한 인덱스 목록
+
+    Returns:
+        저장된 전체 목록
+    """
+    saved = {item['name']: item for item in load_advised_indexes(path)}
+    for candidate in candidates:
+        saved[candidate.name] = candidate.to_dict()
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(list(saved.values()), f, ensure_ascii=False, indent=2)
+    return list(saved.values())
@@ -2,21 +2,37 @@
 Gemini API 연동 모듈
 """
 import google.generativeai as genai
-from typing import Optional, Dict, Any
+from collections import deque
+from typing import Optional, Dict, Any, Iterator
+import numpy as np
 import os
+import sqlite3
+import time
 from dotenv import load_dotenv
 
+from modules.question_index import DEFAULT_SIMILARITY_THRESHOLD
+from modules.sql_cache import SQLCache, get_sql_cache
+
 # 환경 변수 로드
 load_dotenv()
 
+# 보관할 최근 분석 생성 시간 기록 수
+GENERATION_HISTORY_SIZE = 200
+
 
 class GeminiLLM:
     """Gemini API를 사용한 LLM 클래스"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, sql_cache: Optional[SQLCache] = None,
+                 use_sql_cache: bool = True,
+                 similarity_threshold: Optional[float] = DEFAULT_SIMILARITY_THRESHOLD):
         """
         Args:
             api_key: Gemini API 키 (None이면 환경변수에서 로드)
+            sql_cache: 생성한 SQL을 저장할 캐시 (None이면 프로세스 전역 캐시)
+            use_sql_cache: SQL 캐시 사용 여부
+            similarity_threshold: 표현만 다른 질문의 SQL을 재사용할 최소 유사도
+                (None이면 정확히 같은 질문만 재사용)
         """
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         
@@ -36,18 +52,49 @@ class GeminiLLM:
             except:
                 # 최종 대안
                 self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.model_name = getattr(self.model, 'model_name', '')
+        
+        # 같은 질문/스키마의 SQL은 다시 생성하지 않도록 디스크 캐시 사용 (열 수 없으면 캐시 없이 동작)
+        self.sql_cache = None
+        if use_sql_cache:
+            try:
+                self.sql_cache = sql_cache or get_sql_cache()
+            except (sqlite3.Error, OSError):
+                self.sql_cache = None
+        self.similarity_threshold = similarity_threshold
+        self.last_sql_cached = False
+        self.last_cache_match = None
+        
+        # 최근 분석 생성 시간 기록 (첫 조각까지 시간, 전체 시간)
+        self.last_generation: Optional[Dict[str, Any]] = None
+        self.generations: deque = deque(maxlen=GENERATION_HISTORY_SIZE)
     
-    def text_to_sql(self, question: str, schema: str) -> str:
+    def text_to_sql(self, question: str, schema: str, use_cache: bool = True) -> str:
         """
         자연어 질문을 SQL 쿼리로 변환
         
+        같은 질문(공백/대소문자 정규화 후)이나 표현만 다른 비슷한 질문을 같은 스키마로
+        변환한 SQL이 캐시에 있으면 API를 호출하지 않고 바로 반환합니다. 캐시 사용 여부는
+        last_sql_cached에, 재사용한 캐시 항목(원래 질문, 유사도)은 last_cache_match에 기록됩니다.
+        
         Args:
             question: 사용자의 자연어 질문
             schema: 데이터베이스 스키마 정보
+            use_cache: 캐시 조회 여부 (False면 항상 새로 생성해 캐시를 갱신)
             
         Returns:
             생성된 SQL 쿼리
         """
+        self.last_sql_cached = False
+        self.last_cache_match = None
+        if self.sql_cache is not None and use_cache:
+            cached = self.sql_cache.match(question, schema, self.model_name,
+                                          self.similarity_threshold)
+            if cached is not None:
+                self.last_sql_cached = True
+                self.last_cache_match = cached
+                return cached['sql']
+        
         prompt = f"""당신은 SQL 전문가입니다. 사용자의 자연어 질문을 SQLite 쿼리로 변환해주세요.
 
 {schema}
@@ -68,6 +115,7 @@ class GeminiLLM:
 SQL 쿼리:"""
 
         try:
+            start = time.perf_counter()
             response = self.model.generate_content(prompt)
             sql_query = response.text.strip()
             
@@ -80,7 +128,11 @@ SQL 쿼리:"""
             if sql_query.endswith("```"):
                 sql_query = sql_query[:-3]
             
-            return sql_query.strip()
+            sql_query = sql_query.strip()
+            if self.sql_cache is not None and sql_query:
+                self.sql_cache.put(question, schema, sql_query, self.model_name,
+                                   (time.perf_counter() - start) * 1000)
+            return sql_query
         
         except Exception as e:
             error_msg = str(e)
@@ -107,33 +159,44 @@ SQL 쿼리:"""
             # 기타 에러
             raise Exception(f"SQL 생성 오류: {error_msg}")
     
-    def analyze_results(self, question: str, query: str, results_df) -> str:
+    def forget_sql(self, question: str, schema: str):
         """
-        쿼리 결과를 분석하고 인사이트 제공
+        캐시된 SQL 삭제 (생성된 SQL이 검증이나 실행에 실패했을 때 다시 생성하도록)
         
         Args:
-            question: 원래 질문
-            query: 실행된 SQL 쿼리
-            results_df: 쿼리 결과 DataFrame
-            
-        Returns:
-            분석 결과 텍스트
+            question: 사용자의 자연어 질문
+            schema: 데이터베이스 스키마 정보
         """
-        # 결과 요약
-        result_summary = f"총 {len(results_df)}개의 결과가 조회되었습니다.\n\n"
-        
+        if self.sql_cache is not None:
+            self.sql_cache.invalidate(question, schema, self.model_name)
+            # 비슷한 질문에서 가져온 SQL이면 원래 항목도 삭제
+            match = self.last_cache_match
+            if match is not None and match['similar']:
+                self.sql_cache.invalidate(match['question'], schema, self.model_name)
+    
+    def _analysis_prompt(self, question: str, query: Optional[str], results_df,
+                         data_source: Optional[str] = None) -> str:
+        """결과 분석 프롬프트 생성"""
         if len(results_df) > 0:
             # 상위 5개 행만 포함
             result_preview = results_df.head(5).to_string()
         else:
             result_preview = "결과가 없습니다."
         
-        prompt = f"""다음은 사용자의 질문과 그에 대한 SQL 쿼리 결과입니다.
+        # SQL 없이 만든 결과(특성 컬럼 저장소 집계 등)는 SQL 대신 데이터 출처 설명을 전달
+        source_lines = []
+        if query:
+            source_lines.append(f"실행된 SQL: {query}")
+        if data_source:
+            source_lines.append(f"데이터 출처: {data_source}")
+        source_text = "\n\n".join(source_lines)
+        
+        return f"""다음은 사용자의 질문과 그에 대한 데이터 조회 결과입니다.
 결과를 분석하고 주요 인사이트를 한국어로 제공해주세요.
 
 사용자 질문: {question}
 
-실행된 SQL: {query}
+{source_text}
 
 결과 미리보기:
 {result_preview}
@@ -144,13 +207,106 @@ SQL 쿼리:"""
 3. 추가 분석 제안 (있다면)
 
 분석:"""
-
+    
+    def stream_analysis(self, question: str, query: Optional[str], results_df,
+                        data_source: Optional[str] = None) -> Iterator[str]:
+        """
+        쿼리 결과 분석을 생성되는 대로 조각 단위로 반환 (st.write_stream에 바로 전달 가능)
+        
+        첫 조각까지 걸린 시간(TTFT)과 전체 생성 시간은 생성이 끝나면 last_generation과
+        generations에 기록됩니다. 오류가 나면 오류 메시지를 마지막 조각으로 반환합니다.
+        
+        Args:
+            question: 원래 질문
+            query: 실행된 SQL 쿼리 (SQL 없이 만든 결과면 None)
+            results_df: 쿼리 결과 DataFrame
+            data_source: SQL 외의 데이터 출처 설명 (예: 특성 컬럼 저장소 집계)
+            
+        Yields:
+            분석 결과 텍스트 조각
+        """
+        prompt = self._analysis_prompt(question, query, results_df, data_source)
+        start = time.perf_counter()
+        first_chunk = None
+        chunks = 0
+        chars = 0
+        error = None
+        
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            response = self.model.generate_content(prompt, stream=True)
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # 안전 필터 등으로 텍스트가 없는 조각
+                    continue
+                if not text:
+                    continue
+                if first_chunk is None:
+                    first_chunk = time.perf_counter()
+                chunks += 1
+                chars += len(text)
+                yield text
+            
+            if first_chunk is None:
+                # 모든 조각이 안전 필터 등으로 비어 있으면 빈 분석 대신 안내 문구 표시
+                error = "빈 응답"
+                yield "분석 결과를 받지 못했습니다. 응답이 비어 있거나 안전 필터로 차단되었습니다."
         
         except Exception as e:
-            return f"분석 생성 중 오류가 발생했습니다: {str(e)}"
+            error = str(e)
+            yield f"분석 생성 중 오류가 발생했습니다: {error}"
+        
+        finally:
+            end = time.perf_counter()
+            self.last_generation = {
+                'kind': 'analysis',
+                'ttft_ms': (first_chunk - start) * 1000 if first_chunk is not None else None,
+                'total_ms': (end - start) * 1000,
+                'chunks': chunks,
+                'chars': chars,
+                'error': error,
+            }
+            self.generations.append(self.last_generation)
+    
+    def analyze_results(self, question: str, query: Optional[str], results_df,
+                        data_source: Optional[str] = None) -> str:
+        """
+        쿼리 결과를 분석하고 인사이트 제공
+        
+        Args:
+            question: 원래 질문
+            query: 실행된 SQL 쿼리 (SQL 없이 만든 결과면 None)
+            results_df: 쿼리 결과 DataFrame
+            data_source: SQL 외의 데이터 출처 설명
+            
+        Returns:
+            분석 결과 텍스트
+        """
+        return "".join(self.stream_analysis(question, query, results_df, data_source)).strip()
+    
+    def generation_stats(self) -> Dict[str, Any]:
+        """
+        최근 분석 생성 시간 요약
+        
+        Returns:
+            생성 횟수, 첫 조각까지 시간(TTFT)과 전체 생성 시간의 p50/p95 (밀리초)
+        """
+        records = [r for r in self.generations if r['error'] is None]
+        ttft = [r['ttft_ms'] for r in records if r['ttft_ms'] is not None]
+        total = [r['total_ms'] for r in records]
+        
+        def percentile(values, q):
+            return float(np.percentile(values, q)) if values else None
+        
+        return {
+            'count': len(records),
+            'errors': len(self.generations) - len(records),
+            'ttft_p50_ms': percentile(ttft, 50),
+            'ttft_p95_ms': percentile(ttft, 95),
+            'total_p50_ms': percentile(total, 50),
+            'total_p95_ms': percentile(total, 95),
+        }
     
     def suggest_visualization(self, results_df, question: str) -> Dict[str, Any]:
         """
@@ -168,11 +324,10 @@ SQL 쿼리:"""
         
         # 컬럼 정보
         columns = results_df.columns.tolist()
-        dtypes = results_df.dtypes.to_dict()
         
-        # 숫자형 컬럼과 문자형 컬럼 구분
-        numeric_cols = [col for col, dtype in dtypes.items() if dtype in ['int64', 'float64']]
-        text_cols = [col for col, dtype in dtypes.items() if dtype == 'object']
+        # 숫자형 컬럼과 문자형 컬럼 구분 (장르 category 결과 포함)
+        numeric_cols = results_df.select_dtypes(include='number').columns.tolist()
+        text_cols = results_df.select_dtypes(include=['object', 'category']).columns.tolist()
         
         # 기본 규칙 기반 제안
         if len(numeric_cols) >= 2:
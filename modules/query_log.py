@@ -0,0 +1,189 @@
+"""
+쿼리 실행 기록 및 느린 쿼리 로그 모듈
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional, List, Dict, Any
+
+import numpy as np
+import pandas as pd
+
+
+# 느린 쿼리로 기록할 기준 시간 (초)
+DEFAULT_SLOW_THRESHOLD = 0.5
+
+# 메모리에 보관할 최근 실행 기록 수
+DEFAULT_RING_SIZE = 2000
+
+# 워크로드 로그 파일 최대 크기 (넘으면 .1 파일로 넘기고 새로 시작)
+DEFAULT_MAX_WORKLOAD_BYTES = 16 * 1024 * 1024
+
+
+class QueryLog:
+    """
+    쿼리 실행 기록 저장소
+
+    모든 실행 기록은 고정 크기 링 버퍼에 보관하고, 기준 시간을 넘긴 쿼리는
+    실행 계획과 함께 JSONL 파일에 추가 기록합니다. 캐시를 거치지 않고 성공한
+    쿼리는 인덱스 추천 도구가 다시 실행해 볼 수 있도록 워크로드 로그에도 남깁니다.
+    """
+
+    def __init__(self, slow_log_path: Optional[str] = "data/slow_queries.jsonl",
+                 slow_threshold: float = DEFAULT_SLOW_THRESHOLD,
+                 ring_size: int = DEFAULT_RING_SIZE,
+                 workload_log_path: Optional[str] = "data/query_workload.jsonl",
+                 max_workload_bytes: int = DEFAULT_MAX_WORKLOAD_BYTES):
+        """
+        Args:
+            slow_log_path: 느린 쿼리 JSONL 파일 경로 (None이면 파일 기록 안 함)
+            slow_threshold: 느린 쿼리 기준 시간 (초)
+            ring_size: 메모리에 보관할 최대 기록 수
+            workload_log_path: 워크로드 JSONL 파일 경로 (None이면 기록 안 함)
+            max_workload_bytes: 워크로드 로그 파일 최대 크기 (바이트)
+        """
+        self.slow_log_path = slow_log_path
+        self.slow_threshold = slow_threshold
+        self.workload_log_path = workload_log_path
+        self.max_workload_bytes = max_workload_bytes
+        self._records: deque = deque(maxlen=ring_size)
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+
+    def is_slow(self, elapsed: float) -> bool:
+        """느린 쿼리 기준 초과 여부"""
+        return elapsed >= self.slow_threshold
+
+    def record(self, fingerprint: str, sql: str, origin: str, elapsed: float,
+               rows: int = 0, result_bytes: int = 0, cached: bool = False,
+               error: Optional[str] = None, plan: Optional[List[str]] = None,
+               params: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        실행 기록 추가
+
+        Args:
+            fingerprint: 쿼리 지문
+            sql: 실행한 SQL
+            origin: 쿼리 출처 ('llm', 'report', 'explorer' 등)
+            elapsed: 실행 시간 (초)
+            rows: 결과 행 수
+            result_bytes: 결과 DataFrame 크기 (바이트)
+            cached: 결과 캐시 적중 여부
+            error: 오류 메시지 (실패한 경우)
+            plan: EXPLAIN QUERY PLAN 단계 목록 (느린 쿼리인 경우)
+            params: 쿼리 파라미터
+
+        Returns:
+            저장된 기록 딕셔너리
+        """
+        entry = {
+            'timestamp': time.time(),
+            'fingerprint': fingerprint,
+            'sql': sql,
+            'origin': origin,
+            'elapsed_ms': round(elapsed * 1000, 3),
+            'rows': rows,
+            'result_bytes': result_bytes,
+            'cached': cached,
+            'error': error,
+            'plan': plan,
+            'params': params,
+        }
+        with self._lock:
+            self._records.append(entry)
+
+        if self.slow_log_path and not cached and self.is_slow(elapsed):
+            self._append(self.slow_log_path, entry)
+        if self.workload_log_path and not cached and not error:
+            self._append(self.workload_log_path, entry, max_bytes=self.max_workload_bytes)
+        return entry
+
+    def _append(self, path: str, entry: Dict[str, Any], max_bytes: Optional[int] = None):
+        """기록을 JSONL 파일에 추가 (max_bytes를 넘으면 기존 파일을 .1로 넘김)"""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            line = json.dumps(entry, ensure_ascii=False, default=str)
+            with self._file_lock:
+                if max_bytes and os.path.exists(path) and os.path.getsize(path) > max_bytes:
+                    os.replace(path, path + ".1")
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+        except OSError:
+            # 로그 기록 실패가 쿼리 실행을 막지 않도록 무시
+            pass
+
+    def records(self) -> List[Dict[str, Any]]:
+        """링 버퍼의 기록 복사본 (오래된 순)"""
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        """링 버퍼 비우기"""
+        with self._lock:
+            self._records.clear()
+
+    def summary(self, include_cached: bool = False) -> pd.DataFrame:
+        """
+        쿼리 지문별 지연 시간 요약
+
+        Args:
+            include_cached: 캐시 적중 기록도 포함할지 여부
+
+        Returns:
+            지문별 실행 횟수, p50/p95/최대 지연 시간, 평균 결과 행 수 등을 담은 DataFrame
+            (p95 내림차순)
+        """
+        columns = ['fingerprint', 'origin', 'count', 'errors', 'p50_ms', 'p95_ms',
+                   'max_ms', 'avg_rows', 'avg_kb', 'sql']
+        records = [r for r in self.records() if include_cached or not r['cached']]
+        if not records:
+            return pd.DataFrame(columns=columns)
+
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for r in records:
+            groups.setdefault(r['fingerprint'], []).append(r)
+
+        rows = []
+        for fingerprint, items in groups.items():
+            elapsed = np.array([r['elapsed_ms'] for r in items])
+            origins = sorted({r['origin'] for r in items})
+            rows.append({
+                'fingerprint': fingerprint[:12],
+                'origin': ', '.join(origins),
+                'count': len(items),
+                'errors': sum(1 for r in items if r['error']),
+                'p50_ms': float(np.percentile(elapsed, 50)),
+                'p95_ms': float(np.percentile(elapsed, 95)),
+                'max_ms': float(elapsed.max()),
+                'avg_rows': float(np.mean([r['rows'] for r in items])),
+                'avg_kb': float(np.mean([r['result_bytes'] for r in items])) / 1024,
+                'sql': ' '.join(items[-1]['sql'].split())[:200],
+            })
+
+        return pd.DataFrame(rows, columns=columns).sort_values('p95_ms', ascending=False,
+                                                               ignore_index=True)
+
+
+_query_log: Optional[QueryLog] = None
+_query_log_lock = threading.Lock()
+
+
+def get_query_log(**kwargs) -> QueryLog:
+    """
+    프로세스 전역 쿼리 로그 조회 (없으면 생성)
+
+    Args:
+        **kwargs: 로그를 새로 만들 때 QueryLog에 전달할 설정
+
+    Returns:
+        QueryLog 인스턴스
+    """
+    global _query_log
+    with _query_log_lock:
+        if _query_log is None:
+            _query_log = QueryLog(**kwargs)
+        return _query_log
@@ -0,0 +1,270 @@
+"""
+EXPLAIN QUERY PLAN 분석 및 쿼리 비용 추정 모듈
+"""
+import math
+import re
+from typing import Optional, List, Dict, Any, Tuple
+
+
+# 행 수를 알 수 없는 테이블/서브쿼리에 사용할 추정값
+DEFAULT_UNKNOWN_ROWS = 1000
+
+# 인덱스 통계(sqlite_stat1)가 없을 때 사용할 선택도
+EQUALITY_SELECTIVITY = 0.1
+RANGE_SELECTIVITY = 0.25
+
+# FTS5 MATCH 조건으로 찾는 행 비율 (가상 테이블은 행 수 추정치를 제공하지 않음)
+FTS_MATCH_SELECTIVITY = 0.01
+
+# 커버링 인덱스 전체 스캔은 테이블 스캔보다 읽는 페이지가 적음
+COVERING_SCAN_WEIGHT = 0.5
+
+_LOOP_RE = re.compile(r'^(SCAN|SEARCH) (\S+)(?: AS (\S+))?')
+_INDEX_RE = re.compile(r'USING (?:COVERING |AUTOMATIC (?:PARTIAL )?COVERING |AUTOMATIC (?:PARTIAL )?)?INDEX (\S+)(?: \((.*)\))?')
+_TABLE_REF_RE = re.compile(
+    r'(?:\bFROM|\bJOIN|,)\s+"?([A-Za-z_]\w*)"?(?:\s+(?:AS\s+)?"?([A-Za-z_]\w*)"?)?',
+    re.IGNORECASE
+)
+_FTS_MATCH_RE = re.compile(r'VIRTUAL TABLE INDEX \d+:\S*M')
+_LIMIT_RE = re.compile(r'\bLIMIT\s+(\d+)(?:\s*(?:OFFSET|,)\s*\d+)?\s*$', re.IGNORECASE)
+_BLOCKING_RE = re.compile(r'\b(COUNT|SUM|AVG|MIN|MAX|TOTAL|GROUP_CONCAT)\s*\(|\bGROUP\s+BY\b|\bDISTINCT\b',
+                          re.IGNORECASE)
+
+# 테이블 별칭으로 오인하면 안 되는 키워드
+_ALIAS_STOPWORDS = {
+    'WHERE', 'JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'OUTER', 'CROSS', 'NATURAL',
+    'ON', 'USING', 'GROUP', 'ORDER', 'HAVING', 'LIMIT', 'UNION', 'EXCEPT',
+    'INTERSECT', 'WINDOW', 'AS', 'SELECT', 'VALUES', 'INDEXED', 'NOT',
+}
+
+
+class QueryPlanCost:
+    """
+    EXPLAIN QUERY PLAN 결과로부터 계산한 쿼리 비용 추정치
+
+    Attributes:
+        cost: 방문할 것으로 예상되는 행 수 기반 비용
+        estimated_rows: 예상 결과 행 수
+        full_scans: 인덱스 없이 전체 스캔하는 테이블 목록
+        nested_scans: 바깥 루프 안에서 반복해서 전체 스캔하는 테이블 목록
+        temp_btrees: 정렬/중복 제거용 임시 B-tree 사용 내역
+        plan: 계획 단계 설명 목록
+    """
+
+    def __init__(self, cost: float, estimated_rows: float, full_scans: List[str],
+                 nested_scans: List[str], temp_btrees: List[str], plan: List[str]):
+        self.cost = cost
+        self.estimated_rows = estimated_rows
+        self.full_scans = full_scans
+        self.nested_scans = nested_scans
+        self.temp_btrees = temp_btrees
+        self.plan = plan
+
+    def describe(self) -> str:
+        """사용자에게 보여줄 비용 요약"""
+        parts = [f"추정 비용 {self.cost:,.0f}", f"예상 결과 {self.estimated_rows:,.0f}행"]
+        if self.full_scans:
+            parts.append(f"전체 스캔: {', '.join(self.full_scans)}")
+        if self.nested_scans:
+            parts.append(f"중첩 스캔: {', '.join(self.nested_scans)}")
+        if self.temp_btrees:
+            parts.append(f"임시 B-tree {len(self.temp_btrees)}개")
+        return " / ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """로그 기록용 딕셔너리"""
+        return {
+            'cost': self.cost,
+            'estimated_rows': self.estimated_rows,
+            'full_scans': self.full_scans,
+            'nested_scans': self.nested_scans,
+            'temp_btrees': self.temp_btrees,
+            'plan': self.plan,
+        }
+
+
+def resolve_aliases(query: str, tables: List[str]) -> Dict[str, str]:
+    """
+    FROM/JOIN 절에서 별칭 -> 테이블 이름 매핑 추출
+
+    Args:
+        query: SQL 쿼리
+        tables: 알려진 테이블/뷰 이름 목록
+
+    Returns:
+        {별칭 또는 테이블 이름: 테이블 이름}
+    """
+    known = {t.lower(): t for t in tables}
+    aliases = {}
+    for name, alias in _TABLE_REF_RE.findall(query):
+        table = known.get(name.lower())
+        if table is None:
+            continue
+        aliases[table] = table
+        if alias and alias.upper() not in _ALIAS_STOPWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def query_limit(query: str) -> Optional[int]:
+    """최상위 LIMIT 값 (없으면 None)"""
+    match = _LIMIT_RE.search(query.strip().rstrip(';'))
+    return int(match.group(1)) if match else None
+
+
+def _build_tree(plan_rows: List[tuple]) -> Dict[int, List[tuple]]:
+    """(id, parent, notused, detail) 행을 부모 id별 자식 목록으로 변환"""
+    children: Dict[int, List[tuple]] = {}
+    for row in plan_rows:
+        node_id, parent, detail = row[0], row[1], row[-1]
+        children.setdefault(parent, []).append((node_id, detail))
+    return children
+
+
+class _PlanEstimator:
+    """계획 트리를 순회하며 비용을 누적하는 내부 클래스"""
+
+    def __init__(self, children: Dict[int, List[tuple]], row_counts: Dict[str, int],
+                 index_stats: Dict[str, List[int]], aliases: Dict[str, str]):
+        self.children = children
+        self.row_counts = row_counts
+        self.index_stats = index_stats
+        self.aliases = aliases
+        self.derived: Dict[str, float] = {}   # 구체화된 서브쿼리/뷰 이름 -> 예상 행 수
+        self.full_scans: List[str] = []
+        self.nested_scans: List[str] = []
+        self.temp_btrees: List[str] = []
+
+    def _table_rows(self, name: str) -> float:
+        if name in self.derived:
+            return self.derived[name]
+        table = self.aliases.get(name, name)
+        return float(self.row_counts.get(table, DEFAULT_UNKNOWN_ROWS))
+
+    def _search_rows(self, detail: str, total: float) -> float:
+        """SEARCH 단계에서 인덱스로 찾을 것으로 예상되는 행 수"""
+        if 'INTEGER PRIMARY KEY' in detail or 'USING PRIMARY KEY' in detail:
+            if '=' in detail and '>' not in detail and '<' not in detail:
+                return 1.0
+            return max(1.0, total * RANGE_SELECTIVITY)
+
+        match = _INDEX_RE.search(detail)
+        condition = match.group(2) if match and match.group(2) else ''
+        eq_terms = condition.count('=?')
+        has_range = '>' in condition or '<' in condition
+
+        stats = self.index_stats.get(match.group(1)) if match else None
+        if stats and eq_terms and len(stats) > eq_terms:
+            rows = float(stats[eq_terms])
+        elif eq_terms:
+            rows = total * EQUALITY_SELECTIVITY ** eq_terms
+        else:
+            rows = total
+        if has_range:
+            rows *= RANGE_SELECTIVITY
+        return max(1.0, rows)
+
+    def estimate(self, parent: int) -> Tuple[float, float]:
+        """
+        부모 노드 아래 단계들의 (비용, 출력 행 수) 계산
+
+        같은 부모 아래의 SCAN/SEARCH 단계는 바깥→안쪽 순서의 중첩 루프이므로
+        각 단계의 반복 횟수는 앞선 단계들의 행 수 곱이 됩니다.
+        """
+        cost = 0.0
+        loop_product = 1.0
+        loops = 0
+
+        for node_id, detail in self.children.get(parent, []):
+            match = _LOOP_RE.match(detail)
+            if match:
+                name = match.group(2)
+                table = self.aliases.get(name, name)
+                total = self._table_rows(name)
+
+                if match.group(1) == 'SEARCH':
+                    rows = self._search_rows(detail, total)
+                    weight = 1.0
+                elif _FTS_MATCH_RE.search(detail):
+                    rows = max(1.0, total * FTS_MATCH_SELECTIVITY)
+                    weight = 1.0
+                else:
+                    rows = total
+                    covering = 'COVERING INDEX' in detail
+                    weight = COVERING_SCAN_WEIGHT if covering else 1.0
+                    if 'INDEX' not in detail and name not in self.derived:
+                        self.full_scans.append(table)
+                        if loops > 0:
+                            self.nested_scans.append(table)
+
+                cost += loop_product * rows * weight
+                loop_product *= rows
+                loops += 1
+
+            elif detail.startswith('USE TEMP B-TREE'):
+                n = max(loop_product, 1.0)
+                cost += n * math.log2(n + 1)
+                self.temp_btrees.append(detail)
+
+            elif detail.startswith(('MATERIALIZE', 'CO-ROUTINE')):
+                sub_cost, sub_rows = self.estimate(node_id)
+                cost += sub_cost
+                self.derived[detail.split(' ', 1)[1]] = sub_rows
+
+            elif 'SUBQUERY' in detail and not detail.startswith('LEFT-MOST'):
+                sub_cost, _ = self.estimate(node_id)
+                # 상관 서브쿼리는 바깥 루프의 행마다 다시 실행됨
+                cost += sub_cost * (loop_product if 'CORRELATED' in detail else 1.0)
+
+            elif detail.startswith('COMPOUND QUERY'):
+                compound_rows = 0.0
+                for part_id, part_detail in self.children.get(node_id, []):
+                    sub_cost, sub_rows = self.estimate(part_id)
+                    cost += sub_cost
+                    compound_rows += sub_rows
+                    if 'TEMP B-TREE' in part_detail:
+                        cost += sub_rows * math.log2(sub_rows + 1)
+                        self.temp_btrees.append(part_detail)
+                loop_product *= max(compound_rows, 1.0)
+                loops += 1
+
+            else:
+                sub_cost, _ = self.estimate(node_id)
+                cost += sub_cost
+
+        return cost, (loop_product if loops else 1.0)
+
+
+def estimate_plan_cost(query: str, plan_rows: List[tuple], row_counts: Dict[str, int],
+                       index_stats: Optional[Dict[str, List[int]]] = None) -> QueryPlanCost:
+    """
+    EXPLAIN QUERY PLAN 결과로 쿼리 비용 추정
+
+    Args:
+        query: 원본 SQL 쿼리 (별칭과 LIMIT 해석용)
+        plan_rows: EXPLAIN QUERY PLAN 결과 행 (id, parent, notused, detail)
+        row_counts: 테이블별 행 수
+        index_stats: 인덱스별 sqlite_stat1 통계 [전체 행 수, 키별 평균 행 수, ...]
+
+    Returns:
+        QueryPlanCost 인스턴스
+    """
+    aliases = resolve_aliases(query, list(row_counts))
+    estimator = _PlanEstimator(_build_tree(plan_rows), row_counts, index_stats or {}, aliases)
+    cost, rows = estimator.estimate(0)
+
+    # 정렬/집계가 없는 쿼리는 LIMIT 행을 채우는 즉시 스캔이 끝남
+    limit = query_limit(query)
+    if limit is not None:
+        if not estimator.temp_btrees and not _BLOCKING_RE.search(query) and rows > limit:
+            cost *= limit / rows
+        rows = min(rows, limit)
+
+    return QueryPlanCost(
+        cost=cost,
+        estimated_rows=rows,
+        full_scans=estimator.full_scans,
+        nested_scans=estimator.nested_scans,
+        temp_btrees=estimator.temp_btrees,
+        plan=[row[-1] for row in plan_rows],
+    )
@@ -0,0 +1,210 @@
+"""
+한국어 질문 유사도 검색 모듈 (문자 n-gram TF-IDF)
+"""
+import math
+import re
+import unicodedata
+from typing import Optional, List, Dict, Tuple
+
+
+# 이 값 이상으로 비슷한 질문의 SQL을 재사용 (코사인 유사도)
+DEFAULT_SIMILARITY_THRESHOLD = 0.85
+
+# 단어마다 만들 문자 n-gram 길이 (경계 표시 포함)
+NGRAM_SIZES = (1, 2, 3)
+
+# 단어 끝에서 떼어낼 조사/어미 (긴 것부터 검사)
+PARTICLES = sorted([
+    '에서는', '으로는', '이라는', '에서', '으로', '에게', '까지', '부터', '처럼', '보다',
+    '마다', '별로', '이란', '별', '은', '는', '이', '가', '을', '를', '의', '에', '로',
+    '와', '과', '도', '만', '인', '요',
+], key=len, reverse=True)
+
+# 질문 의미와 관계없는 요청 표현
+STOPWORDS = {
+    '보여줘', '보여주세요', '보여', '알려줘', '알려주세요', '알려', '줘', '주세요',
+    '뭐야', '뭐', '무엇', '무엇인가', '어떤', '어떻게', '해줘', '좀', '찾아줘', '나열해줘',
+}
+
+# 값이 다르면 다른 SQL이 필요한 비교/정렬 표현 (두 질문이 모두 같은 집합을 가져야 재사용)
+CONTRAST_STEMS = {
+    '이상', '이하', '초과', '미만', '높', '낮', '많', '적', '길', '긴', '짧', '최대', '최소',
+    '상위', '하위', '오름차순', '내림차순', '큰', '작', '증가', '감소', '제외', '아닌',
+}
+
+# 결과 행의 종류를 가리키는 명사 (어간 접두어 -> 종류). 종류가 다르면 SELECT/GROUP BY가 다름
+ROW_TYPE_STEMS = {
+    '곡': 'track', '노래': 'track', '트랙': 'track', '음악': 'track',
+    '장르': 'genre',
+    '아티스트': 'artist', '가수': 'artist', '뮤지션': 'artist', '밴드': 'artist',
+    '앨범': 'album',
+}
+
+# 부정 표현 (어간 접두어). "인기 있는"과 "인기 없는"은 반대 조건
+NEGATION_STEMS = ('없', '않', '아닌', '못')
+
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+_LATIN_RE = re.compile(r'^[a-z][a-z0-9_]*$')
+_PUNCT_RE = re.compile(r'[^\w\s.]')
+
+
+def tokenize_question(question: str) -> List[str]:
+    """
+    질문을 조사와 요청 표현을 뗀 단어 목록으로 변환
+
+    Args:
+        question: 자연어 질문
+
+    Returns:
+        정규화된 단어 목록
+    """
+    text = unicodedata.normalize('NFKC', question).lower()
+    text = _PUNCT_RE.sub(' ', text)
+    tokens = []
+    for word in text.split():
+        word = word.strip('.')
+        if _NUMBER_RE.fullmatch(word) is None:
+            for particle in PARTICLES:
+                if word.endswith(particle) and len(word) > len(particle):
+                    word = word[:-len(particle)]
+                    break
+        if word and word not in STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+
+def question_signature(tokens: List[str]) -> Tuple:
+    """
+    재사용하려면 정확히 같아야 하는 부분 - 숫자, 영문 단어(아티스트 이름 등), 비교 표현,
+    결과 행 종류(곡/장르/아티스트/앨범), 부정 표현
+    """
+    numbers = sorted(token for token in tokens if _NUMBER_RE.fullmatch(token))
+    latin = sorted(token for token in tokens if _LATIN_RE.match(token))
+    contrast = sorted({token if token in CONTRAST_STEMS else token[:-1] for token in tokens
+                       if token in CONTRAST_STEMS or token[:-1] in CONTRAST_STEMS})
+    row_types = sorted({kind for token in tokens for stem, kind in ROW_TYPE_STEMS.items()
+                        if token.startswith(stem)})
+    negated = any(token.startswith(NEGATION_STEMS) for token in tokens)
+    return tuple(numbers), tuple(latin), tuple(contrast), tuple(row_types), negated
+
+
+def question_ngrams(tokens: List[str]) -> Dict[str, int]:
+    """단어별 문자 n-gram 빈도 (단어 경계를 포함해 어순이 달라도 같은 n-gram이 나옴)"""
+    counts: Dict[str, int] = {}
+    for token in tokens:
+        padded = f'<{token}>'
+        for size in NGRAM_SIZES:
+            for i in range(len(padded) - size + 1):
+                gram = padded[i:i + size]
+                if gram in ('<', '>'):
+                    continue
+                counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+class QuestionIndex:
+    """
+    질문 문자 n-gram TF-IDF 역색인
+
+    n-gram마다 그 n-gram을 가진 질문 목록(posting)을 유지하므로 삽입은 질문 길이에만
+    비례합니다. 조회 시에는 드문 n-gram부터 골라, 나머지 흔한 n-gram만 공유해서는
+    기준 유사도에 도달할 수 없는 지점까지만 posting을 읽어 후보를 모읍니다
+    (prefix filtering). 흔한 n-gram의 긴 posting은 읽지 않으므로 색인이 커져도
+    조회 비용이 전체 질문 수에 비례해 늘지 않고, 기준 이상인 질문은 빠짐없이 찾습니다.
+    IDF는 조회 시점의 문서 빈도로 계산하므로 삽입 후 재색인이 필요 없습니다.
+    """
+
+    def __init__(self):
+        self._docs: Dict[str, Tuple[Dict[str, int], Tuple]] = {}   # ID -> (n-gram 빈도, 서명)
+        self._postings: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    def add(self, doc_id: str, question: str):
+        """
+        질문 추가 (같은 ID가 있으면 교체)
+
+        Args:
+            doc_id: 질문 ID (캐시 키)
+            question: 자연어 질문
+        """
+        self.remove(doc_id)
+        tokens = tokenize_question(question)
+        grams = question_ngrams(tokens)
+        if not grams:
+            return
+        self._docs[doc_id] = (grams, question_signature(tokens))
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(doc_id)
+
+    def remove(self, doc_id: str):
+        """질문 삭제 (없으면 무시)"""
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        for gram in entry[0]:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def _idf(self, gram: str) -> float:
+        """부드럽게 만든 역문서 빈도"""
+        df = len(self._postings.get(gram, ()))
+        return math.log((1 + len(self._docs)) / (1 + df)) + 1
+
+    def _weights(self, grams: Dict[str, int]) -> Dict[str, float]:
+        """로그 스케일 TF x IDF 가중치"""
+        return {gram: (1 + math.log(count)) * self._idf(gram) for gram, count in grams.items()}
+
+    def search(self, question: str, threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+               limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        비슷한 질문 검색
+
+        Args:
+            question: 자연어 질문
+            threshold: 최소 코사인 유사도
+            limit: 최대 결과 수
+
+        Returns:
+            (질문 ID, 유사도) 목록 (유사도 내림차순, 숫자/영문/비교 표현/결과 행 종류/부정이
+            다른 질문 제외)
+        """
+        tokens = tokenize_question(question)
+        weights = self._weights(question_ngrams(tokens))
+        if not weights or not self._docs:
+            return []
+        signature = question_signature(tokens)
+        query_norm = math.sqrt(sum(w * w for w in weights.values()))
+
+        # 가중치가 큰(드문) n-gram부터 읽다가, 남은 n-gram만으로 기준에 못 미치면 중단
+        ordered = sorted(weights.items(), key=lambda item: item[1], reverse=True)
+        remaining = query_norm * query_norm
+        bound = (threshold * query_norm) ** 2
+        candidates = set()
+        for gram, weight in ordered:
+            if remaining < bound:
+                break
+            candidates.update(self._postings.get(gram, ()))
+            remaining -= weight * weight
+
+        results = []
+        for doc_id in candidates:
+            grams, doc_signature = self._docs[doc_id]
+            if doc_signature != signature:
+                continue
+            doc_weights = self._weights(grams)
+            dot = sum(weight * doc_weights[gram] for gram, weight in weights.items()
+                      if gram in doc_weights)
+            doc_norm = math.sqrt(sum(w * w for w in doc_weights.values()))
+            score = dot / (query_norm * doc_norm)
+            if score >= threshold:
+                results.append((doc_id, score))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:limit]
@@ -0,0 +1,306 @@
+"""
+질문 기반 스키마 축소 모듈 (Text-to-SQL 프롬프트용)
+"""
+import math
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+
+from modules.question_index import tokenize_question
+
+
+# 축소한 스키마 문자열의 기본 토큰 예산 (전체 스키마는 약 1,000토큰)
+DEFAULT_SCHEMA_TOKEN_BUDGET = 500
+
+# 질문 신호별로 보관할 축소 스키마 수
+DEFAULT_SCHEMA_CACHE_SIZE = 256
+
+# 컬럼 이름(접두어/접미어를 뗀 기본 이름) -> 한국어/영어 동의어
+COLUMN_SYNONYMS = {
+    'popularity': ['인기', '유명', '히트'],
+    'danceability': ['댄스', '춤', '댄서블'],
+    'energy': ['에너지', '신나는', '강렬', '격렬'],
+    'tempo': ['템포', '빠르기', 'bpm', '빠른', '느린'],
+    'valence': ['긍정', '밝은', '행복', '기분', '우울', '슬픈', '밸런스', '발렌스'],
+    'acousticness': ['어쿠스틱', '통기타'],
+    'instrumentalness': ['연주곡', '인스트루멘탈', '악기', '보컬없는'],
+    'liveness': ['라이브', '현장', '공연'],
+    'speechiness': ['스피치', '말하는', '랩', '낭독'],
+    'loudness': ['음량', '볼륨', '시끄러운', '소리크기', '데시벨'],
+    'duration': ['길이', '긴', '짧', '재생시간', '러닝타임', '몇분'],
+    'explicit': ['19금', '성인', '욕설', '선정', '청소년'],
+    'key': ['조성', '음계'],
+    'mode': ['장조', '단조', '메이저', '마이너'],
+    'time_signature': ['박자'],
+    'track_genre': ['장르'],
+    'genre_name': ['장르'],
+    'artists': ['아티스트', '가수', '뮤지션', '밴드', '그룹'],
+    'artist_name': ['아티스트', '가수', '뮤지션', '밴드', '그룹'],
+    'album_name': ['앨범'],
+    'track_name': ['곡명', '제목', '곡이름', '노래이름'],
+    'track_count': ['곡수', '개수', '몇곡', '트랙수', '많은곡', '가장많'],
+    'position': ['대표아티스트', '피처링', '참여'],
+    'bucket': ['구간'],
+}
+
+# 테이블 -> 테이블 자체를 가리키는 표현
+TABLE_SYNONYMS = {
+    'tracks': ['곡', '노래', '트랙', '음악'],
+    'artists': ['아티스트', '가수', '뮤지션', '밴드'],
+    'track_artists': ['피처링', '참여', '공동'],
+    'genres': ['장르목록', '장르종류'],
+    'albums': ['앨범'],
+    'tracks_fts': ['들어간', '포함', '단어', '검색'],
+    'genre_summary': ['장르'],
+    'popularity_summary': ['인기도구간', '인기구간', '인기도별', '구간별'],
+}
+
+# 테이블을 포함하면 질문과 관계없이 항상 넣는 컬럼 (식별/조인 키)
+CORE_COLUMNS = {
+    'tracks': ['track_id', 'track_name', 'artists'],
+    'artists': ['artist_id', 'artist_name'],
+    'track_artists': ['track_id', 'artist_id', 'position'],
+    'genres': ['genre_name'],
+    'albums': ['album_name'],
+    'tracks_fts': ['track_id', 'track_name', 'artists', 'album_name'],
+    'genre_summary': ['track_genre'],
+    'popularity_summary': ['bucket'],
+}
+
+# 질문에 컬럼 값(장르 이름 등)이 나왔을 때 그 컬럼과 컬럼을 가진 테이블에 주는 점수
+VALUE_MATCH_SCORE = 10.0
+
+# 질문에 컬럼과 맞지 않는 영문 단어나 따옴표 문자열(아티스트/곡 이름 추정)이 있으면 넣을 테이블
+ENTITY_TABLES = ('tracks', 'artists', 'track_artists', 'tracks_fts')
+
+# 집계 컬럼 이름에서 떼어 기본 이름을 찾을 접두어/접미어
+_COLUMN_PREFIXES = ('avg_', 'max_', 'min_')
+_COLUMN_SUFFIXES = ('_sum', '_count', '_ms', '_sec')
+
+_QUOTED_RE = re.compile(r'["\'“”‘’]([^"\'“”‘’]+)["\'“”‘’]')
+_LATIN_RE = re.compile(r'^[a-z][a-z0-9_]*$')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    LLM 토큰 수 추정 (영문/기호는 약 4자, 한글은 약 1.5자당 1토큰)
+
+    Args:
+        text: 문자열
+
+    Returns:
+        추정 토큰 수
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5)
+
+
+def _column_synonyms(column: str) -> Tuple[List[str], List[str]]:
+    """
+    컬럼 동의어 (소문자, 공백 없음)
+
+    Returns:
+        (컬럼 자체의 이름/동의어, 집계 컬럼의 기본 이름 동의어 - 예: avg_tempo -> 템포)
+    """
+    base = column
+    for prefix in _COLUMN_PREFIXES:
+        if base.startswith(prefix):
+            base = base[len(prefix):]
+    for suffix in _COLUMN_SUFFIXES:
+        if base.endswith(suffix) and base not in COLUMN_SYNONYMS:
+            base = base[:-len(suffix)]
+    direct = [column.lower()] + COLUMN_SYNONYMS.get(column, [])
+    derived = [] if base == column else [base.lower()] + COLUMN_SYNONYMS.get(base, [])
+    return direct, [synonym for synonym in derived if synonym not in direct]
+
+
+class SchemaLinker:
+    """
+    질문과 관련된 테이블/컬럼만 남긴 스키마 생성기
+
+    질문을 정규화해 테이블/컬럼 이름과 동의어 사전에 맞는 표현을 찾아 점수를 매기고,
+    관련 테이블(과 그 사이의 연결 테이블), 식별 컬럼, 점수가 있는 컬럼만으로 스키마를
+    만듭니다. 카탈로그의 컬럼 값 목록(장르 이름 등)도 어휘로 써서 "rock 곡"의 rock을
+    아티스트 이름이 아닌 track_genre 조건으로 연결합니다. 토큰 예산을 넘으면 점수가 낮은 컬럼부터 뺍니다. 질문에서 아무것도 찾지
+    못하면 전체 스키마를 그대로 씁니다. 축소 결과는 맞은 테이블/컬럼 조합(질문 신호)별로
+    캐시하므로 표현만 다른 질문은 같은 문자열을 재사용합니다.
+    """
+
+    def __init__(self, catalog: Any, token_budget: int = DEFAULT_SCHEMA_TOKEN_BUDGET,
+                 cache_size: int = DEFAULT_SCHEMA_CACHE_SIZE):
+        """
+        Args:
+            catalog: 스키마 카탈로그 (SchemaCatalog)
+            token_budget: 축소한 스키마의 최대 추정 토큰 수
+            cache_size: 보관할 축소 스키마 수
+        """
+        self.catalog = catalog
+        self.token_budget = token_budget
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._column_synonyms: Dict[str, Dict[str, Tuple[List[str], List[str]]]] = {
+            table: {name: _column_synonyms(name) for name in catalog.schemas[table]['name']}
+            for table in catalog.tables
+        }
+        # 이름 검색 신호에서 제외할 영문 단어 (컬럼 이름과 동의어)
+        self._known_words = {'top', 'vs', 'id'} | {
+            synonym for columns in self._column_synonyms.values()
+            for direct, derived in columns.values() for synonym in direct + derived
+        }
+
+        # 컬럼 값 어휘: 컬럼 -> 값 패턴 (긴 값부터, k-pop의 pop처럼 다른 값 안에 든 경우 제외)
+        self._value_patterns: Dict[str, re.Pattern] = {}
+        self._known_values: Dict[str, str] = {}
+        for column, values in getattr(catalog, 'column_values', {}).items():
+            normalized = sorted({unicodedata.normalize('NFKC', value).lower() for value in values},
+                                key=len, reverse=True)
+            if not normalized:
+                continue
+            self._value_patterns[column] = re.compile(
+                r'(?<![a-z0-9\-])(?:' + '|'.join(map(re.escape, normalized)) + r')(?![a-z0-9\-])'
+            )
+            self._known_values.update({value: column for value in normalized})
+
+    def score(self, question: str) -> Tuple[Dict[str, float], Dict[str, Dict[str, float]], bool]:
+        """
+        질문과 테이블/컬럼의 관련도 점수
+
+        Args:
+            question: 자연어 질문
+
+        Returns:
+            (테이블 점수, 테이블별 컬럼 점수, 이름 검색이 필요한지 여부).
+            테이블 점수는 테이블 동의어, 식별 컬럼이 아닌 컬럼 자체 동의어, 컬럼 값으로만 매기고,
+            집계 컬럼의 기본 이름(avg_tempo의 템포 등)은 이미 포함된 테이블의 컬럼 점수에만 씁니다.
+        """
+        text = unicodedata.normalize('NFKC', question).lower()
+        compact = _SPACE_RE.sub('', text)
+
+        column_scores: Dict[str, Dict[str, float]] = {}
+        table_scores: Dict[str, float] = {}
+        for table, columns in self._column_synonyms.items():
+            scores = {}
+            table_score = sum(2.0 for synonym in TABLE_SYNONYMS.get(table, []) if synonym in compact)
+            core = CORE_COLUMNS.get(table, [])
+            for name, (direct, derived) in columns.items():
+                matched = [synonym for synonym in direct if synonym in compact]
+                if matched and name not in core:
+                    table_score += max(len(synonym) for synonym in matched)
+                matched += [synonym for synonym in derived if synonym in compact]
+                if matched:
+                    # 긴 표현이 맞을수록 확실한 신호
+                    scores[name] = float(max(len(synonym) for synonym in matched))
+            column_scores[table] = scores
+            if table_score > 0:
+                table_scores[table] = table_score
+
+        # 컬럼 값(장르 이름 등)이 나오면 그 컬럼을 가진 테이블과 컬럼에 점수
+        remainder = text
+        for column, pattern in self._value_patterns.items():
+            if not pattern.search(remainder):
+                continue
+            remainder = pattern.sub(' ', remainder)
+            for table, columns in self._column_synonyms.items():
+                if column in columns:
+                    column_scores[table][column] = max(column_scores[table].get(column, 0.0),
+                                                       VALUE_MATCH_SCORE)
+                    table_scores[table] = table_scores.get(table, 0.0) + VALUE_MATCH_SCORE
+
+        # 컬럼 이름/값이 아닌 영문 단어나 따옴표 문자열은 아티스트/곡 이름일 가능성이 높음
+        quoted = [value for value in _QUOTED_RE.findall(question)
+                  if unicodedata.normalize('NFKC', value).lower().strip() not in self._known_values]
+        entity = bool(quoted) or any(
+            _LATIN_RE.match(token) and token not in self._known_words
+            for token in tokenize_question(remainder)
+        )
+        return table_scores, column_scores, entity
+
+    def _select(self, table_scores: Dict[str, float], column_scores: Dict[str, Dict[str, float]],
+                entity: bool) -> Dict[str, Dict[str, float]]:
+        """포함할 테이블과 컬럼(점수, 식별 컬럼은 무한대) 선택"""
+        tables = set(table_scores)
+        if entity:
+            tables.update(table for table in ENTITY_TABLES if table in self.catalog.tables)
+
+        # 관계 양 끝 테이블이 모두 포함되면 사이의 연결 테이블도 포함
+        for required, _ in self.catalog.relationships:
+            if len(required) >= 3 and required[0] in tables and required[-1] in tables:
+                tables.update(required[1:-1])
+
+        selection = {}
+        for table in self.catalog.tables:
+            if table not in tables:
+                continue
+            names = list(self.catalog.schemas[table]['name'])
+            columns = {name: score for name, score in column_scores.get(table, {}).items()}
+            for name in CORE_COLUMNS.get(table, names[:1]):
+                if name in names:
+                    columns[name] = math.inf
+            selection[table] = columns
+        return selection
+
+    def prune(self, question: str) -> str:
+        """
+        질문 관련 부분만 남긴 LLM용 스키마 문자열
+
+        Args:
+            question: 자연어 질문
+
+        Returns:
+            축소한 스키마 문자열 (관련 테이블을 찾지 못하면 전체 스키마)
+        """
+        table_scores, column_scores, entity = self.score(question)
+        if not table_scores and not entity:
+            return self.catalog.llm_schema
+
+        selection = self._select(table_scores, column_scores, entity)
+        signature = (entity, tuple(sorted((table, tuple(sorted(columns)))
+                                          for table, columns in selection.items())))
+        with self._lock:
+            cached = self._cache.get(signature)
+            if cached is not None:
+                self._cache.move_to_end(signature)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        schema = self._render_within_budget(selection)
+        with self._lock:
+            self._cache[signature] = schema
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return schema
+
+    def _render_within_budget(self, selection: Dict[str, Dict[str, float]]) -> str:
+        """토큰 예산을 넘으면 점수가 낮은 컬럼부터 빼며 렌더링"""
+        selection = {table: dict(columns) for table, columns in selection.items()}
+        while True:
+            schema = self.catalog.render_llm_schema(
+                {table: list(columns) for table, columns in selection.items()}
+            )
+            if estimate_tokens(schema) <= self.token_budget:
+                return schema
+            droppable = [(score, table, name) for table, columns in selection.items()
+                         for name, score in columns.items() if score != math.inf]
+            if not droppable:
+                return schema
+            _, table, name = min(droppable)
+            del selection[table][name]
+
+    def stats(self) -> Dict[str, Any]:
+        """축소 스키마 캐시 통계"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,360 @@
+"""
+Text-to-SQL 결과 영구 캐시 모듈
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator, Tuple
+
+from modules.question_index import QuestionIndex
+
+
+# 캐시 파일 경로 (앱 재시작과 여러 프로세스 사이에서 공유)
+DEFAULT_SQL_CACHE_PATH = 'data/llm_sql_cache.db'
+
+# 보관할 최대 항목 수 (넘으면 가장 오래 사용되지 않은 항목부터 제거)
+DEFAULT_MAX_ENTRIES = 5000
+
+# 항목 유효 기간 (초) - 모델이 개선되면 새로 생성하도록 7일
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+# 프롬프트 형식이 바뀌면 올려서 기존 항목이 재사용되지 않도록 함
+PROMPT_VERSION = 1
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_TRAILING_PUNCT_RE = re.compile(r'[\s?？.!。]+$')
+
+
+def normalize_question(question: str) -> str:
+    """
+    캐시 키 계산을 위한 질문 정규화
+
+    유니코드 호환 문자(NFKC)와 공백, 대소문자, 끝의 물음표/마침표 차이를 없앱니다.
+
+    Args:
+        question: 자연어 질문
+
+    Returns:
+        정규화된 질문
+    """
+    text = unicodedata.normalize('NFKC', question)
+    text = _WHITESPACE_RE.sub(' ', text).strip().lower()
+    return _TRAILING_PUNCT_RE.sub('', text)
+
+
+def schema_hash(schema: str) -> str:
+    """스키마 문자열 해시 (스키마나 통계가 바뀌면 캐시 키도 바뀜)"""
+    return hashlib.sha1(schema.encode('utf-8')).hexdigest()
+
+
+def sql_cache_key(question: str, schema: str, model: str = '') -> str:
+    """
+    정규화된 질문, 스키마 해시, 모델 이름, 프롬프트 버전으로 만든 캐시 키
+
+    Args:
+        question: 자연어 질문
+        schema: LLM에 제공한 스키마 문자열
+        model: SQL을 생성한 모델 이름
+
+    Returns:
+        16진수 해시 문자열
+    """
+    key = f"{PROMPT_VERSION}\x00{model}\x00{normalize_question(question)}\x00{schema_hash(schema)}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class SQLCache:
+    """
+    생성된 SQL의 SQLite 기반 영구 캐시
+
+    같은 질문(정규화 후)과 같은 스키마에 대한 SQL을 디스크에 저장해 앱 재시작이나
+    다른 사용자 세션에서도 LLM 호출 없이 바로 돌려줍니다. 정확히 같은 질문이 없으면
+    같은 스키마/모델로 답한 질문 중 표현만 다른 질문을 유사도 색인에서 찾습니다.
+    유효 기간(TTL)이 지난 항목은 조회 시 제거하고, 항목 수가 한도를 넘으면 LRU 방식으로
+    제거합니다. 캐시 파일 오류는 조회 실패로 처리해 SQL 생성을 막지 않습니다.
+    """
+
+    def __init__(self, path: str = DEFAULT_SQL_CACHE_PATH,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, ttl: Optional[float] = DEFAULT_TTL):
+        """
+        Args:
+            path: 캐시 SQLite 파일 경로
+            max_entries: 최대 항목 수
+            ttl: 항목 유효 기간 (초, None이면 만료 없음)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        # (스키마 해시, 모델)별 질문 유사도 색인과 색인에 반영한 마지막 seq
+        self._indexes: Dict[Tuple[str, str], QuestionIndex] = {}
+        self._indexed_seq = 0
+
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.errors = 0
+        self.saved_seconds = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # 유사도 색인이 새 항목을 seq로 따라가므로 seq가 없는 이전 형식 캐시는 새로 만듦
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(sql_cache)")]
+            if columns and 'seq' not in columns:
+                conn.execute("DROP TABLE sql_cache")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sql_cache (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL UNIQUE,
+                    question TEXT NOT NULL,
+                    schema_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    generation_ms REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sql_cache_last_used ON sql_cache(last_used)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """작업마다 새 연결을 열고 커밋 후 닫기 (스레드/프로세스 간 동시성은 SQLite 잠금에 맡김)"""
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _sync_indexes(self, conn: sqlite3.Connection):
+        """다른 세션/프로세스가 추가한 항목까지 유사도 색인에 반영 (잠금 상태에서 호출)"""
+        rows = conn.execute(
+            "SELECT seq, key, question, schema_hash, model FROM sql_cache WHERE seq > ? ORDER BY seq",
+            (self._indexed_seq,)
+        ).fetchall()
+        for seq, key, question, hash_value, model in rows:
+            self._indexes.setdefault((hash_value, model), QuestionIndex()).add(key, question)
+            self._indexed_seq = seq
+
+    def _find_similar(self, conn: sqlite3.Connection, question: str, schema: str, model: str,
+                      threshold: float, now: float) -> Optional[Dict[str, Any]]:
+        """유사도 색인에서 기준 이상인 질문 중 아직 유효한 항목 조회 (잠금 상태에서 호출)"""
+        self._sync_indexes(conn)
+        index = self._indexes.get((schema_hash(schema), model))
+        if index is None:
+            return None
+        for key, score in index.search(question, threshold):
+            row = conn.execute(
+                "SELECT sql, generation_ms, created_at, question FROM sql_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl is not None and now - row[2] > self.ttl):
+                # 다른 곳에서 제거/만료된 항목은 색인에서도 삭제
+                index.remove(key)
+                continue
+            return {'key': key, 'sql': row[0], 'generation_ms': row[1], 'question': row[3],
+                    'score': score}
+        return None
+
+    def match(self, question: str, schema: str, model: str = '',
+              similarity_threshold: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        캐시 조회 (정확히 같은 질문 → 비슷한 질문 순)
+
+        Args:
+            question: 자연어 질문
+            schema: LLM에 제공한 스키마 문자열
+            model: SQL을 생성한 모델 이름
+            similarity_threshold: 비슷한 질문으로 인정할 최소 유사도 (None이면 정확히 같은 질문만)
+
+        Returns:
+            {'sql', 'question'(캐시된 질문), 'score'(유사도, 정확히 같으면 1.0), 'similar'}
+            딕셔너리 (없거나 만료되었으면 None)
+        """
+        key = sql_cache_key(question, schema, model)
+        now = time.time()
+        found = None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT sql, generation_ms, created_at, question FROM sql_cache WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row is not None and self.ttl is not None and now - row[2] > self.ttl:
+                    conn.execute("DELETE FROM sql_cache WHERE key = ?", (key,))
+                    with self._lock:
+                        self.expirations += 1
+                    row = None
+                if row is not None:
+                    found = {'key': key, 'sql': row[0], 'generation_ms': row[1],
+                             'question': row[3], 'score': 1.0}
+                elif similarity_threshold is not None:
+                    with self._lock:
+                        found = self._find_similar(conn, question, schema, model,
+                                                   similarity_threshold, now)
+                if found is not None:
+                    conn.execute("UPDATE sql_cache SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                                 (now, found['key']))
+        except sqlite3.Error:
+            with self._lock:
+                self.errors += 1
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            if found['key'] == key:
+                self.hits += 1
+            else:
+                self.similar_hits += 1
+            self.saved_seconds += found['generation_ms'] / 1000
+        return {'sql': found['sql'], 'question': found['question'], 'score': found['score'],
+                'similar': found['key'] != key}
+
+    def get(self, question: str, schema: str, model: str = '') -> Optional[str]:
+        """
+        정확히 같은 질문의 캐시 조회
+
+        Args:
+            question: 자연어 질문
+            schema: LLM에 제공한 스키마 문자열
+            model: SQL을 생성한 모델 이름
+
+        Returns:
+            캐시된 SQL (없거나 만료되었으면 None)
+        """
+        found = self.match(question, schema, model)
+        return found['sql'] if found else None
+
+    def put(self, question: str, schema: str, sql: str, model: str = '',
+            generation_ms: float = 0.0):
+        """
+        생성된 SQL 저장 (한도를 넘으면 오래 사용되지 않은 항목부터 제거)
+
+        Args:
+            question: 자연어 질문
+            schema: LLM에 제공한 스키마 문자열
+            sql: 생성된 SQL
+            model: SQL을 생성한 모델 이름
+            generation_ms: SQL 생성에 걸린 시간 (적중 시 절약 시간 통계용)
+        """
+        key = sql_cache_key(question, schema, model)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sql_cache "
+                    "(key, question, schema_hash, model, sql, generation_ms, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, question, schema_hash(schema), model, sql, generation_ms, now, now)
+                )
+                expired = 0
+                if self.ttl is not None:
+                    expired = conn.execute("DELETE FROM sql_cache WHERE created_at < ?",
+                                           (now - self.ttl,)).rowcount
+                excess = conn.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        "DELETE FROM sql_cache WHERE key IN "
+                        "(SELECT key FROM sql_cache ORDER BY last_used LIMIT ?)", (excess,)
+                    )
+        except sqlite3.Error:
+            with self._lock:
+                self.errors += 1
+            return
+
+        with self._lock:
+            self.expirations += expired
+            self.evictions += max(excess, 0)
+
+    def invalidate(self, question: str, schema: str, model: str = ''):
+        """항목 삭제 (생성된 SQL이 검증에 실패한 경우 등)"""
+        key = sql_cache_key(question, schema, model)
+        with self._lock:
+            for index in self._indexes.values():
+                index.remove(key)
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM sql_cache WHERE key = ?", (key,))
+        except sqlite3.Error:
+            with self._lock:
+                self.errors += 1
+
+    def clear(self):
+        """캐시 전체 비우기"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sql_cache")
+        with self._lock:
+            self._indexes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        캐시 통계 조회
+
+        Returns:
+            이 프로세스의 적중(정확/유사)/실패 횟수와 적중률, 절약 시간, 유사도 색인 크기,
+            캐시 파일의 항목 수와 누적 적중 횟수를 담은 딕셔너리
+        """
+        try:
+            with self._connect() as conn:
+                entries, total_hits = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM sql_cache"
+                ).fetchone()
+        except sqlite3.Error:
+            entries, total_hits = 0, 0
+
+        with self._lock:
+            hits = self.hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                'entries': entries,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'indexed_questions': sum(len(index) for index in self._indexes.values()),
+                'saved_seconds': self.saved_seconds,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'errors': self.errors,
+                'total_hits': total_hits,
+            }
+
+
+_sql_caches: Dict[str, SQLCache] = {}
+_sql_cache_lock = threading.Lock()
+
+
+def get_sql_cache(path: str = DEFAULT_SQL_CACHE_PATH, **kwargs) -> SQLCache:
+    """
+    캐시 파일별 프로세스 전역 SQL 캐시 조회 (없으면 생성)
+
+    Args:
+        path: 캐시 SQLite 파일 경로
+        **kwargs: 캐시를 새로 만들 때 SQLCache에 전달할 설정
+
+    Returns:
+        SQLCache 인스턴스
+    """
+    key = os.path.abspath(path)
+    with _sql_cache_lock:
+        cache = _sql_caches.get(key)
+        if cache is None:
+            cache = SQLCache(path, **kwargs)
+            _sql_caches[key] = cache
+        return cache
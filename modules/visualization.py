@@ -157,6 +157,63 @@ def create_box_plot(df: pd.DataFrame, x: Optional[str], y: str, title: str = "",
     return fig
 
 
+def create_binned_histogram(bins_df: pd.DataFrame, x: str, title: str = "") -> go.Figure:
+    """
+    미리 집계한 구간별 개수로 히스토그램 생성 (원본 행을 브라우저로 보내지 않음)
+    
+    Args:
+        bins_df: bin_start, bin_end, count 컬럼의 데이터프레임
+        x: X축 이름
+        title: 차트 제목
+        
+    Returns:
+        Plotly Figure 객체
+    """
+    fig = go.Figure(data=go.Bar(
+        x=(bins_df['bin_start'] + bins_df['bin_end']) / 2,
+        y=bins_df['count'],
+        width=bins_df['bin_end'] - bins_df['bin_start'],
+        name=x
+    ))
+    
+    fig.update_layout(
+        title=title,
+        template="plotly_white",
+        bargap=0.1,
+        xaxis_title=x,
+        yaxis_title="count"
+    )
+    
+    return fig
+
+
+def create_box_plot_from_stats(stats_df: pd.DataFrame, name_col: str = 'feature',
+                               title: str = "") -> go.Figure:
+    """
+    미리 계산한 사분위수로 박스 플롯 생성
+    
+    Args:
+        stats_df: name_col, q1, median, q3, lower_fence, upper_fence, mean 컬럼의 데이터프레임
+        name_col: 박스 이름 컬럼명
+        title: 차트 제목
+        
+    Returns:
+        Plotly Figure 객체
+    """
+    fig = go.Figure()
+    for _, row in stats_df.iterrows():
+        fig.add_trace(go.Box(
+            name=str(row[name_col]),
+            q1=[row['q1']], median=[row['median']], q3=[row['q3']],
+            lowerfence=[row['lower_fence']], upperfence=[row['upper_fence']],
+            mean=[row['mean']]
+        ))
+    
+    fig.update_layout(title=title, template="plotly_white", showlegend=False)
+    
+    return fig
+
+
 def create_heatmap(df: pd.DataFrame, title: str = "") -> go.Figure:
     """
     상관관계 히트맵 생성
@@ -169,11 +226,23 @@ def create_heatmap(df: pd.DataFrame, title: str = "") -> go.Figure:
         Plotly Figure 객체
     """
     # 숫자형 컬럼만 선택
-    numeric_df = df.select_dtypes(include=['int64', 'float64'])
+    numeric_df = df.select_dtypes(include='number')
     
     # 상관관계 계산
-    corr = numeric_df.corr()
+    return create_correlation_heatmap(numeric_df.corr(), title=title)
+
+
+def create_correlation_heatmap(corr: pd.DataFrame, title: str = "") -> go.Figure:
+    """
+    계산된 상관계수 행렬로 히트맵 생성
     
+    Args:
+        corr: 상관계수 데이터프레임 (정사각 행렬)
+        title: 차트 제목
+        
+    Returns:
+        Plotly Figure 객체
+    """
     fig = go.Figure(data=go.Heatmap(
         z=corr.values,
         x=corr.columns,
@@ -219,8 +288,8 @@ def auto_visualize(df: pd.DataFrame, question: str = "") -> go.Figure:
         return fig
     
     # 컬럼 타입 분석
-    numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
-    text_cols = df.select_dtypes(include=['object']).columns.tolist()
+    numeric_cols = df.select_dtypes(include='number').columns.tolist()
+    text_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
     
     # 시각화 선택 로직
     if len(numeric_cols) >= 2 and len(df) > 1:
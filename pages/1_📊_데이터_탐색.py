@@ -30,7 +30,7 @@ if not db_path.exists():
     st.info("메인 페이지에서 데이터베이스 설정 방법을 확인하세요.")
     st.stop()
 
-db = DatabaseManager(str(db_path))
+db = DatabaseManager(str(db_path), origin="explorer")
 
 # 사이드바 - 테이블 선택
 st.sidebar.header("테이블 선택")
@@ -134,7 +134,7 @@ with tab3:
         df = db.execute_query(query)
         
         # 숫자형 컬럼 통계
-        numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
+        numeric_cols = df.select_dtypes(include='number').columns.tolist()
         
         if numeric_cols:
             st.markdown("### 숫자형 컬럼 통계")
@@ -152,7 +152,7 @@ with tab3:
                 st.dataframe(stats_df, use_container_width=True)
         
         # 문자형 컬럼 통계
-        text_cols = df.select_dtypes(include=['object']).columns.tolist()
+        text_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
         
         if text_cols:
             st.markdown("### 문자형 컬럼 통계")
@@ -205,8 +205,8 @@ with tab4:
             ["히스토그램", "박스 플롯", "막대 그래프"]
         )
         
-        numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
-        text_cols = df.select_dtypes(include=['object']).columns.tolist()
+        numeric_cols = df.select_dtypes(include='number').columns.tolist()
+        text_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
         
         if viz_type == "히스토그램":
             if numeric_cols:
@@ -246,7 +246,7 @@ with tab4:
                     y_col = st.selectbox("Y축 (숫자)", numeric_cols)
                 
                 # 데이터 집계
-                agg_df = df.groupby(x_col)[y_col].mean().reset_index()
+                agg_df = df.groupby(x_col, observed=True)[y_col].mean().reset_index()
                 agg_df = agg_df.nlargest(20, y_col)
                 
                 fig = create_bar_chart(agg_df, x_col, y_col,
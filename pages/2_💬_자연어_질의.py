@@ -5,11 +5,13 @@ import streamlit as st
 import pandas as pd
 from pathlib import Path
 import sys
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 # 모듈 경로 추가
 sys.path.append(str(Path(__file__).parent.parent))
 
-from modules.database import DatabaseManager
+from modules.database import DatabaseManager, CancelToken, QueryLimitError, get_query_executor
 from modules.llm import GeminiLLM
 from modules.visualization import auto_visualize
 
@@ -42,9 +44,228 @@ if 'llm' not in st.session_state:
         st.info("💡 `.env` 파일에 `GEMINI_API_KEY`를 설정하세요.")
         st.stop()
 
-db = DatabaseManager(str(db_path))
+db = DatabaseManager(str(db_path), origin="llm")
 llm = st.session_state.llm
 
+
+def run_cancellable_query(sql_query: str, status) -> pd.DataFrame:
+    """
+    백그라운드 스레드에서 쿼리를 실행하며 진행 상황 표시
+
+    취소 버튼 클릭 등으로 스크립트 실행이 중단되면 finally에서 쿼리도 취소하고,
+    다음 실행에서 취소 안내를 표시할 수 있도록 query_running을 남겨 둡니다.
+    
+    Args:
+        sql_query: 실행할 SQL 쿼리
+        status: 진행 상황을 표시할 placeholder
+        
+    Returns:
+        쿼리 결과 DataFrame
+    """
+    token = CancelToken()
+    future = get_query_executor().submit(db.execute_untrusted_query, sql_query, token)
+    start = time.monotonic()
+    st.session_state.query_running = True
+    
+    try:
+        while True:
+            try:
+                return future.result(timeout=0.2)
+            except FutureTimeoutError:
+                status.caption(f"⏳ 쿼리 실행 중... {time.monotonic() - start:.1f}초 "
+                               "(중단하려면 '쿼리 취소' 버튼을 누르세요)")
+    finally:
+        if future.done():
+            st.session_state.query_running = False
+        else:
+            # 실행 중에 중단됨 - query_running은 True로 남김
+            token.cancel()
+        status.empty()
+
+
+def load_schemas(db_path: str, question: str) -> tuple:
+    """
+    질문용 축소 스키마와 전체 스키마 조회 (작업 스레드에서 미리 가져올 때도 사용)
+    
+    Args:
+        db_path: 데이터베이스 파일 경로
+        question: 자연어 질문 (비어 있으면 카탈로그와 전체 스키마만 준비)
+        
+    Returns:
+        (질문용 스키마, 전체 스키마)
+    """
+    manager = DatabaseManager(db_path, origin="llm")
+    full_schema = manager.get_schema_for_llm()
+    schema = manager.get_schema_for_question(question) if question else full_schema
+    return schema, full_schema
+
+
+def prefetch_schemas(question: str):
+    """
+    질문의 스키마를 백그라운드에서 미리 조회
+    
+    페이지가 처음 열릴 때는 스키마 카탈로그를, 예시를 고르거나 질문 입력란 값이 확정될 때
+    (입력란을 벗어날 때)는 그 질문의 축소 스키마를 위젯 콜백에서 바로 준비해 둡니다.
+    입력란의 값은 키를 누를 때마다가 아니라 확정될 때만 전달되므로, 입력 후 곧바로 실행
+    버튼을 누르면 미리 가져온 값 없이 그 자리에서 조회합니다.
+    """
+    key = question.strip()
+    prefetched = st.session_state.get('schema_prefetch')
+    if prefetched is None or prefetched[0] != key:
+        future = get_query_executor().submit(load_schemas, str(db_path), key)
+        st.session_state.schema_prefetch = (key, future)
+
+
+def on_question_change():
+    """질문 입력란 값이 확정되면 스키마 미리 조회 (위젯 콜백)"""
+    prefetch_schemas(st.session_state.get('question_input', ''))
+
+
+def on_example_change():
+    """예시 질문을 고르면 스키마 미리 조회 (위젯 콜백)"""
+    example = st.session_state.get('example_select')
+    if example and example != "직접 입력":
+        prefetch_schemas(example)
+
+
+def take_schemas(question: str) -> tuple:
+    """미리 가져온 스키마가 같은 질문의 것이면 사용하고, 아니면 바로 조회"""
+    key = question.strip()
+    prefetched = st.session_state.get('schema_prefetch')
+    if prefetched is not None and prefetched[0] == key:
+        try:
+            return prefetched[1].result()
+        except Exception:
+            pass
+    return load_schemas(str(db_path), key)
+
+
+def prepare_table(results_df: pd.DataFrame) -> dict:
+    """데이터 탭에 쓸 CSV 바이트와 메모리 크기 계산 (질의 실행 중에는 백그라운드 스레드에서 실행)"""
+    return {
+        'csv': results_df.to_csv(index=False).encode('utf-8-sig'),
+        'size_kb': results_df.memory_usage(deep=True).sum() / 1024,
+    }
+
+
+def build_chart(results_df: pd.DataFrame, question: str):
+    """시각화 탭에 쓸 차트 생성 (질의 실행 중에는 백그라운드 스레드에서 실행, 결과가 없으면 None)"""
+    if len(results_df) == 0:
+        return None
+    return auto_visualize(results_df, question)
+
+
+def prepared_outputs(entry: dict) -> dict:
+    """
+    결과 탭에 쓸 차트와 CSV 조회
+    
+    세션에는 가장 최근에 표시한 결과 하나의 차트/CSV만 보관하고(히스토리에는 DataFrame과 SQL만 저장),
+    다른 결과를 열면 다시 만듭니다.
+    
+    Args:
+        entry: 질의 히스토리 항목
+        
+    Returns:
+        {'results', 'table', 'chart', 'chart_error'}
+    """
+    prepared = st.session_state.get('prepared_result')
+    if prepared is None or prepared['results'] is not entry['results']:
+        chart, chart_error = None, None
+        try:
+            chart = build_chart(entry['results'], entry['question'])
+        except Exception as e:
+            chart_error = e
+        prepared = {
+            'results': entry['results'],
+            'table': prepare_table(entry['results']),
+            'chart': chart,
+            'chart_error': chart_error,
+        }
+        st.session_state.prepared_result = prepared
+    return prepared
+
+
+def analyze_with_previews(question: str, sql_query: str, results_df: pd.DataFrame) -> dict:
+    """
+    AI 분석을 스트리밍하는 동안 차트/데이터 테이블을 공유 스레드 풀에서 만들어 끝나는 대로 표시
+    
+    분석은 화면에 써야 하므로 스크립트 스레드에서 스트리밍하고, 조각을 받을 때마다 끝난
+    작업의 결과를 미리보기 자리에 채웁니다. 실행이 끝나면 결과 탭으로 옮길 수 있도록 지웁니다.
+    
+    Args:
+        question: 자연어 질문
+        sql_query: 실행한 SQL 쿼리
+        results_df: 쿼리 결과 DataFrame
+        
+    Returns:
+        {'analysis', 'generation', 'prepared', 'timings'} (prepared는 prepared_outputs 형식)
+    """
+    executor = get_query_executor()
+    started = time.perf_counter()
+    pending = {
+        'chart': executor.submit(build_chart, results_df, question),
+        'table': executor.submit(prepare_table, results_df),
+    }
+    prepared = {'results': results_df, 'table': None, 'chart': None, 'chart_error': None}
+    
+    live_area = st.empty()
+    try:
+        with live_area.container():
+            analysis_col, preview_col = st.columns([3, 2])
+            with preview_col:
+                slots = {'chart': st.empty(), 'table': st.empty()}
+                slots['chart'].caption("⏳ 시각화 준비 중...")
+                slots['table'].caption("⏳ 데이터 테이블 준비 중...")
+            
+            def show_ready(block: bool = False):
+                """끝난 작업 결과를 미리보기 자리에 표시 (block이면 남은 작업을 기다림)"""
+                for name, future in list(pending.items()):
+                    if not (block or future.done()):
+                        continue
+                    del pending[name]
+                    if name == 'chart':
+                        try:
+                            prepared['chart'] = future.result()
+                        except Exception as e:
+                            prepared['chart_error'] = e
+                            slots['chart'].warning(f"시각화 생성 실패: {e}")
+                            continue
+                        if prepared['chart'] is None:
+                            slots['chart'].caption("시각화할 데이터가 없습니다.")
+                        else:
+                            slots['chart'].plotly_chart(prepared['chart'], use_container_width=True)
+                    else:
+                        prepared['table'] = future.result()
+                        with slots['table'].container():
+                            st.dataframe(results_df.head(10), use_container_width=True)
+                            st.caption(f"{len(results_df):,}행 · {prepared['table']['size_kb']:.1f} KB")
+            
+            def stream():
+                for chunk in llm.stream_analysis(question, sql_query, results_df):
+                    yield chunk
+                    show_ready()
+            
+            with analysis_col:
+                st.markdown("### 🤖 AI 분석 중...")
+                analysis = st.write_stream(stream())
+            analysis_elapsed = time.perf_counter() - started
+            show_ready(block=True)
+    finally:
+        # 중단(취소 버튼 등)되면 아직 시작하지 않은 작업은 취소
+        for future in pending.values():
+            future.cancel()
+    live_area.empty()
+    
+    if not isinstance(analysis, str):
+        analysis = "".join(str(part) for part in analysis)
+    return {
+        'analysis': analysis.strip(),
+        'generation': llm.last_generation,
+        'prepared': prepared,
+        'timings': {'elapsed': time.perf_counter() - started, 'analysis': analysis_elapsed},
+    }
+
+
 # 사이드바 - 예시 질문
 st.sidebar.header("💡 예시 질문")
 example_questions = [
@@ -62,7 +283,15 @@ example_questions = [
 
 selected_example = st.sidebar.selectbox(
     "예시 선택",
-    ["직접 입력"] + example_questions
+    ["직접 입력"] + example_questions,
+    key="example_select",
+    on_change=on_example_change
+)
+
+use_sql_cache = st.sidebar.checkbox(
+    "캐시된 SQL 재사용",
+    value=True,
+    help="같거나 표현만 다른 질문을 이전에 변환한 SQL이 있으면 API를 호출하지 않고 재사용합니다."
 )
 
 # 메인 영역
@@ -73,16 +302,20 @@ if selected_example == "직접 입력":
     question = st.text_area(
         "질문을 입력하세요",
         height=100,
-        placeholder="예: 가장 인기 있는 장르 TOP 10은?"
+        placeholder="예: 가장 인기 있는 장르 TOP 10은?",
+        key="question_input",
+        on_change=on_question_change
     )
 else:
     question = st.text_area(
         "질문을 입력하세요",
         value=selected_example,
-        height=100
+        height=100,
+        key="question_input",
+        on_change=on_question_change
     )
 
-col1, col2, col3 = st.columns([1, 1, 4])
+col1, col2, col3, col4 = st.columns([1, 1, 1, 3])
 
 with col1:
     submit_button = st.button("🔍 질의 실행", type="primary", use_container_width=True)
@@ -90,46 +323,85 @@ with col1:
 with col2:
     clear_button = st.button("🗑️ 초기화", use_container_width=True)
 
+with col3:
+    cancel_button = st.button("⏹️ 쿼리 취소", use_container_width=True)
+
 if clear_button:
     st.session_state.query_history = []
+    st.session_state.pop('prepared_result', None)
     st.rerun()
 
+# 직전 실행에서 쿼리가 실행 중에 중단되었는지 확인 (취소 버튼이 실제로 쿼리를 멈춘 경우만 안내)
+query_interrupted = st.session_state.pop('query_running', False)
+if cancel_button and query_interrupted:
+    st.info("⏹️ 쿼리 실행이 취소되었습니다.")
+
+# 페이지를 처음 열면 사용자가 질문을 입력하는 동안 스키마 카탈로그를 미리 준비
+if 'schema_prefetch' not in st.session_state:
+    prefetch_schemas(question)
+
 # 질의 실행
 if submit_button and question:
     with st.spinner("AI가 SQL을 생성하고 있습니다..."):
         try:
-            # 1. 스키마 정보 가져오기
-            schema = db.get_schema_for_llm()
+            # 1. 스키마 정보 가져오기 (질문과 관련된 테이블/컬럼만 남겨 프롬프트 축소, 미리 가져온 값 사용)
+            schema, full_schema = take_schemas(question)
             
-            # 2. Text-to-SQL
-            sql_query = llm.text_to_sql(question, schema)
+            # 2. Text-to-SQL (같은 질문/스키마는 캐시된 SQL 사용)
+            sql_query = llm.text_to_sql(question, schema, use_cache=use_sql_cache)
+            if llm.last_cache_match is not None and llm.last_cache_match['similar']:
+                st.caption(f"⚡ 비슷한 질문 \"{llm.last_cache_match['question']}\"의 SQL을 재사용했습니다 "
+                           f"(유사도 {llm.last_cache_match['score']:.2f}, API 호출 없음)")
+            elif llm.last_sql_cached:
+                st.caption("⚡ 캐시된 SQL을 사용했습니다 (API 호출 없음)")
             
-            # 3. SQL 유효성 검사
-            is_valid, message = db.validate_query(sql_query)
+            # 3. SQL 유효성 검사 및 비용 기반 승인 (필요 시 LIMIT 자동 추가)
+            generated_sql = sql_query
+            is_valid, sql_query, message = db.admit_query(generated_sql)
+            
+            if not is_valid and message.startswith("쿼리 오류") and schema != full_schema:
+                # 축소한 스키마에 필요한 테이블/컬럼이 빠졌을 수 있으므로 전체 스키마로 한 번 더 생성
+                llm.forget_sql(question, schema)
+                schema = full_schema
+                generated_sql = llm.text_to_sql(question, schema, use_cache=use_sql_cache)
+                is_valid, sql_query, message = db.admit_query(generated_sql)
             
             if not is_valid:
+                # 잘못된 SQL이 캐시에서 계속 재사용되지 않도록 삭제
+                llm.forget_sql(question, schema)
                 st.error(f"❌ 쿼리 유효성 검사 실패: {message}")
                 st.code(sql_query, language="sql")
                 st.stop()
             
-            # 4. 쿼리 실행
+            if sql_query != generated_sql.strip().rstrip(';').strip():
+                st.info(f"ℹ️ {message}")
+            
+            # 4. 쿼리 실행 (시간/행/크기 제한 적용, 취소 가능)
             with st.spinner("쿼리를 실행하고 있습니다..."):
-                results_df = db.execute_query(sql_query)
+                results_df = run_cancellable_query(sql_query, st.empty())
             
-            # 5. 결과 분석
-            with st.spinner("결과를 분석하고 있습니다..."):
-                analysis = llm.analyze_results(question, sql_query, results_df)
+            # 5. 결과 분석과 시각화/데이터 테이블 준비를 동시에 실행
+            outputs = analyze_with_previews(question, sql_query, results_df)
             
             # 6. 히스토리에 추가
             st.session_state.query_history.insert(0, {
                 'question': question,
                 'sql': sql_query,
                 'results': results_df,
-                'analysis': analysis
+                'analysis': outputs['analysis'],
+                'generation': outputs['generation'],
+                'timings': outputs['timings']
             })
+            # 미리 만든 차트/CSV는 히스토리가 아닌 최신 결과 한 건 슬롯에만 보관
+            st.session_state.prepared_result = outputs['prepared']
             
             st.success("✅ 질의가 성공적으로 실행되었습니다!")
             
+        except QueryLimitError as e:
+            st.warning(f"⚠️ {e}")
+            st.code(sql_query, language="sql")
+            st.stop()
+        
         except Exception as e:
             st.error(f"❌ 오류 발생: {e}")
             st.stop()
@@ -141,6 +413,7 @@ if st.session_state.query_history:
     
     # 최신 결과 표시
     latest = st.session_state.query_history[0]
+    prepared = prepared_outputs(latest)
     
     # 탭 생성
     tab1, tab2, tab3, tab4 = st.tabs(["💬 분석", "📋 데이터", "📊 시각화", "🔍 SQL"])
@@ -149,6 +422,14 @@ if st.session_state.query_history:
     with tab1:
         st.markdown("### 🤖 AI 분석")
         st.markdown(latest['analysis'])
+        generation = latest.get('generation')
+        if generation and generation['ttft_ms'] is not None:
+            st.caption(f"⏱️ 첫 응답 {generation['ttft_ms'] / 1000:.2f}초 · "
+                       f"전체 생성 {generation['total_ms'] / 1000:.2f}초")
+        timings = latest.get('timings')
+        if timings:
+            st.caption(f"⚙️ 시각화·테이블 준비를 분석과 동시에 실행: 전체 {timings['elapsed']:.2f}초 "
+                       f"(분석 {timings['analysis']:.2f}초)")
         
         # 기본 정보
         col1, col2, col3 = st.columns(3)
@@ -161,7 +442,7 @@ if st.session_state.query_history:
         
         with col3:
             if len(latest['results']) > 0:
-                st.metric("데이터 크기", f"{latest['results'].memory_usage(deep=True).sum() / 1024:.1f} KB")
+                st.metric("데이터 크기", f"{prepared['table']['size_kb']:.1f} KB")
     
     # 탭 2: 데이터 테이블
     with tab2:
@@ -182,11 +463,10 @@ if st.session_state.query_history:
             
             st.dataframe(display_df, use_container_width=True, height=400)
             
-            # 다운로드 버튼
-            csv = latest['results'].to_csv(index=False).encode('utf-8-sig')
+            # 다운로드 버튼 (질의 실행 중 미리 만든 CSV 사용)
             st.download_button(
                 label="📥 전체 결과 CSV 다운로드",
-                data=csv,
+                data=prepared['table']['csv'],
                 file_name="query_results.csv",
                 mime="text/csv"
             )
@@ -199,8 +479,10 @@ if st.session_state.query_history:
         
         if len(latest['results']) > 0:
             try:
-                fig = auto_visualize(latest['results'], latest['question'])
-                st.plotly_chart(fig, use_container_width=True)
+                if prepared['chart_error'] is not None:
+                    raise prepared['chart_error']
+                # 질의 실행 중 미리 만든 차트 사용 (수정된 쿼리 결과 등은 prepared_outputs에서 생성)
+                st.plotly_chart(prepared['chart'], use_container_width=True)
             except Exception as e:
                 st.warning(f"시각화 생성 실패: {e}")
                 st.info("데이터를 테이블 형태로 확인하세요.")
@@ -222,14 +504,14 @@ if st.session_state.query_history:
         
         if st.button("🔄 수정된 쿼리 실행"):
             try:
-                # 유효성 검사
-                is_valid, message = db.validate_query(edited_sql)
+                # 유효성 검사 및 비용 기반 승인
+                is_valid, edited_sql, message = db.admit_query(edited_sql)
                 
                 if not is_valid:
                     st.error(f"❌ {message}")
                 else:
-                    # 쿼리 실행
-                    new_results = db.execute_query(edited_sql)
+                    # 쿼리 실행 (시간/행/크기 제한 적용)
+                    new_results = db.execute_untrusted_query(edited_sql)
                     
                     # 히스토리에 추가
                     st.session_state.query_history.insert(0, {
@@ -242,6 +524,9 @@ if st.session_state.query_history:
                     st.success("✅ 쿼리가 성공적으로 실행되었습니다!")
                     st.rerun()
                     
+            except QueryLimitError as e:
+                st.warning(f"⚠️ {e}")
+            
             except Exception as e:
                 st.error(f"❌ 오류 발생: {e}")
     
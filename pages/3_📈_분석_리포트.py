@@ -11,10 +11,12 @@ from datetime import datetime
 sys.path.append(str(Path(__file__).parent.parent))
 
 from modules.database import DatabaseManager
+from modules.feature_store import get_feature_store
 from modules.llm import GeminiLLM
 from modules.visualization import (
     create_bar_chart, create_histogram, create_box_plot,
-    create_scatter_plot, create_heatmap, create_pie_chart
+    create_scatter_plot, create_heatmap, create_pie_chart,
+    create_binned_histogram, create_box_plot_from_stats, create_correlation_heatmap
 )
 
 # 페이지 설정
@@ -34,7 +36,10 @@ if not db_path.exists():
     st.error("❌ 데이터베이스 파일을 찾을 수 없습니다.")
     st.stop()
 
-db = DatabaseManager(str(db_path))
+db = DatabaseManager(str(db_path), origin="report")
+
+# 빌드 시 함께 만든 오디오 특성 컬럼 저장소 (없거나 DB와 맞지 않으면 SQL 표본 조회로 대체)
+feature_store = get_feature_store(str(db_path.parent / "feature_store"), str(db_path))
 
 # 세션 상태 초기화
 if 'llm' not in st.session_state:
@@ -61,15 +66,28 @@ if report_type == "전체 데이터 개요":
     
     with st.spinner("데이터를 분석하고 있습니다..."):
         try:
-            # 기본 통계
-            query = "SELECT COUNT(*) as total_tracks FROM tracks"
-            total_tracks = db.execute_query(query)['total_tracks'][0]
+            features = ['danceability', 'energy', 'valence', 'acousticness', 
+                       'instrumentalness', 'speechiness']
+            corr_features = features + ['tempo', 'loudness']
             
-            query = "SELECT COUNT(DISTINCT artists) as total_artists FROM tracks"
-            total_artists = db.execute_query(query)['total_artists'][0]
+            # 서로 독립적인 쿼리는 동시에 실행
+            queries = {
+                'total_tracks': "SELECT COUNT(*) as total_tracks FROM tracks",
+                'total_artists': "SELECT COUNT(*) as total_artists FROM artists",
+                'total_genres': "SELECT COUNT(*) as total_genres FROM genre_stats",
+            }
+            if feature_store is None:
+                queries.update({
+                    'popularity': "SELECT popularity FROM tracks WHERE popularity IS NOT NULL",
+                    'features': f"SELECT {', '.join(features)} FROM tracks LIMIT 10000",
+                    'correlation': f"SELECT {', '.join(corr_features)} FROM tracks LIMIT 5000",
+                })
+            results = db.execute_queries(queries)
             
-            query = "SELECT COUNT(DISTINCT track_genre) as total_genres FROM tracks"
-            total_genres = db.execute_query(query)['total_genres'][0]
+            # 기본 통계
+            total_tracks = results['total_tracks']['total_tracks'][0]
+            total_artists = results['total_artists']['total_artists'][0]
+            total_genres = results['total_genres']['total_genres'][0]
             
             # 메트릭 표시
             col1, col2, col3 = st.columns(3)
@@ -87,20 +105,29 @@ if report_type == "전체 데이터 개요":
             
             # 인기도 분포
             st.subheader("🎯 인기도 분포")
-            query = "SELECT popularity FROM tracks WHERE popularity IS NOT NULL"
-            popularity_df = db.execute_query(query)
             
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = create_histogram(popularity_df, 'popularity', 
-                                      title="인기도 분포", nbins=50)
+                if feature_store is not None:
+                    fig = create_binned_histogram(feature_store.histogram('popularity', bins=50),
+                                                  'popularity', title="인기도 분포")
+                else:
+                    fig = create_histogram(results['popularity'], 'popularity',
+                                          title="인기도 분포", nbins=50)
                 st.plotly_chart(fig, use_container_width=True)
             
             with col2:
                 # 인기도 통계
                 st.markdown("#### 통계")
-                stats = popularity_df['popularity'].describe()
+                if feature_store is not None:
+                    pop_stats = feature_store.box_stats(['popularity']).iloc[0]
+                    stats = {'mean': pop_stats['mean'], 'std': pop_stats['std'],
+                             'min': pop_stats['min'], '25%': pop_stats['q1'],
+                             '50%': pop_stats['median'], '75%': pop_stats['q3'],
+                             'max': pop_stats['max']}
+                else:
+                    stats = results['popularity']['popularity'].describe()
                 stats_df = pd.DataFrame({
                     '통계': ['평균', '표준편차', '최소값', '25%', '중앙값', '75%', '최대값'],
                     '값': [
@@ -120,15 +147,13 @@ if report_type == "전체 데이터 개요":
             # 음악 특성 분포
             st.subheader("🎵 음악 특성 분포")
             
-            features = ['danceability', 'energy', 'valence', 'acousticness', 
-                       'instrumentalness', 'speechiness']
-            
-            query = f"SELECT {', '.join(features)} FROM tracks LIMIT 10000"
-            features_df = db.execute_query(query)
-            
-            # 박스 플롯
-            fig = create_box_plot(features_df.melt(var_name='특성', value_name='값'),
-                                 '특성', '값', title="음악 특성 분포")
+            # 박스 플롯 (컬럼 저장소가 있으면 전체 데이터의 사분위수로 그림)
+            if feature_store is not None:
+                fig = create_box_plot_from_stats(feature_store.box_stats(features),
+                                                 title="음악 특성 분포")
+            else:
+                fig = create_box_plot(results['features'].melt(var_name='특성', value_name='값'),
+                                     '특성', '값', title="음악 특성 분포")
             st.plotly_chart(fig, use_container_width=True)
             
             st.markdown("---")
@@ -136,15 +161,11 @@ if report_type == "전체 데이터 개요":
             # 상관관계 분석
             st.subheader("🔗 음악 특성 상관관계")
             
-            query = """
-            SELECT danceability, energy, valence, acousticness, 
-                   instrumentalness, speechiness, tempo, loudness
-            FROM tracks 
-            LIMIT 5000
-            """
-            corr_df = db.execute_query(query)
-            
-            fig = create_heatmap(corr_df, title="음악 특성 상관관계")
+            if feature_store is not None:
+                fig = create_correlation_heatmap(feature_store.correlation(corr_features),
+                                                 title="음악 특성 상관관계")
+            else:
+                fig = create_heatmap(results['correlation'], title="음악 특성 상관관계")
             st.plotly_chart(fig, use_container_width=True)
             
         except Exception as e:
@@ -158,10 +179,10 @@ elif report_type == "장르 분석":
             # 장르별 트랙 수
             st.subheader("📊 장르별 트랙 수 TOP 20")
             
+            # 장르 집계는 미리 계산된 요약 테이블 기반 genre_stats 뷰에서 조회
             query = """
-            SELECT track_genre, COUNT(*) as count
-            FROM tracks
-            GROUP BY track_genre
+            SELECT track_genre, track_count as count
+            FROM genre_stats
             ORDER BY count DESC
             LIMIT 20
             """
@@ -177,10 +198,9 @@ elif report_type == "장르 분석":
             st.subheader("⭐ 장르별 평균 인기도 TOP 20")
             
             query = """
-            SELECT track_genre, AVG(popularity) as avg_popularity, COUNT(*) as count
-            FROM tracks
-            GROUP BY track_genre
-            HAVING count >= 100
+            SELECT track_genre, avg_popularity, track_count as count
+            FROM genre_stats
+            WHERE track_count >= 100
             ORDER BY avg_popularity DESC
             LIMIT 20
             """
@@ -196,7 +216,7 @@ elif report_type == "장르 분석":
             st.subheader("🎵 장르별 음악 특성")
             
             # 특정 장르 선택
-            genres = db.execute_query("SELECT DISTINCT track_genre FROM tracks ORDER BY track_genre")['track_genre'].tolist()
+            genres = db.execute_query("SELECT track_genre FROM genre_stats ORDER BY track_genre")['track_genre'].tolist()
             selected_genres = st.multiselect(
                 "비교할 장르 선택 (최대 5개)",
                 genres,
@@ -206,15 +226,10 @@ elif report_type == "장르 분석":
             if selected_genres:
                 genre_filter = "', '".join(selected_genres)
                 query = f"""
-                SELECT track_genre,
-                       AVG(danceability) as avg_danceability,
-                       AVG(energy) as avg_energy,
-                       AVG(valence) as avg_valence,
-                       AVG(tempo) as avg_tempo,
-                       AVG(acousticness) as avg_acousticness
-                FROM tracks
+                SELECT track_genre, avg_danceability, avg_energy, avg_valence,
+                       avg_tempo, avg_acousticness
+                FROM genre_stats
                 WHERE track_genre IN ('{genre_filter}')
-                GROUP BY track_genre
                 """
                 genre_features_df = db.execute_query(query)
                 
@@ -263,21 +278,33 @@ elif report_type == "음악 특성 분석":
             
             st.subheader(f"📊 {feature_names[feature]} 분석")
             
-            # 데이터 로드
-            query = f"SELECT {feature}, popularity, track_genre FROM tracks WHERE {feature} IS NOT NULL LIMIT 10000"
-            feature_df = db.execute_query(query)
+            # 데이터 로드 (컬럼 저장소가 있으면 표본 없이 전체 트랙 사용)
+            if feature_store is not None:
+                feature_df = feature_store.frame([feature, 'popularity'], include_genre=True)
+                feature_df = feature_df.dropna(subset=[feature])
+            else:
+                query = f"SELECT {feature}, popularity, track_genre FROM tracks WHERE {feature} IS NOT NULL LIMIT 10000"
+                feature_df = db.execute_query(query)
             
             # 분포
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = create_histogram(feature_df, feature, 
-                                      title=f"{feature_names[feature]} 분포")
+                if feature_store is not None:
+                    fig = create_binned_histogram(feature_store.histogram(feature, bins=30), feature,
+                                                  title=f"{feature_names[feature]} 분포")
+                else:
+                    fig = create_histogram(feature_df, feature,
+                                          title=f"{feature_names[feature]} 분포")
                 st.plotly_chart(fig, use_container_width=True)
             
             with col2:
-                fig = create_box_plot(feature_df, None, feature,
-                                     title=f"{feature_names[feature]} 박스 플롯")
+                if feature_store is not None:
+                    fig = create_box_plot_from_stats(feature_store.box_stats([feature]),
+                                                     title=f"{feature_names[feature]} 박스 플롯")
+                else:
+                    fig = create_box_plot(feature_df, None, feature,
+                                         title=f"{feature_names[feature]} 박스 플롯")
                 st.plotly_chart(fig, use_container_width=True)
             
             st.markdown("---")
@@ -311,26 +338,10 @@ elif report_type == "인기도 분석":
             # 인기도 구간별 분석
             st.subheader("📊 인기도 구간별 트랙 수")
             
+            # 구간 집계는 미리 계산된 요약 테이블 기반 popularity_stats 뷰에서 조회 (높은 구간부터)
             query = """
-            SELECT 
-                CASE 
-                    WHEN popularity >= 80 THEN 'Very High (80-100)'
-                    WHEN popularity >= 60 THEN 'High (60-79)'
-                    WHEN popularity >= 40 THEN 'Medium (40-59)'
-                    WHEN popularity >= 20 THEN 'Low (20-39)'
-                    ELSE 'Very Low (0-19)'
-                END as popularity_range,
-                COUNT(*) as count
-            FROM tracks
-            GROUP BY popularity_range
-            ORDER BY 
-                CASE 
-                    WHEN popularity >= 80 THEN 1
-                    WHEN popularity >= 60 THEN 2
-                    WHEN popularity >= 40 THEN 3
-                    WHEN popularity >= 20 THEN 4
-                    ELSE 5
-                END
+            SELECT popularity_range, track_count as count
+            FROM popularity_stats
             """
             pop_range_df = db.execute_query(query)
             
@@ -367,28 +378,8 @@ elif report_type == "인기도 분석":
             st.subheader("🎵 인기도 구간별 평균 음악 특성")
             
             query = """
-            SELECT 
-                CASE 
-                    WHEN popularity >= 80 THEN 'Very High'
-                    WHEN popularity >= 60 THEN 'High'
-                    WHEN popularity >= 40 THEN 'Medium'
-                    WHEN popularity >= 20 THEN 'Low'
-                    ELSE 'Very Low'
-                END as popularity_range,
-                AVG(danceability) as avg_danceability,
-                AVG(energy) as avg_energy,
-                AVG(valence) as avg_valence,
-                AVG(tempo) as avg_tempo
-            FROM tracks
-            GROUP BY popularity_range
-            ORDER BY 
-                CASE 
-                    WHEN popularity >= 80 THEN 1
-                    WHEN popularity >= 60 THEN 2
-                    WHEN popularity >= 40 THEN 3
-                    WHEN popularity >= 20 THEN 4
-                    ELSE 5
-                END
+            SELECT popularity_range, avg_danceability, avg_energy, avg_valence, avg_tempo
+            FROM popularity_stats
             """
             pop_features_df = db.execute_query(query)
             
@@ -415,6 +406,14 @@ elif report_type == "커스텀 분석":
     
     st.markdown("원하는 분석을 자유롭게 설정하세요.")
     
+    # 카테고리 축별 FROM 절 (아티스트는 track_artists 조인으로 개별 아티스트 단위 집계)
+    CATEGORY_SOURCES = {
+        'track_genre': "tracks",
+        'artist_name': "tracks JOIN track_artists ta ON ta.track_id = tracks.track_id "
+                       "JOIN artists a ON a.artist_id = ta.artist_id",
+        'album_name': "tracks",
+    }
+    
     # 분석 설정
     col1, col2 = st.columns(2)
     
@@ -423,7 +422,7 @@ elif report_type == "커스텀 분석":
         x_type = st.selectbox("X축 타입", ["카테고리", "숫자"])
         
         if x_type == "카테고리":
-            x_col = st.selectbox("X축 컬럼", ['track_genre', 'artists', 'album_name'])
+            x_col = st.selectbox("X축 컬럼", list(CATEGORY_SOURCES))
         else:
             x_col = st.selectbox("X축 컬럼", 
                                ['popularity', 'danceability', 'energy', 'tempo', 
@@ -449,7 +448,7 @@ elif report_type == "커스텀 분석":
             filter_col = st.selectbox("필터 컬럼", ['track_genre', 'popularity'])
             
             if filter_col == 'track_genre':
-                genres = db.execute_query("SELECT DISTINCT track_genre FROM tracks ORDER BY track_genre")['track_genre'].tolist()
+                genres = db.execute_query("SELECT track_genre FROM genre_stats ORDER BY track_genre")['track_genre'].tolist()
                 filter_values = st.multiselect("장르 선택", genres, default=genres[:5])
                 # f-string 내에서 백슬래시를 사용할 수 없으므로 먼저 join
                 joined_genres = "', '".join(filter_values)
@@ -460,15 +459,25 @@ elif report_type == "커스텀 분석":
         else:
             filter_condition = "1=1"
     
+    # 컬럼 저장소용 행 마스크 (SQL 필터와 같은 조건)
+    filter_mask = None
+    if feature_store is not None and use_filter:
+        if filter_col == 'track_genre':
+            filter_mask = feature_store.genre_mask(filter_values)
+        else:
+            filter_mask = feature_store.column('popularity') >= min_pop
+    
     # 분석 실행
     if st.button("📊 분석 실행", type="primary"):
         with st.spinner("분석 중..."):
             try:
+                # SQL 없이 특성 컬럼 저장소로 만든 결과의 출처 설명 (AI 분석 프롬프트용)
+                data_source = None
                 if x_type == "카테고리":
                     # 집계 쿼리
                     query = f"""
                     SELECT {x_col}, AVG({y_col}) as avg_{y_col}, COUNT(*) as count
-                    FROM tracks
+                    FROM {CATEGORY_SOURCES[x_col]}
                     WHERE {filter_condition} AND {x_col} IS NOT NULL AND {y_col} IS NOT NULL
                     GROUP BY {x_col}
                     ORDER BY avg_{y_col} DESC
@@ -479,11 +488,23 @@ elif report_type == "커스텀 분석":
                     if chart_type == "막대 그래프":
                         fig = create_bar_chart(df, x_col, f'avg_{y_col}',
                                               title=f"{x_col}별 평균 {y_col}")
+                    elif feature_store is not None and x_col == 'track_genre':
+                        # 상위 장르별 전체 트랙의 사분위수
+                        base_mask = filter_mask if filter_mask is not None else True
+                        df = pd.concat([
+                            feature_store.box_stats([y_col], base_mask & feature_store.genre_mask([genre]))
+                            .assign(track_genre=genre)
+                            for genre in df[x_col]
+                        ], ignore_index=True)
+                        fig = create_box_plot_from_stats(df, 'track_genre',
+                                                         title=f"{x_col}별 {y_col} 분포")
+                        data_source = (f"위 SQL로 고른 상위 장르별로, 특성 컬럼 저장소의 전체 트랙 중 "
+                                       f"{filter_condition} 조건을 만족하는 트랙의 {y_col} 사분위수를 계산한 결과")
                     else:
                         # 박스 플롯용 원본 데이터
                         query = f"""
                         SELECT {x_col}, {y_col}
-                        FROM tracks
+                        FROM {CATEGORY_SOURCES[x_col]}
                         WHERE {filter_condition} AND {x_col} IS NOT NULL AND {y_col} IS NOT NULL
                         LIMIT 5000
                         """
@@ -491,6 +512,14 @@ elif report_type == "커스텀 분석":
                         fig = create_box_plot(df, x_col, y_col,
                                              title=f"{x_col}별 {y_col} 분포")
                 
+                elif chart_type == "히스토그램" and feature_store is not None:
+                    # 전체 트랙 구간 집계 (SQL을 실행하지 않음)
+                    query = None
+                    data_source = (f"특성 컬럼 저장소의 전체 트랙 중 {filter_condition} 조건을 만족하는 "
+                                   f"트랙의 {x_col} 값을 30개 구간으로 나눈 히스토그램")
+                    df = feature_store.histogram(x_col, bins=30, mask=filter_mask)
+                    fig = create_binned_histogram(df, x_col, title=f"{x_col} 분포")
+                
                 else:
                     # 숫자형 데이터
                     query = f"""
@@ -515,14 +544,17 @@ elif report_type == "커스텀 분석":
                 
                 # AI 분석
                 if st.checkbox("🤖 AI 분석 받기"):
-                    with st.spinner("AI가 분석하고 있습니다..."):
-                        analysis = llm.analyze_results(
-                            f"{x_col}와 {y_col}의 관계 분석",
-                            query,
-                            df
-                        )
-                        st.markdown("### 🤖 AI 분석")
-                        st.markdown(analysis)
+                    st.markdown("### 🤖 AI 분석")
+                    st.write_stream(llm.stream_analysis(
+                        f"{x_col}와 {y_col}의 관계 분석",
+                        query,
+                        df,
+                        data_source=data_source
+                    ))
+                    generation = llm.last_generation
+                    if generation and generation['ttft_ms'] is not None:
+                        st.caption(f"⏱️ 첫 응답 {generation['ttft_ms'] / 1000:.2f}초 · "
+                                   f"전체 생성 {generation['total_ms'] / 1000:.2f}초")
                 
             except Exception as e:
                 st.error(f"분석 중 오류 발생: {e}")
@@ -0,0 +1,129 @@
+"""
+쿼리 워크로드 기반 인덱스 추천 스크립트
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from modules.index_advisor import (
+    ADVISED_INDEXES_FILENAME, DEFAULT_MAX_INDEXES, DEFAULT_MIN_GAIN, DEFAULT_WORKLOAD_PATHS,
+    IndexAdvisor, load_workload, save_advised_indexes
+)
+from build_database import (
+    INCREMENTAL_PRAGMAS, SERVING_PRAGMAS, TMP_SUFFIX,
+    apply_advised_indexes, export_feature_store, optimize_database, publish_database,
+    remove_database_files
+)
+
+
+def apply_indexes(db_path: str, advised_path: str):
+    """
+    채택 인덱스 목록을 복사본에 반영한 뒤 원자적으로 교체
+
+    Args:
+        db_path: 데이터베이스 파일 경로
+        advised_path: 채택 인덱스 JSON 파일 경로
+    """
+    start = time.perf_counter()
+
+    # 앱이 읽고 있는 파일은 건드리지 않고 복사본에서 작업
+    tmp_path = db_path + TMP_SUFFIX
+    remove_database_files(tmp_path)
+
+    source = sqlite3.connect(db_path)
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    try:
+        source.backup(conn)
+    finally:
+        source.close()
+
+    for pragma in INCREMENTAL_PRAGMAS:
+        conn.execute(pragma)
+    created = apply_advised_indexes(conn, advised_path)
+    optimize_database(conn)
+    for pragma in SERVING_PRAGMAS:
+        conn.execute(pragma)
+    conn.close()
+
+    publish_database(tmp_path, db_path)
+    # 게시로 DB 파일 식별 정보가 바뀌어 기존 특성 컬럼 저장소는 쓰이지 않으므로 다시 생성
+    export_feature_store(db_path)
+    print(f"\n인덱스 {len(created)}개 반영 완료: {time.perf_counter() - start:.2f}초")
+
+
+def advise_indexes(db_path: str, log_paths: list, max_indexes: int, min_gain: float,
+                   apply: bool = False):
+    """
+    워크로드 로그를 읽어 인덱스를 추천하고, 요청 시 데이터베이스에 반영
+
+    Args:
+        db_path: 데이터베이스 파일 경로
+        log_paths: 워크로드/느린 쿼리 JSONL 파일 경로 목록
+        max_indexes: 최대 추천 개수
+        min_gain: 전체 워크로드 비용 대비 최소 감소 비율
+        apply: 추천 결과를 저장하고 데이터베이스에 인덱스를 만들지 여부
+    """
+    workload = load_workload(log_paths)
+    if not workload:
+        print("분석할 쿼리 기록이 없습니다. 앱에서 쿼리를 실행한 뒤 다시 시도하세요.")
+        return
+
+    total = sum(query.count for query in workload)
+    print(f"워크로드: 쿼리 형태 {len(workload):,}개 (실행 {total:,}회)")
+
+    start = time.perf_counter()
+    advisor = IndexAdvisor(db_path)
+    try:
+        chosen = advisor.recommend(workload, max_indexes=max_indexes, min_gain=min_gain)
+    finally:
+        advisor.close()
+    print(f"분석 시간: {time.perf_counter() - start:.2f}초")
+
+    if not chosen:
+        print("\n추천할 인덱스가 없습니다.")
+        return
+
+    print("\n추천 인덱스 (채택 순서):")
+    for candidate in chosen:
+        print(f"  - {candidate.name}: {candidate.table}({', '.join(candidate.columns)})"
+              f" | 비용 -{candidate.gain:.1%} | {candidate.size_bytes / 1024:,.0f} KB"
+              f" | 개선 쿼리 {candidate.improved}개")
+
+    advised_path = os.path.join(os.path.dirname(db_path), ADVISED_INDEXES_FILENAME)
+    if not apply:
+        print("\n반영하려면 --apply 옵션으로 다시 실행하세요.")
+        return
+
+    save_advised_indexes(advised_path, chosen)
+    print(f"\n채택 목록 저장: {advised_path} (전체 재구축 시에도 다시 생성됨)")
+    apply_indexes(db_path, advised_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="쿼리 워크로드 기반 인덱스 추천")
+    parser.add_argument("--apply", action="store_true",
+                        help="추천 인덱스를 저장하고 데이터베이스에 생성")
+    parser.add_argument("--max-indexes", type=int, default=DEFAULT_MAX_INDEXES,
+                        help=f"최대 추천 개수 (기본 {DEFAULT_MAX_INDEXES}개)")
+    parser.add_argument("--min-gain", type=float, default=DEFAULT_MIN_GAIN,
+                        help=f"채택할 최소 비용 감소 비율 (기본 {DEFAULT_MIN_GAIN})")
+    parser.add_argument("--log", action="append",
+                        help="워크로드 JSONL 파일 경로 (여러 번 지정 가능)")
+    args = parser.parse_args()
+
+    # 경로 설정
+    project_root = Path(__file__).parent.parent
+    db_file = project_root / "data" / "spotify.db"
+    log_files = args.log or [str(project_root / path) for path in DEFAULT_WORKLOAD_PATHS]
+
+    if not db_file.exists():
+        print(f"오류: {db_file} 파일을 찾을 수 없습니다.")
+        print("\n먼저 데이터베이스를 구축하세요:")
+        print("python scripts/build_database.py")
+    else:
+        advise_indexes(str(db_file), log_files, args.max_indexes, args.min_gain, args.apply)
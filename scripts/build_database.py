@@ -1,173 +1,1294 @@
 """
 SQLite 데이터베이스 구축 스크립트
 """
+import argparse
+import json
 import pandas as pd
 import sqlite3
 import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
+from typing import Optional
 
+sys.path.append(str(Path(__file__).parent.parent))
 
-def create_database(csv_path: str, db_path: str):
+from modules.database import file_identity
+from modules.feature_store import write_feature_store
+from modules.index_advisor import ADVISED_INDEXES_FILENAME
+
+
+STATS_TABLE = 'table_stats'
+
+# 트랙/아티스트/앨범 이름 전문 검색용 FTS5 테이블
+# unicode61은 한글을 공백/구두점 단위로 나누므로 조사가 붙은 단어도 접두어 검색으로 찾을 수 있도록
+# 2~3글자 접두어 인덱스를 함께 생성
+FTS_TABLE = 'tracks_fts'
+FTS_COLUMNS = ['track_name', 'artists', 'album_name']
+FTS_OPTIONS = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+FTS_SHADOW_SUFFIXES = ('_data', '_idx', '_content', '_docsize', '_config')
+
+
+def write_table_stats(conn: sqlite3.Connection) -> dict:
     """
-    전처리된 CSV 파일로부터 SQLite 데이터베이스 생성
+    테이블별 행 수를 table_stats 메타데이터 테이블에 기록
+    
+    Args:
+        conn: 데이터베이스 연결
+        
+    Returns:
+        {테이블 이름: 행 수} 딕셔너리
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+        table_name TEXT PRIMARY KEY,
+        row_count INTEGER NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    """)
+    
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='table' AND name != ? "
+        "AND name NOT LIKE 'sqlite_%' ORDER BY rowid",
+        (STATS_TABLE,)
+    )
+    rows = cursor.fetchall()
+    
+    # FTS5 내부 저장용 섀도 테이블은 제외
+    virtual_tables = [name for name, sql in rows if sql.upper().startswith('CREATE VIRTUAL TABLE')]
+    tables = [
+        name for name, _ in rows
+        if not any(name == vt + suffix for vt in virtual_tables for suffix in FTS_SHADOW_SUFFIXES)
+    ]
+    
+    table_counts = {}
+    for table in tables:
+        cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+        table_counts[table] = cursor.fetchone()[0]
+    
+    cursor.execute(f"DELETE FROM {STATS_TABLE}")
+    cursor.executemany(
+        f"INSERT INTO {STATS_TABLE} (table_name, row_count, updated_at) "
+        "VALUES (?, ?, datetime('now'))",
+        list(table_counts.items())
+    )
+    conn.commit()
+    
+    return table_counts
+
+
+# 전처리된 CSV 컬럼별 고정 dtype (청크마다 타입 추론이 달라지지 않도록 고정)
+# 오디오 특성은 SQLite REAL(8바이트)에 값 그대로 저장되도록 float64 유지
+TRACKS_DTYPES = {
+    'Unnamed: 0': 'int64',
+    'track_id': 'object',
+    'artists': 'object',
+    'album_name': 'object',
+    'track_name': 'object',
+    'popularity': 'int16',
+    'duration_ms': 'int32',
+    'explicit': 'bool',
+    'danceability': 'float64',
+    'energy': 'float64',
+    'key': 'int8',
+    'loudness': 'float64',
+    'mode': 'int8',
+    'speechiness': 'float64',
+    'acousticness': 'float64',
+    'instrumentalness': 'float64',
+    'liveness': 'float64',
+    'valence': 'float64',
+    'tempo': 'float64',
+    'time_signature': 'int8',
+    'track_genre': 'object',
+    'duration_sec': 'float64',
+}
+
+# 대량 적재 중에만 사용하는 PRAGMA (빌드 실패 시 DB를 다시 만들면 되므로 안전성보다 속도 우선)
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+]
+
+# 적재 완료 후 게시할 파일의 설정
+# 앱은 rename으로 교체된 파일을 읽기만 하므로 WAL이 필요 없고, 교체 후 이전 파일의
+# -wal이 새 파일에 잘못 적용되지 않도록 -wal 파일을 만들지 않는 DELETE 모드로 게시
+SERVING_PRAGMAS = [
+    "PRAGMA locking_mode = NORMAL",
+    "PRAGMA journal_mode = DELETE",
+    "PRAGMA synchronous = NORMAL",
+]
+
+# 증분 갱신 중 사용하는 PRAGMA (임시 복사본이므로 동기화는 생략하되 트랜잭션 롤백은 유지)
+INCREMENTAL_PRAGMAS = [
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+]
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# 트랙-아티스트 연결 테이블 (인덱스는 적재 후 생성)
+TRACK_ARTISTS_DDL = """
+CREATE TABLE track_artists (
+    track_id TEXT NOT NULL,
+    artist_id INTEGER NOT NULL,
+    position INTEGER NOT NULL
+)
+"""
+
+# 아티스트별 집계 컬럼 (컬럼 이름, 선언 타입, 집계식, 필요한 tracks 컬럼)
+ARTIST_AGGREGATES = [
+    ('avg_popularity', 'REAL', 'AVG(t.popularity)', 'popularity'),
+    ('max_popularity', 'INTEGER', 'MAX(t.popularity)', 'popularity'),
+    ('avg_danceability', 'REAL', 'AVG(t.danceability)', 'danceability'),
+    ('avg_energy', 'REAL', 'AVG(t.energy)', 'energy'),
+    ('avg_valence', 'REAL', 'AVG(t.valence)', 'valence'),
+    ('avg_tempo', 'REAL', 'AVG(t.tempo)', 'tempo'),
+]
+
+# 요약 테이블에 누적할 특성 (합계와 NULL이 아닌 값의 개수를 함께 저장해 AVG와 같은 값을 계산)
+SUMMARY_FEATURES = ['popularity', 'danceability', 'energy', 'tempo', 'valence', 'acousticness']
+
+POPULARITY_BUCKET_SQL = """CASE
+        WHEN {row}.popularity >= 80 THEN 1
+        WHEN {row}.popularity >= 60 THEN 2
+        WHEN {row}.popularity >= 40 THEN 3
+        WHEN {row}.popularity >= 20 THEN 4
+        ELSE 5
+    END"""
+
+POPULARITY_RANGES = {
+    1: 'Very High (80-100)',
+    2: 'High (60-79)',
+    3: 'Medium (40-59)',
+    4: 'Low (20-39)',
+    5: 'Very Low (0-19)',
+}
+
+# (요약 테이블, 키 컬럼, 키 선언 타입, 키 식, 필요한 tracks 컬럼)
+SUMMARY_TABLES = [
+    ('genre_summary', 'track_genre', 'TEXT', '{row}.track_genre', 'track_genre'),
+    ('popularity_summary', 'bucket', 'INTEGER', POPULARITY_BUCKET_SQL, 'popularity'),
+]
+
+# 요약 테이블을 읽는 통계 뷰 (뷰, 요약 테이블, 키 컬럼 SELECT 식, 평균을 노출할 특성, 정렬)
+SUMMARY_VIEWS = [
+    ('genre_stats', 'genre_summary', 'track_genre',
+     ['popularity', 'danceability', 'energy', 'tempo', 'valence', 'acousticness'],
+     'track_count DESC'),
+    ('popularity_stats', 'popularity_summary',
+     "CASE bucket " + " ".join(f"WHEN {b} THEN '{label}'" for b, label in POPULARITY_RANGES.items())
+     + " END AS popularity_range",
+     ['danceability', 'energy', 'valence', 'tempo'],
+     'bucket'),
+]
+
+# 오디오 특성 컬럼 저장소 폴더 (DB 파일과 같은 폴더, modules/feature_store.py 참고)
+FEATURE_STORE_DIRNAME = 'feature_store'
+
+# 재구축/증분 갱신 중 작업할 임시 파일 접미사 (완료 후 rename으로 게시)
+TMP_SUFFIX = '.tmp'
+STAGING_TABLE = 'temp.tracks_staging'
+
+
+def sql_type(dtype) -> str:
+    """pandas dtype에 대응하는 SQLite 선언 타입 (df.to_sql과 동일한 규칙)"""
+    kind = pd.api.types.pandas_dtype(dtype).kind
+    if kind in 'iub':
+        return 'INTEGER'
+    if kind == 'f':
+        return 'REAL'
+    return 'TEXT'
+
+
+def explode_artists(track_ids: pd.Series, artists: pd.Series) -> pd.DataFrame:
+    """
+    아티스트 문자열을 (track_id, artist_name, position) 행으로 분리 (벡터화)
+    
+    세미콜론이 있으면 세미콜론으로, 없으면 쉼표로 구분합니다. 빈 이름과
+    한 트랙 안에서 중복된 이름은 제외하고 position은 0부터 다시 매깁니다.
+    
+    Args:
+        track_ids: 트랙 ID 시리즈
+        artists: track_ids와 같은 인덱스의 아티스트 문자열 시리즈
+        
+    Returns:
+        track_id, artist_name, position 컬럼의 DataFrame
+    """
+    artists = artists.dropna().astype(str)
+    normalized = artists.where(artists.str.contains(';', regex=False),
+                               artists.str.replace(',', ';', regex=False))
+    names = normalized.str.split(';').explode().str.strip()
+    
+    pairs = pd.DataFrame({
+        'track_id': track_ids.loc[names.index].to_numpy(),
+        'artist_name': names.to_numpy(),
+    })
+    pairs = pairs[pairs['artist_name'] != ''].drop_duplicates(['track_id', 'artist_name'])
+    pairs['position'] = pairs.groupby('track_id', sort=False).cumcount()
+    return pairs
+
+
+def assign_artist_ids(names: pd.Series, artist_ids: dict) -> pd.Series:
+    """
+    아티스트 이름을 ID로 변환하고 처음 보는 이름에는 다음 번호를 부여
+    
+    Args:
+        names: 아티스트 이름 시리즈
+        artist_ids: {이름: ID} 딕셔너리 (새 이름이 추가됨)
+        
+    Returns:
+        names와 같은 인덱스의 ID 시리즈
+    """
+    new_names = pd.unique(names[~names.isin(list(artist_ids))])
+    next_id = max(artist_ids.values(), default=0) + 1
+    artist_ids.update(zip(new_names, range(next_id, next_id + len(new_names))))
+    return names.map(artist_ids)
+
+
+def insert_track_artists(conn: sqlite3.Connection, track_ids: pd.Series, artists: pd.Series,
+                         artist_ids: dict) -> int:
+    """
+    트랙의 아티스트 목록을 track_artists 테이블에 삽입
+    
+    Args:
+        conn: 데이터베이스 연결
+        track_ids: 트랙 ID 시리즈
+        artists: track_ids와 같은 인덱스의 아티스트 문자열 시리즈
+        artist_ids: {이름: ID} 딕셔너리 (새 아티스트가 추가됨)
+        
+    Returns:
+        삽입한 행에 등장한 아티스트 ID 집합
+    """
+    pairs = explode_artists(track_ids, artists)
+    ids = assign_artist_ids(pairs['artist_name'], artist_ids)
+    conn.executemany(
+        "INSERT INTO track_artists (track_id, artist_id, position) VALUES (?, ?, ?)",
+        zip(pairs['track_id'].tolist(), ids.tolist(), pairs['position'].tolist())
+    )
+    return set(ids.tolist())
+
+
+def read_source_columns(csv_path: str, columns: list, chunksize: int = DEFAULT_CHUNK_SIZE):
+    """
+    CSV에서 필요한 컬럼만 고정 dtype으로 청크 단위로 읽기
     
     Args:
         csv_path: 전처리된 CSV 파일 경로
-        db_path: 생성할 데이터베이스 파일 경로
+        columns: 읽을 컬럼 목록
+        chunksize: 한 번에 읽을 행 수
+        
+    Returns:
+        DataFrame 청크 이터레이터
     """
-    print("데이터 로딩 중...")
-    df = pd.read_csv(csv_path)
+    dtypes = {col: TRACKS_DTYPES[col] for col in columns if col in TRACKS_DTYPES}
+    return pd.read_csv(csv_path, usecols=columns, dtype=dtypes, chunksize=chunksize)
+
+
+def derive_dimension(csv_path: str, column: str, chunksize: int = DEFAULT_CHUNK_SIZE) -> list:
+    """
+    차원 테이블에 넣을 고유 이름 목록 계산 (빌드 그래프의 작업자 프로세스에서 실행)
     
-    print(f"데이터 크기: {df.shape}")
-    print(f"컬럼: {df.columns.tolist()}")
+    Args:
+        csv_path: 전처리된 CSV 파일 경로
+        column: 이름 컬럼 (track_genre, album_name 등)
+        chunksize: 한 번에 읽을 행 수
+        
+    Returns:
+        처음 등장한 순서대로의 고유 이름 목록
+    """
+    names = {}
+    for chunk in read_source_columns(csv_path, [column], chunksize):
+        names.update(dict.fromkeys(chunk[column].dropna().unique()))
+    return list(names)
+
+
+def derive_artist_links(csv_path: str, chunksize: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """
+    트랙-아티스트 연결 행과 아티스트 ID 계산 (빌드 그래프의 작업자 프로세스에서 실행)
     
-    # 데이터베이스 연결
-    print(f"\n데이터베이스 생성 중: {db_path}")
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    청크 순서대로 처리하므로 아티스트 ID는 CSV에 처음 등장한 순서로 부여됩니다.
     
-    # 기존 DB 파일이 있으면 삭제
-    if os.path.exists(db_path):
-        os.remove(db_path)
-        print("기존 데이터베이스 삭제됨")
+    Args:
+        csv_path: 전처리된 CSV 파일 경로
+        chunksize: 한 번에 읽을 행 수
+        
+    Returns:
+        {'links': track_id/artist_id/position DataFrame, 'artist_ids': {이름: ID}}
+    """
+    artist_ids = {}
+    frames = []
+    for chunk in read_source_columns(csv_path, ['track_id', 'artists'], chunksize):
+        pairs = explode_artists(chunk['track_id'], chunk['artists'])
+        frames.append(pd.DataFrame({
+            'track_id': pairs['track_id'].to_numpy(),
+            'artist_id': assign_artist_ids(pairs['artist_name'], artist_ids).to_numpy(),
+            'position': pairs['position'].to_numpy(),
+        }))
+    links = pd.concat(frames, ignore_index=True) if frames else \
+        pd.DataFrame(columns=['track_id', 'artist_id', 'position'])
+    return {'links': links, 'artist_ids': artist_ids}
+
+
+def ingest_tracks(conn: sqlite3.Connection, csv_path: str,
+                  chunksize: int = DEFAULT_CHUNK_SIZE, table: str = 'tracks') -> dict:
+    """
+    CSV를 청크 단위로 읽어 tracks(또는 지정한) 테이블에 적재
+    
+    청크마다 executemany로 삽입하고 전체 적재를 하나의 명시적 트랜잭션으로
+    묶습니다. 메모리 사용량은 전체 행 수가 아니라 청크 크기에 비례합니다.
+    
+    Args:
+        conn: 데이터베이스 연결
+        csv_path: 전처리된 CSV 파일 경로
+        chunksize: 한 번에 읽을 행 수
+        table: 적재할 테이블 이름 (증분 갱신 시 스테이징 테이블)
+        
+    Returns:
+        적재 결과 딕셔너리 (columns, rows)
+    """
+    # 고정 dtype 맵에 없는 컬럼은 앞부분 표본으로 선언 타입만 결정
+    sample = pd.read_csv(csv_path, nrows=1000)
+    header = sample.columns.tolist()
+    dtypes = {col: TRACKS_DTYPES[col] for col in header if col in TRACKS_DTYPES}
+    
+    reader = pd.read_csv(csv_path, dtype=dtypes, chunksize=chunksize)
+    
+    columns_sql = ", ".join(
+        f'"{col}" {sql_type(dtypes.get(col, sample[col].dtype))}' for col in header
+    )
+    placeholders = ", ".join("?" for _ in header)
     
-    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(f"CREATE TABLE {table} ({columns_sql})")
+    insert_sql = f"INSERT INTO {table} VALUES ({placeholders})"
+    
+    total_rows = 0
+    start = time.perf_counter()
+    
+    cursor.execute("BEGIN")
+    for chunk in reader:
+        # 열 단위 tolist()로 NumPy 스칼라 대신 파이썬 기본 타입을 만들어 바인딩 (NaN -> NULL)
+        rows = zip(*(chunk[col].tolist() for col in header))
+        cursor.executemany(insert_sql, rows)
+        total_rows += len(chunk)
+        
+        elapsed = time.perf_counter() - start
+        print(f"  {total_rows:,}행 적재 ({total_rows / max(elapsed, 1e-9):,.0f}행/초)")
+    cursor.execute("COMMIT")
+    
+    elapsed = time.perf_counter() - start
+    print(f"{table} 적재 완료: {total_rows:,}행, {elapsed:.2f}초 "
+          f"({total_rows / max(elapsed, 1e-9):,.0f}행/초)")
     
-    # 1. tracks 테이블 생성 (메인 테이블)
-    print("\ntracks 테이블 생성 중...")
-    df.to_sql('tracks', conn, if_exists='replace', index=False)
+    return {'columns': header, 'rows': total_rows}
+
+
+def create_track_indexes(conn: sqlite3.Connection, columns: list):
+    """
+    tracks 테이블 인덱스 생성 (적재 후 한 번에 정렬해서 만드는 것이 행마다 갱신하는 것보다 빠름)
     
-    # 인덱스 생성 (성능 향상)
-    print("인덱스 생성 중...")
+    Args:
+        conn: 데이터베이스 연결
+        columns: tracks 테이블 컬럼 목록
+    """
+    cursor = conn.cursor()
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_track_id ON tracks(track_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_artists ON tracks(artists)")
     
-    if 'track_genre' in df.columns:
+    if 'track_genre' in columns:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_genre ON tracks(track_genre)")
     
-    if 'popularity' in df.columns:
+    if 'popularity' in columns:
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_popularity ON tracks(popularity)")
+
+
+def create_track_artists_table(conn: sqlite3.Connection, links: pd.DataFrame) -> int:
+    """
+    derive_artist_links()가 계산한 연결 행으로 track_artists 테이블과 인덱스 생성
     
-    conn.commit()
+    Args:
+        conn: 데이터베이스 연결
+        links: track_id, artist_id, position 컬럼의 DataFrame
+        
+    Returns:
+        삽입한 행 수
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    cursor.execute("DROP TABLE IF EXISTS track_artists")
+    cursor.execute(TRACK_ARTISTS_DDL)
+    cursor.executemany(
+        "INSERT INTO track_artists (track_id, artist_id, position) VALUES (?, ?, ?)",
+        zip(links['track_id'].tolist(), links['artist_id'].tolist(), links['position'].tolist())
+    )
+    cursor.execute("COMMIT")
     
-    # 2. genres 테이블 생성 (정규화)
-    if 'track_genre' in df.columns:
-        print("\ngenres 테이블 생성 중...")
-        genres_df = df[['track_genre']].drop_duplicates().reset_index(drop=True)
-        genres_df.columns = ['genre_name']
-        genres_df.insert(0, 'genre_id', range(1, len(genres_df) + 1))
-        genres_df.to_sql('genres', conn, if_exists='replace', index=False)
-        print(f"총 {len(genres_df)}개 장르")
-    
-    # 3. artists 테이블 생성 (간단한 버전)
-    print("\nartists 테이블 생성 중...")
-    # 아티스트는 세미콜론으로 구분되어 있을 수 있음
-    all_artists = []
-    for artists_str in df['artists'].dropna().unique():
-        # 세미콜론이나 쉼표로 구분된 경우 처리
-        if ';' in str(artists_str):
-            artist_list = [a.strip() for a in str(artists_str).split(';')]
-        elif ',' in str(artists_str):
-            artist_list = [a.strip() for a in str(artists_str).split(',')]
-        else:
-            artist_list = [str(artists_str).strip()]
-        
-        all_artists.extend(artist_list)
-    
-    unique_artists = sorted(set(all_artists))
-    artists_df = pd.DataFrame({
-        'artist_id': range(1, len(unique_artists) + 1),
-        'artist_name': unique_artists
-    })
-    artists_df.to_sql('artists', conn, if_exists='replace', index=False)
-    print(f"총 {len(artists_df)}개 아티스트")
-    
-    # 4. albums 테이블 생성
-    if 'album_name' in df.columns:
-        print("\nalbums 테이블 생성 중...")
-        albums_df = df[['album_name']].drop_duplicates().reset_index(drop=True)
-        albums_df.columns = ['album_name']
-        albums_df.insert(0, 'album_id', range(1, len(albums_df) + 1))
-        albums_df.to_sql('albums', conn, if_exists='replace', index=False)
-        print(f"총 {len(albums_df)}개 앨범")
-    
-    # 5. 통계 뷰 생성
-    print("\n통계 뷰 생성 중...")
-    
-    # 장르별 통계 뷰
-    if 'track_genre' in df.columns:
-        cursor.execute("""
-        CREATE VIEW IF NOT EXISTS genre_stats AS
-        SELECT 
-            track_genre,
-            COUNT(*) as track_count,
-            AVG(popularity) as avg_popularity,
-            AVG(danceability) as avg_danceability,
-            AVG(energy) as avg_energy,
-            AVG(tempo) as avg_tempo,
-            AVG(valence) as avg_valence
-        FROM tracks
-        GROUP BY track_genre
-        ORDER BY track_count DESC
-        """)
+    # 아티스트 -> 트랙, 트랙 -> 아티스트 조회 모두 인덱스로 처리
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_track_artists_track "
+                   "ON track_artists(track_id, position)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_track_artists_artist "
+                   "ON track_artists(artist_id, track_id)")
+    return len(links)
+
+
+def create_dimension_table(conn: sqlite3.Connection, table: str, id_col: str,
+                           name_col: str, names: list):
+    """
+    (id, 이름) 형태의 차원 테이블 생성
     
-    # 인기도별 통계 뷰
-    if 'popularity' in df.columns:
-        cursor.execute("""
-        CREATE VIEW IF NOT EXISTS popularity_stats AS
-        SELECT 
-            CASE 
-                WHEN popularity >= 80 THEN 'Very High (80-100)'
-                WHEN popularity >= 60 THEN 'High (60-79)'
-                WHEN popularity >= 40 THEN 'Medium (40-59)'
-                WHEN popularity >= 20 THEN 'Low (20-39)'
-                ELSE 'Very Low (0-19)'
-            END as popularity_range,
-            COUNT(*) as track_count,
-            AVG(danceability) as avg_danceability,
-            AVG(energy) as avg_energy
+    Args:
+        conn: 데이터베이스 연결
+        table: 테이블 이름
+        id_col: ID 컬럼 이름
+        name_col: 이름 컬럼 이름
+        names: 등록할 이름 목록 (순서대로 1부터 ID 부여)
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(f"CREATE TABLE {table} ({id_col} INTEGER, {name_col} TEXT)")
+    cursor.executemany(
+        f"INSERT INTO {table} VALUES (?, ?)",
+        enumerate(names, start=1)
+    )
+    cursor.execute("COMMIT")
+
+
+def create_artist_table(conn: sqlite3.Connection, artist_ids: dict, columns: list):
+    """
+    아티스트 차원 테이블 생성 및 아티스트별 집계 계산
+    
+    Args:
+        conn: 데이터베이스 연결 (track_artists가 채워진 상태)
+        artist_ids: {이름: ID} 딕셔너리
+        columns: tracks 테이블 컬럼 목록
+    """
+    aggregates = [agg for agg in ARTIST_AGGREGATES if agg[3] in columns]
+    aggregate_sql = "".join(f", {name} {col_type}" for name, col_type, _, _ in aggregates)
+    
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    cursor.execute("DROP TABLE IF EXISTS artists")
+    cursor.execute(f"""
+    CREATE TABLE artists (
+        artist_id INTEGER PRIMARY KEY,
+        artist_name TEXT NOT NULL,
+        track_count INTEGER NOT NULL DEFAULT 0{aggregate_sql}
+    )
+    """)
+    cursor.executemany(
+        "INSERT INTO artists (artist_id, artist_name) VALUES (?, ?)",
+        ((artist_id, name) for name, artist_id in artist_ids.items())
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_artist_name ON artists(artist_name)")
+    refresh_artist_stats(conn, columns)
+    cursor.execute("COMMIT")
+
+
+def refresh_artist_stats(conn: sqlite3.Connection, columns: list,
+                         artist_ids: Optional[list] = None):
+    """
+    track_artists 조인으로 아티스트별 집계 컬럼 재계산 (호출하는 쪽 트랜잭션 안에서 실행)
+    
+    Args:
+        conn: 데이터베이스 연결
+        columns: tracks 테이블 컬럼 목록
+        artist_ids: 재계산할 아티스트 ID 목록 (None이면 전체)
+    """
+    aggregates = [agg for agg in ARTIST_AGGREGATES if agg[3] in columns]
+    targets = ", ".join(['track_count'] + [name for name, _, _, _ in aggregates])
+    exprs = ", ".join(['COUNT(*)'] + [expr for _, _, expr, _ in aggregates])
+    sql = f"""
+    UPDATE artists SET ({targets}) = (
+        SELECT {exprs}
+        FROM track_artists ta
+        JOIN tracks t ON t.track_id = ta.track_id
+        WHERE ta.artist_id = artists.artist_id
+    )
+    """
+    if artist_ids is None:
+        conn.execute(sql)
+    else:
+        conn.executemany(sql + " WHERE artist_id = ?", ((artist_id,) for artist_id in artist_ids))
+
+
+def create_search_index(conn: sqlite3.Connection, columns: list) -> bool:
+    """
+    tracks의 이름 컬럼으로 FTS5 검색 테이블 생성
+    
+    검색 테이블의 rowid는 tracks의 rowid와 같으므로 `tracks_fts.rowid = tracks.rowid`로
+    조인합니다.
+    
+    Args:
+        conn: 데이터베이스 연결
+        columns: tracks 테이블 컬럼 목록
+        
+    Returns:
+        생성 여부 (SQLite에 FTS5가 없으면 False)
+    """
+    fts_columns = [col for col in FTS_COLUMNS if col in columns]
+    column_sql = ", ".join(fts_columns)
+    
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    try:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"track_id UNINDEXED, {column_sql}, {FTS_OPTIONS})"
+        )
+    except sqlite3.OperationalError as e:
+        cursor.execute("ROLLBACK")
+        print(f"경고: FTS5 검색 테이블을 만들 수 없습니다 ({e})")
+        return False
+    
+    cursor.execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, track_id, {column_sql}) "
+        f"SELECT rowid, track_id, {column_sql} FROM tracks"
+    )
+    cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    cursor.execute("COMMIT")
+    return True
+
+
+def summary_delta_sql(table: str, key_col: str, key_expr: str, features: list,
+                      row: str, sign: int) -> list:
+    """
+    트랙 한 행을 요약 테이블에 더하거나(sign=1) 빼는(sign=-1) SQL 문 목록
+    
+    Args:
+        table: 요약 테이블 이름
+        key_col: 키 컬럼 이름
+        key_expr: 키 식 ({row} 자리에 행 이름이 들어감)
+        features: 누적할 특성 컬럼 목록
+        row: 트리거의 행 이름 (NEW 또는 OLD)
+        sign: 1이면 더하고 -1이면 뺌
+        
+    Returns:
+        순서대로 실행할 SQL 문 목록
+    """
+    key = key_expr.format(row=row)
+    op = '+' if sign > 0 else '-'
+    
+    assignments = [f"track_count = track_count {op} 1"]
+    for feature in features:
+        assignments.append(f"{feature}_sum = {feature}_sum {op} COALESCE({row}.{feature}, 0)")
+        assignments.append(f"{feature}_count = {feature}_count {op} ({row}.{feature} IS NOT NULL)")
+    
+    statements = []
+    if sign > 0:
+        statements.append(f"INSERT OR IGNORE INTO {table} ({key_col}) VALUES ({key})")
+    statements.append(f"UPDATE {table} SET {', '.join(assignments)} WHERE {key_col} = {key}")
+    if sign < 0:
+        statements.append(f"DELETE FROM {table} WHERE {key_col} = {key} AND track_count <= 0")
+    return statements
+
+
+def create_summary_tables(conn: sqlite3.Connection, columns: list) -> list:
+    """
+    장르/인기도 구간별 누적 합계 요약 테이블, 유지 트리거, 통계 뷰 생성
+    
+    요약 테이블은 키별 트랙 수와 특성별 합계/개수를 저장하고, tracks에 대한
+    INSERT/DELETE/UPDATE 트리거가 변경된 행만큼 값을 더하고 뺍니다. genre_stats,
+    popularity_stats 뷰는 요약 테이블의 몇 행만 읽어 평균을 계산합니다.
+    
+    Args:
+        conn: 데이터베이스 연결 (tracks 적재가 끝난 상태)
+        columns: tracks 테이블 컬럼 목록
+        
+    Returns:
+        생성한 요약 테이블 이름 목록
+    """
+    features = [feature for feature in SUMMARY_FEATURES if feature in columns]
+    created = []
+    
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    for table, key_col, key_type, key_expr, required in SUMMARY_TABLES:
+        if required not in columns:
+            continue
+        
+        feature_cols = "".join(
+            f", {feature}_sum REAL NOT NULL DEFAULT 0, {feature}_count INTEGER NOT NULL DEFAULT 0"
+            for feature in features
+        )
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"""
+        CREATE TABLE {table} (
+            {key_col} {key_type} PRIMARY KEY,
+            track_count INTEGER NOT NULL DEFAULT 0{feature_cols}
+        )
+        """)
+        
+        # 초기값은 적재된 tracks에서 한 번에 집계
+        key = key_expr.format(row='tracks')
+        aggregates = "".join(f", TOTAL({feature}), COUNT({feature})" for feature in features)
+        cursor.execute(f"""
+        INSERT INTO {table}
+        SELECT {key}, COUNT(*){aggregates}
         FROM tracks
-        GROUP BY popularity_range
-        ORDER BY 
-            CASE 
-                WHEN popularity >= 80 THEN 1
-                WHEN popularity >= 60 THEN 2
-                WHEN popularity >= 40 THEN 3
-                WHEN popularity >= 20 THEN 4
-                ELSE 5
+        WHERE {key} IS NOT NULL
+        GROUP BY 1
+        """)
+        
+        # 이후 변경은 트리거로 반영 (OLD 빼기 -> NEW 더하기)
+        triggers = [
+            ('insert', 'AFTER INSERT', [('NEW', 1)]),
+            ('delete', 'AFTER DELETE', [('OLD', -1)]),
+            ('update_old', 'AFTER UPDATE', [('OLD', -1)]),
+            ('update_new', 'AFTER UPDATE', [('NEW', 1)]),
+        ]
+        for suffix, event, deltas in triggers:
+            body = []
+            for row, sign in deltas:
+                body.extend(summary_delta_sql(table, key_col, key_expr, features, row, sign))
+            row = deltas[0][0]
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{suffix}")
+            cursor.execute(f"""
+            CREATE TRIGGER trg_{table}_{suffix} {event} ON tracks
+            WHEN ({key_expr.format(row=row)}) IS NOT NULL
+            BEGIN
+                {'; '.join(body)};
             END
+            """)
+        created.append(table)
+    
+    for view, table, key_select, view_features, order in SUMMARY_VIEWS:
+        cursor.execute(f"DROP VIEW IF EXISTS {view}")
+        if table not in created:
+            continue
+        averages = "".join(
+            f",\n            {feature}_sum / NULLIF({feature}_count, 0) AS avg_{feature}"
+            for feature in view_features if feature in features
+        )
+        cursor.execute(f"""
+        CREATE VIEW {view} AS
+        SELECT
+            {key_select},
+            track_count{averages}
+        FROM {table}
+        WHERE track_count > 0
+        ORDER BY {order}
         """)
+    cursor.execute("COMMIT")
     
-    conn.commit()
+    return created
+
+
+def apply_advised_indexes(conn: sqlite3.Connection, path: str) -> list:
+    """
+    인덱스 추천 도구가 채택한 인덱스 생성
+    
+    테이블이나 컬럼이 더 이상 없는 항목은 건너뜁니다.
+    
+    Args:
+        conn: 데이터베이스 연결
+        path: 채택 인덱스 JSON 파일 경로
+        
+    Returns:
+        생성한(이미 있던 것 포함) 인덱스 이름 목록
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    
+    created = []
+    for entry in entries:
+        existing = {name for name, _ in table_columns(conn, entry['table'])}
+        if not existing or not set(entry['columns']) <= existing:
+            print(f"  건너뜀: {entry['name']} (테이블/컬럼 없음)")
+            continue
+        cols = ", ".join(f'"{col}"' for col in entry['columns'])
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{entry["name"]}" ON "{entry["table"]}" ({cols})')
+        created.append(entry['name'])
+    return created
+
+
+def optimize_database(conn: sqlite3.Connection):
+    """계획기가 인덱스 선택에 쓸 통계(sqlite_stat1) 수집"""
+    start = time.perf_counter()
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+    print(f"ANALYZE 완료: {time.perf_counter() - start:.2f}초")
+
+
+def export_feature_store(db_path: str):
+    """
+    게시된 DB의 tracks 테이블로 오디오 특성 컬럼 저장소 생성
+    
+    저장소에는 DB 파일 식별 정보가 기록되므로, 내보내기가 끝나기 전까지 앱은
+    새 DB와 맞지 않는 저장소 대신 SQL 조회를 사용합니다.
+    
+    Args:
+        db_path: 게시된 데이터베이스 파일 경로
+    """
+    start = time.perf_counter()
+    store_dir = os.path.join(os.path.dirname(db_path), FEATURE_STORE_DIRNAME)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        manifest = write_feature_store(conn, store_dir, file_identity(db_path))
+    finally:
+        conn.close()
+    print(f"특성 컬럼 저장소 생성: {store_dir} "
+          f"({manifest['rows']:,}행 x {len(manifest['features'])}개 특성, "
+          f"{time.perf_counter() - start:.2f}초)")
+
+
+def remove_database_files(path: str):
+    """DB 파일과 저널/WAL/공유 메모리 파일 삭제"""
+    for suffix in ('', '-journal', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def publish_database(tmp_path: str, db_path: str):
+    """
+    완성된 임시 DB 파일로 기존 DB를 원자적으로 교체
+    
+    rename은 원자적이므로 앱은 항상 이전 파일이나 새 파일 중 하나만 보게 되고,
+    이미 열린 연결은 교체 후에도 이전 파일을 끝까지 읽습니다.
+    
+    Args:
+        tmp_path: 게시할 임시 DB 파일 경로 (연결이 닫힌 상태여야 함)
+        db_path: 교체할 DB 파일 경로
+    """
+    with open(tmp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    
+    # 이전 DB의 -wal/-shm이 남아 있으면 새 파일을 열 때 잘못 적용되므로 먼저 삭제
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    
+    os.replace(tmp_path, db_path)
+    
+    # rename 자체가 디스크에 반영되도록 디렉토리도 동기화 (지원하지 않는 플랫폼은 생략)
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(db_path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+    print(f"데이터베이스 게시 완료: {db_path}")
+
+
+class StepResult:
+    """빌드 단계 인자 자리에 다른 단계의 결과(또는 결과 딕셔너리의 키)를 넘길 때 쓰는 표시"""
+    
+    def __init__(self, step: str, key: Optional[str] = None):
+        """
+        Args:
+            step: 결과를 가져올 단계 이름
+            key: 결과가 딕셔너리일 때 꺼낼 키
+        """
+        self.step = step
+        self.key = key
+    
+    def resolve(self, results: dict):
+        value = results[self.step]
+        return value if self.key is None else value[self.key]
+
+
+class BuildStep:
+    """
+    빌드 의존성 그래프의 한 단계
+    
+    writer 단계는 주 프로세스의 단일 쓰기 연결로 func(conn, *args)를 실행하고,
+    나머지 단계는 작업자 프로세스에서 func(*args)를 실행합니다 (CSV만 읽는 계산용).
+    """
+    
+    def __init__(self, name: str, func, args: tuple = (), after: tuple = (),
+                 writer: bool = False):
+        """
+        Args:
+            name: 단계 이름
+            func: 실행할 함수 (작업자 단계는 모듈 최상위 함수여야 함)
+            args: 인자 목록 (StepResult는 해당 단계 결과로 바뀜)
+            after: 결과를 쓰지 않지만 먼저 끝나야 하는 단계 이름
+            writer: DB에 쓰는 단계 여부
+        """
+        self.name = name
+        self.func = func
+        self.args = args
+        self.writer = writer
+        self.deps = set(after) | {arg.step for arg in args if isinstance(arg, StepResult)}
+    
+    def resolve_args(self, results: dict) -> tuple:
+        return tuple(arg.resolve(results) if isinstance(arg, StepResult) else arg
+                     for arg in self.args)
+
+
+def _timed_call(func, args: tuple):
+    """작업자 프로세스에서 함수를 실행하고 (결과, 소요 시간) 반환"""
+    start = time.perf_counter()
+    return func(*args), time.perf_counter() - start
+
+
+def run_build_graph(conn: sqlite3.Connection, steps: list,
+                    workers: Optional[int] = None) -> tuple:
+    """
+    빌드 단계를 의존성 순서대로 실행
+    
+    의존성이 풀린 계산 단계는 즉시 프로세스 풀에 넘기고, 그동안 주 프로세스는
+    준비된 쓰기 단계를 목록 순서대로 하나씩 실행합니다. SQLite 쓰기는 한 연결로만
+    이루어지므로 잠금 경합이 없습니다.
+    
+    Args:
+        conn: 쓰기 연결
+        steps: BuildStep 목록 (쓰기 단계는 목록 순서가 우선순위)
+        workers: 작업자 프로세스 수 (None이면 CPU 수, 0이면 주 프로세스에서 차례로 실행)
+        
+    Returns:
+        ({단계 이름: 결과}, 단계별 소요 시간 목록)
+    """
+    names = {step.name for step in steps}
+    for step in steps:
+        missing = step.deps - names
+        if missing:
+            raise Exception(f"빌드 단계 '{step.name}'의 선행 단계가 없습니다: {sorted(missing)}")
+    
+    pending = list(steps)
+    results = {}
+    timings = []
+    graph_start = time.perf_counter()
+    
+    def finish(step: BuildStep, kind: str, started: float, result, elapsed: float):
+        results[step.name] = result
+        timings.append({'step': step.name, 'kind': kind, 'start': started - graph_start,
+                        'elapsed': elapsed})
+        print(f"  [{kind}] {step.name}: {elapsed:.2f}초")
+    
+    def run_inline(step: BuildStep, kind: str):
+        started = time.perf_counter()
+        args = step.resolve_args(results)
+        result = step.func(conn, *args) if step.writer else step.func(*args)
+        finish(step, kind, started, result, time.perf_counter() - started)
+    
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 0 else None
+    futures = {}
+    try:
+        while pending or futures:
+            ready = [step for step in pending if step.deps <= results.keys()]
+            
+            # 계산 단계는 바로 작업자에게 넘김
+            for step in ready:
+                if step.writer:
+                    continue
+                pending.remove(step)
+                if pool is None:
+                    run_inline(step, 'worker')
+                else:
+                    future = pool.submit(_timed_call, step.func, step.resolve_args(results))
+                    futures[future] = (step, time.perf_counter())
+            
+            # 끝난 계산 단계 결과 수집 (쓰기 단계가 실행 중이어도 작업자는 계속 진행)
+            for future in [f for f in futures if f.done()]:
+                step, started = futures.pop(future)
+                result, elapsed = future.result()
+                finish(step, 'worker', started, result, elapsed)
+            
+            writer_ready = [step for step in pending
+                            if step.writer and step.deps <= results.keys()]
+            if writer_ready:
+                pending.remove(writer_ready[0])
+                run_inline(writer_ready[0], 'writer')
+            elif futures:
+                wait(list(futures), return_when=FIRST_COMPLETED)
+            elif pending and not any(step.deps <= results.keys() for step in pending):
+                raise Exception(f"실행할 수 없는 빌드 단계: {[step.name for step in pending]}")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    
+    return results, timings
+
+
+def print_stage_timings(timings: list, total: float):
+    """단계별 시작 시점/소요 시간과 전체 대비 비율 출력"""
+    print("\n단계별 소요 시간:")
+    print(f"  {'단계':<18}{'실행 위치':<8}{'시작':>6}{'소요':>7}{'비율':>5}")
+    for timing in sorted(timings, key=lambda t: t['start']):
+        print(f"  {timing['step']:<20}{timing['kind']:<12}{timing['start']:>7.2f}s"
+              f"{timing['elapsed']:>8.2f}s{timing['elapsed'] / max(total, 1e-9):>7.0%}")
+    serial = sum(timing['elapsed'] for timing in timings)
+    print(f"  전체 {total:.2f}초 (단계 합계 {serial:.2f}초, 병렬 실행으로 {max(serial - total, 0):.2f}초 절약)")
+
+
+def create_database(csv_path: str, db_path: str, chunksize: int = DEFAULT_CHUNK_SIZE,
+                    workers: Optional[int] = None):
+    """
+    전처리된 CSV 파일로부터 SQLite 데이터베이스 생성
+    
+    CSV만 읽으면 되는 파생 계산(장르/앨범 목록, 트랙-아티스트 연결)은 작업자
+    프로세스에서 tracks 적재와 동시에 진행하고, 테이블 생성은 단일 쓰기 연결이
+    의존성 순서대로 처리합니다.
+    
+    Args:
+        csv_path: 전처리된 CSV 파일 경로
+        db_path: 생성할 데이터베이스 파일 경로
+        chunksize: CSV를 읽고 삽입할 청크 크기 (행)
+        workers: 파생 계산용 작업자 프로세스 수 (None이면 CPU 수, 0이면 순차 실행)
+    """
+    # 데이터베이스 연결 (기존 DB는 게시 시점까지 그대로 두고 임시 파일에 생성)
+    print(f"데이터베이스 생성 중: {db_path}")
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    start = time.perf_counter()
+    
+    tmp_path = db_path + TMP_SUFFIX
+    remove_database_files(tmp_path)
+    
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    cursor = conn.cursor()
+    for pragma in BULK_LOAD_PRAGMAS:
+        cursor.execute(pragma)
+    
+    columns = pd.read_csv(csv_path, nrows=0).columns.tolist()
+    print(f"컬럼: {columns}")
+    advised_path = os.path.join(os.path.dirname(db_path), ADVISED_INDEXES_FILENAME)
+    
+    steps = [
+        # 작업자 프로세스: CSV에서 파생 데이터 계산
+        BuildStep('artist_links', derive_artist_links, (csv_path, chunksize)),
+        # 쓰기 연결: tracks 적재(메인 테이블, 청크 단위 스트리밍)와 인덱스
+        BuildStep('tracks', ingest_tracks, (csv_path, chunksize), writer=True),
+        BuildStep('track_indexes', create_track_indexes, (columns,), after=('tracks',), writer=True),
+        BuildStep('track_artists', create_track_artists_table,
+                  (StepResult('artist_links', 'links'),), writer=True),
+        BuildStep('artists', create_artist_table,
+                  (StepResult('artist_links', 'artist_ids'), columns),
+                  after=('tracks', 'track_artists'), writer=True),
+    ]
+    # 장르/앨범 차원 테이블 (정규화)
+    dimensions = [('track_genre', 'genres', 'genre_id', 'genre_name'),
+                  ('album_name', 'albums', 'album_id', 'album_name')]
+    for column, table, id_col, name_col in dimensions:
+        if column in columns:
+            steps.append(BuildStep(f'{name_col}s', derive_dimension, (csv_path, column, chunksize)))
+            steps.append(BuildStep(table, create_dimension_table,
+                                   (table, id_col, name_col, StepResult(f'{name_col}s')),
+                                   writer=True))
+    table_steps = [step.name for step in steps if step.writer]
+    steps += [
+        # 이름 전문 검색 인덱스
+        BuildStep('search_index', create_search_index, (columns,), after=('tracks',), writer=True),
+        # 장르/인기도 구간 요약 테이블과 통계 뷰 (이후 tracks 변경은 트리거가 반영)
+        BuildStep('summary_tables', create_summary_tables, (columns,), after=('tracks',),
+                  writer=True),
+        # 추천 인덱스 재생성 및 계획기 통계 수집
+        BuildStep('advised_indexes', apply_advised_indexes, (advised_path,),
+                  after=tuple(table_steps), writer=True),
+        BuildStep('analyze', optimize_database, after=('advised_indexes', 'search_index',
+                                                       'summary_tables'), writer=True),
+        # 테이블별 행 수 메타데이터 기록 (앱이 COUNT(*) 스캔 없이 사용)
+        BuildStep('table_stats', write_table_stats, after=('analyze',), writer=True),
+    ]
+    
+    print("\n빌드 단계 실행 중...")
+    results, timings = run_build_graph(conn, steps, workers)
+    table_counts = results['table_stats']
+    
+    # 서비스용 저널 모드로 전환
+    for pragma in SERVING_PRAGMAS:
+        cursor.execute(pragma)
+    
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='view'")
+    views = cursor.fetchall()
+    conn.close()
+    
+    # 완성된 파일로 기존 DB를 원자적으로 교체
+    publish_database(tmp_path, db_path)
+    export_feature_store(db_path)
+    
+    print_stage_timings(timings, time.perf_counter() - start)
     
     # 데이터베이스 정보 출력
     print("\n=== 데이터베이스 생성 완료 ===")
     print(f"파일 경로: {db_path}")
     print(f"파일 크기: {os.path.getsize(db_path) / (1024*1024):.2f} MB")
+    if results['advised_indexes']:
+        print(f"추천 인덱스 {len(results['advised_indexes'])}개 생성: {results['advised_indexes']}")
+    if results.get('search_index'):
+        print(f"검색 인덱스: {FTS_TABLE}")
+    print(f"요약 테이블: {results['summary_tables']}")
     
     # 테이블 목록
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-    tables = cursor.fetchall()
-    print(f"\n생성된 테이블: {[t[0] for t in tables]}")
+    print(f"\n생성된 테이블: {list(table_counts)}")
     
     # 각 테이블의 행 수
     print("\n테이블별 행 수:")
-    for table in tables:
-        cursor.execute(f"SELECT COUNT(*) FROM {table[0]}")
-        count = cursor.fetchone()[0]
-        print(f"  - {table[0]}: {count:,}개")
+    for table, count in table_counts.items():
+        print(f"  - {table}: {count:,}개")
     
     # 뷰 목록
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='view'")
-    views = cursor.fetchall()
     if views:
         print(f"\n생성된 뷰: {[v[0] for v in views]}")
     
-    conn.close()
     print("\n데이터베이스 생성이 완료되었습니다!")
 
 
+def table_columns(conn: sqlite3.Connection, table: str) -> list:
+    """테이블의 (컬럼 이름, 선언 타입) 목록"""
+    schema, _, name = table.rpartition('.')
+    prefix = f"{schema}." if schema else ""
+    return [(row[1], row[2]) for row in conn.execute(f'PRAGMA {prefix}table_info("{name}")')]
+
+
+def refresh_dimension_table(conn: sqlite3.Connection, table: str, id_col: str,
+                            name_col: str, affected: list, present: set) -> tuple:
+    """
+    영향받은 이름에 대해서만 차원 테이블 갱신 (호출하는 쪽 트랜잭션 안에서 실행)
+    
+    더 이상 tracks에 없는 이름은 삭제하고, 새로 등장한 이름은 기존 최대 ID 다음
+    번호로 추가합니다. 기존 행의 ID는 바뀌지 않습니다.
+    
+    Args:
+        conn: 데이터베이스 연결
+        table: 테이블 이름
+        id_col: ID 컬럼 이름
+        name_col: 이름 컬럼 이름
+        affected: 변경된 트랙의 이전/새 값에 등장한 이름 목록
+        present: 갱신 후 tracks에 존재하는 이름 집합
+        
+    Returns:
+        (추가된 수, 삭제된 수)
+    """
+    cursor = conn.cursor()
+    existing = {row[0] for row in cursor.execute(f"SELECT {name_col} FROM {table}")}
+    
+    removed = [name for name in affected if name in existing and name not in present]
+    added = [name for name in affected if name not in existing and name in present]
+    
+    cursor.executemany(f"DELETE FROM {table} WHERE {name_col} = ?", ((name,) for name in removed))
+    next_id = cursor.execute(f"SELECT COALESCE(MAX({id_col}), 0) + 1 FROM {table}").fetchone()[0]
+    cursor.executemany(f"INSERT INTO {table} VALUES (?, ?)", enumerate(added, start=next_id))
+    
+    return len(added), len(removed)
+
+
+def update_database(csv_path: str, db_path: str, chunksize: int = DEFAULT_CHUNK_SIZE,
+                    workers: Optional[int] = None):
+    """
+    기존 데이터베이스와 새 CSV를 track_id로 비교해 변경분만 반영
+    
+    기존 DB를 임시 파일로 복사한 뒤 삽입/수정/삭제를 하나의 트랜잭션으로 적용하고,
+    파생 테이블은 변경된 트랙에 등장한 장르/앨범/아티스트만 갱신합니다. 장르/인기도
+    요약 테이블은 tracks에 걸린 트리거가 삭제/삽입된 행만큼 갱신합니다. 완료된
+    파일은 rename으로 게시하므로 실행 중인 앱은 중단 없이 새 데이터를 읽게 됩니다.
+    기존 DB가 없거나 tracks 스키마가 달라졌으면 전체 재구축합니다.
+    
+    Args:
+        csv_path: 전처리된 CSV 파일 경로
+        db_path: 갱신할 데이터베이스 파일 경로
+        chunksize: CSV를 읽고 삽입할 청크 크기 (행)
+        workers: 전체 재구축으로 넘어갈 때 사용할 작업자 프로세스 수
+    """
+    if not os.path.exists(db_path):
+        print("기존 데이터베이스가 없어 전체 재구축합니다.")
+        create_database(csv_path, db_path, chunksize, workers)
+        return
+    
+    print(f"데이터베이스 증분 갱신 중: {db_path}")
+    start = time.perf_counter()
+    
+    # 앱이 읽고 있는 파일은 건드리지 않고 복사본에서 작업
+    tmp_path = db_path + TMP_SUFFIX
+    remove_database_files(tmp_path)
+    
+    source = sqlite3.connect(db_path)
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    try:
+        source.backup(conn)
+    finally:
+        source.close()
+    
+    cursor = conn.cursor()
+    for pragma in INCREMENTAL_PRAGMAS:
+        cursor.execute(pragma)
+    
+    # 1. 새 CSV를 임시 스테이징 테이블에 적재
+    print("\n스테이징 테이블 적재 중...")
+    loaded = ingest_tracks(conn, csv_path, chunksize, table=STAGING_TABLE)
+    columns = loaded['columns']
+    
+    if table_columns(conn, 'tracks') != table_columns(conn, STAGING_TABLE) or \
+            not table_columns(conn, 'track_artists') or not table_columns(conn, FTS_TABLE) or \
+            any(not table_columns(conn, table) for table, _, _, _, required in SUMMARY_TABLES
+                if required in columns):
+        print("스키마가 변경되어 전체 재구축합니다.")
+        conn.close()
+        remove_database_files(tmp_path)
+        create_database(csv_path, db_path, chunksize, workers)
+        return
+    
+    cursor.execute("CREATE INDEX temp.idx_staging_track_id ON tracks_staging(track_id)")
+    
+    # 2. 변경분 계산 및 적용 (하나의 트랜잭션)
+    print("\n변경분 계산 중...")
+    changed = " OR ".join(
+        f's."{col}" IS NOT t."{col}"' for col in columns if col != 'track_id'
+    ) or "0"
+    
+    cursor.execute("BEGIN")
+    cursor.execute("CREATE TEMP TABLE track_changes (track_id TEXT PRIMARY KEY, op TEXT NOT NULL)")
+    cursor.execute("""
+    INSERT INTO track_changes
+    SELECT t.track_id, 'delete' FROM tracks t
+    WHERE NOT EXISTS (SELECT 1 FROM tracks_staging s WHERE s.track_id = t.track_id)
+    """)
+    cursor.execute("""
+    INSERT INTO track_changes
+    SELECT s.track_id, 'insert' FROM tracks_staging s
+    WHERE NOT EXISTS (SELECT 1 FROM tracks t WHERE t.track_id = s.track_id)
+    """)
+    cursor.execute(f"""
+    INSERT INTO track_changes
+    SELECT s.track_id, 'update' FROM tracks_staging s
+    JOIN tracks t ON t.track_id = s.track_id
+    WHERE {changed}
+    """)
+    
+    counts = dict.fromkeys(('insert', 'update', 'delete'), 0)
+    counts.update(cursor.execute("SELECT op, COUNT(*) FROM track_changes GROUP BY op").fetchall())
+    print(f"삽입 {counts['insert']:,}행, 수정 {counts['update']:,}행, 삭제 {counts['delete']:,}행")
+    
+    # 파생 테이블에서 다시 확인할 키 (변경된 트랙의 이전 값과 새 값)
+    key_cols = [col for col in ('track_genre', 'album_name') if col in columns]
+    select_keys = ", ".join(f'x."{col}"' for col in key_cols)
+    affected = {col: {} for col in key_cols}
+    for source_table, ops in (('tracks', "('delete', 'update')"),
+                              ('tracks_staging', "('insert', 'update')")):
+        cursor.execute(f"""
+        SELECT {select_keys} FROM {source_table} x
+        JOIN track_changes c ON c.track_id = x.track_id
+        WHERE c.op IN {ops}
+        """)
+        for row in cursor.fetchall():
+            for col, value in zip(key_cols, row):
+                if value is not None:
+                    affected[col][value] = None
+    
+    fts_columns = ", ".join(col for col in FTS_COLUMNS if col in columns)
+    cursor.execute(f"""
+    DELETE FROM {FTS_TABLE}
+    WHERE rowid IN (
+        SELECT t.rowid FROM tracks t
+        JOIN track_changes c ON c.track_id = t.track_id
+        WHERE c.op IN ('delete', 'update')
+    )
+    """)
+    
+    affected_artists = {row[0] for row in cursor.execute("""
+    SELECT DISTINCT ta.artist_id FROM track_artists ta
+    JOIN track_changes c ON c.track_id = ta.track_id
+    WHERE c.op IN ('delete', 'update')
+    """)}
+    
+    cursor.execute("""
+    DELETE FROM tracks
+    WHERE track_id IN (SELECT track_id FROM track_changes WHERE op IN ('delete', 'update'))
+    """)
+    cursor.execute("""
+    DELETE FROM track_artists
+    WHERE track_id IN (SELECT track_id FROM track_changes WHERE op IN ('delete', 'update'))
+    """)
+    cursor.execute("""
+    INSERT INTO tracks
+    SELECT * FROM tracks_staging
+    WHERE track_id IN (SELECT track_id FROM track_changes WHERE op IN ('insert', 'update'))
+    """)
+    cursor.execute(f"""
+    INSERT INTO {FTS_TABLE} (rowid, track_id, {fts_columns})
+    SELECT t.rowid, t.track_id, {fts_columns} FROM tracks t
+    JOIN track_changes c ON c.track_id = t.track_id
+    WHERE c.op IN ('insert', 'update')
+    """)
+    
+    # 3. 영향받은 키만 차원 테이블 갱신
+    if 'track_genre' in columns and affected['track_genre']:
+        present = {row[0] for row in cursor.execute("SELECT DISTINCT track_genre FROM tracks")}
+        added, removed = refresh_dimension_table(
+            conn, 'genres', 'genre_id', 'genre_name', list(affected['track_genre']), present
+        )
+        print(f"genres: {added}개 추가, {removed}개 삭제")
+    
+    if 'album_name' in columns and affected['album_name']:
+        present = {row[0] for row in cursor.execute("SELECT DISTINCT album_name FROM tracks")}
+        added, removed = refresh_dimension_table(
+            conn, 'albums', 'album_id', 'album_name', list(affected['album_name']), present
+        )
+        print(f"albums: {added}개 추가, {removed}개 삭제")
+    
+    # 아티스트: 변경된 트랙의 연결을 다시 만들고 관련 아티스트만 추가/삭제/재집계
+    artist_ids = dict(cursor.execute("SELECT artist_name, artist_id FROM artists").fetchall())
+    known_ids = set(artist_ids.values())
+    changed_tracks = pd.read_sql_query("""
+    SELECT s.track_id, s.artists FROM tracks_staging s
+    JOIN track_changes c ON c.track_id = s.track_id
+    WHERE c.op IN ('insert', 'update')
+    """, conn)
+    affected_artists |= insert_track_artists(
+        conn, changed_tracks['track_id'], changed_tracks['artists'], artist_ids
+    )
+    
+    new_artists = [(artist_id, name) for name, artist_id in artist_ids.items()
+                   if artist_id not in known_ids]
+    cursor.executemany("INSERT INTO artists (artist_id, artist_name) VALUES (?, ?)", new_artists)
+    
+    orphaned = [artist_id for artist_id in affected_artists if artist_id in known_ids and
+                cursor.execute("SELECT 1 FROM track_artists WHERE artist_id = ? LIMIT 1",
+                               (artist_id,)).fetchone() is None]
+    cursor.executemany("DELETE FROM artists WHERE artist_id = ?", ((a,) for a in orphaned))
+    
+    refresh_artist_stats(conn, columns, sorted(affected_artists - set(orphaned)))
+    print(f"artists: {len(new_artists)}개 추가, {len(orphaned)}개 삭제, "
+          f"{len(affected_artists)}개 재집계")
+    
+    cursor.execute("COMMIT")
+    cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    cursor.execute("DROP TABLE track_changes")
+    cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+    
+    # 4. 계획기/테이블 통계 갱신 후 게시
+    optimize_database(conn)
+    table_counts = write_table_stats(conn)
+    for pragma in SERVING_PRAGMAS:
+        cursor.execute(pragma)
+    conn.close()
+    
+    publish_database(tmp_path, db_path)
+    export_feature_store(db_path)
+    
+    print("\n=== 증분 갱신 완료 ===")
+    print(f"소요 시간: {time.perf_counter() - start:.2f}초")
+    print("\n테이블별 행 수:")
+    for table, count in table_counts.items():
+        print(f"  - {table}: {count:,}개")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="전처리된 CSV로 SQLite 데이터베이스 구축")
+    parser.add_argument("--incremental", action="store_true",
+                        help="기존 DB와 비교해 변경된 트랙만 반영")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"CSV를 읽고 삽입할 청크 크기 (기본 {DEFAULT_CHUNK_SIZE:,}행)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="파생 데이터 계산용 작업자 프로세스 수 (기본 CPU 수, 0이면 순차 실행)")
+    args = parser.parse_args()
+    
     # 경로 설정
     project_root = Path(__file__).parent.parent
     csv_file = project_root / "data" / "processed" / "spotify_cleaned.csv"
@@ -177,6 +1298,7 @@ if __name__ == "__main__":
         print(f"오류: {csv_file} 파일을 찾을 수 없습니다.")
         print("\n먼저 데이터 전처리를 실행하세요:")
         print("python scripts/preprocess_data.py")
+    elif args.incremental:
+        update_database(str(csv_file), str(db_file), args.chunksize, args.workers)
     else:
-        create_database(str(csv_file), str(db_file))
-
+        create_database(str(csv_file), str(db_file), args.chunksize, args.workers)
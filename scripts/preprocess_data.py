@@ -1,19 +1,204 @@
 """
 Spotify 데이터셋 전처리 스크립트
 """
+import argparse
+import numpy as np
 import pandas as pd
 import os
+import sys
+import time
 from pathlib import Path
+from typing import Optional
 
+sys.path.append(str(Path(__file__).parent.parent))
 
-def preprocess_spotify_data(input_path: str, output_path: str):
+from modules.cleaning_rules import RuleSet, rejected_path
+
+
+# 청크 모드에서 사용할 원본 CSV dtype (특성은 float32, 정수는 결측치를 담을 수 있는 nullable 타입)
+RAW_DTYPES = {
+    'Unnamed: 0': 'Int32',
+    'track_id': 'object',
+    'artists': 'object',
+    'album_name': 'object',
+    'track_name': 'object',
+    'popularity': 'Int16',
+    'duration_ms': 'Int32',
+    'explicit': 'boolean',
+    'danceability': 'float32',
+    'energy': 'float32',
+    'key': 'Int8',
+    'loudness': 'float32',
+    'mode': 'Int8',
+    'speechiness': 'float32',
+    'acousticness': 'float32',
+    'instrumentalness': 'float32',
+    'liveness': 'float32',
+    'valence': 'float32',
+    'tempo': 'float32',
+    'time_signature': 'Int8',
+    'track_genre': 'category',
+}
+
+# float32 값을 원래 표기대로 되돌리는 CSV 출력 형식 (float32 유효 자릿수)
+FLOAT32_FORMAT = '%.7g'
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+class CompactHashSet:
+    """
+    값의 64비트 해시만 저장하는 개방 주소법 집합 (NumPy 배열, 원소당 16~32바이트)
+    
+    파이썬 set에 문자열을 넣는 것보다 메모리가 훨씬 적게 들고 청크 단위로 한 번에
+    삽입할 수 있습니다. 서로 다른 값의 해시가 같을 확률(약 n²/2⁶⁵)은 무시합니다.
+    """
+    
+    def __init__(self, capacity: int = 1 << 16):
+        """
+        Args:
+            capacity: 초기 슬롯 수 (2의 거듭제곱으로 올림)
+        """
+        self.table = np.zeros(1 << max(int(capacity - 1).bit_length(), 4), dtype=np.uint64)
+        self.size = 0
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def _insert(self, keys: np.ndarray) -> np.ndarray:
+        """서로 다른 해시 배열을 선형 탐사로 삽입하고 새로 추가된 원소 마스크 반환"""
+        mask = np.uint64(len(self.table) - 1)
+        slots = (keys & mask).astype(np.int64)
+        added = np.zeros(len(keys), dtype=bool)
+        active = np.arange(len(keys))
+        while active.size:
+            current = self.table[slots[active]]
+            found = current == keys[active]
+            empty = current == 0
+            done = found
+            if empty.any():
+                # 같은 빈 슬롯을 노리는 키가 여럿이면 첫 번째만 차지하고 나머지는 다음 슬롯으로
+                candidates = active[empty]
+                _, first = np.unique(slots[candidates], return_index=True)
+                winners = candidates[first]
+                self.table[slots[winners]] = keys[winners]
+                added[winners] = True
+                self.size += len(winners)
+                done = found | np.isin(active, winners)
+            active = active[~done]
+            slots[active] = (slots[active] + 1) & (len(self.table) - 1)
+        return added
+    
+    def _reserve(self, extra: int):
+        """적재율이 1/2을 넘지 않도록 테이블 확장"""
+        if (self.size + extra) * 2 <= len(self.table):
+            return
+        capacity = len(self.table)
+        while (self.size + extra) * 2 > capacity:
+            capacity *= 2
+        old = self.table[self.table != 0]
+        self.table = np.zeros(capacity, dtype=np.uint64)
+        self.size = 0
+        self._insert(old)
+    
+    def add(self, values: pd.Series) -> np.ndarray:
+        """
+        값을 삽입하고 처음 보는 값인지 여부 반환
+    
+        Args:
+            values: 삽입할 값 시리즈
+    
+        Returns:
+            values와 같은 길이의 bool 배열 (이전 청크와 같은 청크 앞쪽에 없던 값만 True)
+        """
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(np.uint64, copy=True)
+        hashes[hashes == 0] = 1   # 0은 빈 슬롯 표시
+        unique, first = np.unique(hashes, return_index=True)
+        self._reserve(len(unique))
+        result = np.zeros(len(hashes), dtype=bool)
+        result[first[self._insert(unique)]] = True
+        return result
+
+
+def _sortable_keys(values: np.ndarray) -> np.ndarray:
+    """float32 값을 크기 순서가 같은 uint32 키로 변환"""
+    bits = values.astype(np.float32).view(np.uint32)
+    flip = np.where(bits >> np.uint32(31), np.uint32(0xFFFFFFFF), np.uint32(0x80000000))
+    return bits ^ flip
+
+
+def _key_to_value(key: int) -> float:
+    """_sortable_keys의 역변환"""
+    bits = key ^ 0x80000000 if key & 0x80000000 else ~key & 0xFFFFFFFF
+    return float(np.array([bits], dtype=np.uint32).view(np.float32)[0])
+
+
+class RadixMedian:
+    """
+    float32 값의 정확한 중앙값을 고정 메모리로 구하는 2단계 기수 히스토그램
+    
+    1차 패스에서 키 상위 16비트 히스토그램으로 중앙값이 들어 있는 구간을 찾고,
+    2차 패스에서 그 구간의 하위 16비트 히스토그램으로 정확한 값을 찾습니다.
+    메모리는 입력 크기와 무관하게 컬럼당 히스토그램 몇 개(65536칸)뿐입니다.
+    """
+    
+    BINS = 1 << 16
+    
+    def __init__(self):
+        self.high = np.zeros(self.BINS, dtype=np.int64)
+        self.low = {}
+        self.count = 0
+    
+    def add_high(self, values: np.ndarray):
+        """1차 패스: 결측치를 제외한 값을 상위 비트 히스토그램에 추가"""
+        keys = _sortable_keys(values)
+        self.high += np.bincount(keys >> np.uint32(16), minlength=self.BINS)
+        self.count += len(keys)
+    
+    def _ranks(self) -> list:
+        """중앙값을 이루는 순위 (짝수 개면 가운데 두 값)"""
+        return sorted({(self.count - 1) // 2, self.count // 2})
+    
+    def target_bins(self) -> set:
+        """중앙값 순위가 들어 있는 상위 비트 구간"""
+        cumulative = np.cumsum(self.high)
+        return {int(np.searchsorted(cumulative, rank, side='right')) for rank in self._ranks()}
+    
+    def add_low(self, values: np.ndarray):
+        """2차 패스: 중앙값 구간에 속한 값을 하위 비트 히스토그램에 추가"""
+        keys = _sortable_keys(values)
+        high = keys >> np.uint32(16)
+        for bin_index in self.target_bins():
+            selected = keys[high == bin_index] & np.uint32(0xFFFF)
+            histogram = self.low.setdefault(bin_index, np.zeros(self.BINS, dtype=np.int64))
+            histogram += np.bincount(selected, minlength=self.BINS)
+    
+    def median(self) -> Optional[float]:
+        """중앙값 (값이 없으면 None)"""
+        if self.count == 0:
+            return None
+        cumulative = np.cumsum(self.high)
+        values = []
+        for rank in (((self.count - 1) // 2), self.count // 2):
+            bin_index = int(np.searchsorted(cumulative, rank, side='right'))
+            offset = rank - (cumulative[bin_index - 1] if bin_index else 0)
+            low_index = int(np.searchsorted(np.cumsum(self.low[bin_index]), offset, side='right'))
+            values.append(_key_to_value((bin_index << 16) | low_index))
+        return (values[0] + values[1]) / 2
+
+
+def preprocess_spotify_data(input_path: str, output_path: str,
+                            rules: Optional[RuleSet] = None):
     """
     Spotify 데이터셋 전처리
     
     Args:
         input_path: 원본 CSV 파일 경로
         output_path: 전처리된 CSV 파일 저장 경로
+        rules: 정제 규칙 (None이면 기본 규칙). 제외된 행은 rejected_path(output_path)에 저장
     """
+    rules = rules or RuleSet.load()
+    
     print("데이터 로딩 중...")
     df = pd.read_csv(input_path)
     
@@ -31,15 +216,13 @@ def preprocess_spotify_data(input_path: str, output_path: str):
     missing = df.isnull().sum()
     print(missing[missing > 0])
     
-    # track_name, artists가 없는 행 제거
-    df = df.dropna(subset=['track_name', 'artists'])
-    
-    # 숫자형 컬럼의 결측치는 중앙값으로 대체
+    # 숫자형 컬럼의 결측치는 필수 컬럼 규칙을 통과한 행의 중앙값으로 대체 (필수 컬럼은 대체하지 않음)
+    required = rules.required_mask(df)
     numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
-    for col in numeric_cols:
-        if df[col].isnull().sum() > 0:
-            median_val = df[col].median()
-            df[col].fillna(median_val, inplace=True)
+    for col in numeric_cols.difference(rules.required_columns, sort=False):
+        if df.loc[required, col].isnull().sum() > 0:
+            median_val = df.loc[required, col].median()
+            df[col] = df[col].fillna(median_val)
             print(f"{col}: 결측치를 중앙값({median_val})으로 대체")
     
     # 3. 데이터 타입 최적화
@@ -49,19 +232,10 @@ def preprocess_spotify_data(input_path: str, output_path: str):
     if 'duration_ms' in df.columns:
         df['duration_sec'] = (df['duration_ms'] / 1000).round(2)
     
-    # 4. 이상치 제거 (선택적)
-    print("\n이상치 확인...")
-    
-    # popularity는 0-100 범위
-    if 'popularity' in df.columns:
-        df = df[(df['popularity'] >= 0) & (df['popularity'] <= 100)]
-    
-    # 음악 특성은 0-1 범위 (일부 예외 있음)
-    feature_cols = ['danceability', 'energy', 'speechiness', 'acousticness', 
-                   'instrumentalness', 'liveness', 'valence']
-    for col in feature_cols:
-        if col in df.columns:
-            df = df[(df[col] >= 0) & (df[col] <= 1)]
+    # 4. 정제 규칙 적용 (모든 규칙을 하나의 비트마스크로 평가해 한 번만 필터링)
+    print("\n정제 규칙 적용 중...")
+    df, rejected = rules.split(df)
+    rules.print_report()
     
     # 5. 인덱스 리셋
     df = df.reset_index(drop=True)
@@ -72,6 +246,8 @@ def preprocess_spotify_data(input_path: str, output_path: str):
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     df.to_csv(output_path, index=False)
     print(f"저장 완료: {output_path}")
+    rejected.to_csv(rejected_path(output_path), index=False)
+    print(f"제외 행 저장: {rejected_path(output_path)} ({len(rejected):,}행)")
     
     # 기본 통계
     print("\n=== 기본 통계 ===")
@@ -85,7 +261,161 @@ def preprocess_spotify_data(input_path: str, output_path: str):
     return df
 
 
+def _iter_clean_chunks(input_path: str, chunksize: int, rules: RuleSet):
+    """
+    중복(이전 청크 포함)을 제거한 청크 이터레이터
+    
+    Yields:
+        (중복 제거 직후 청크, 필수 컬럼 규칙까지 통과한 청크)
+    """
+    header = pd.read_csv(input_path, nrows=0).columns
+    dtypes = {col: dtype for col, dtype in RAW_DTYPES.items() if col in header}
+    seen = CompactHashSet()
+    for chunk in pd.read_csv(input_path, dtype=dtypes, chunksize=chunksize):
+        chunk = chunk[seen.add(chunk['track_id'])]
+        yield chunk, chunk[rules.required_mask(chunk)]
+
+
+def preprocess_spotify_data_chunked(input_path: str, output_path: str,
+                                    chunksize: int = DEFAULT_CHUNK_SIZE,
+                                    rules: Optional[RuleSet] = None) -> dict:
+    """
+    Spotify 데이터셋 청크 단위 전처리 (입력 크기와 무관하게 메모리 사용량 고정)
+    
+    preprocess_spotify_data와 같은 규칙을 적용하되 원본을 청크로 여러 번 읽습니다.
+    1차 패스에서 결측치 수와 중앙값 구간을 구하고, 숫자 컬럼에 결측치가 있으면
+    2차 패스에서 정확한 중앙값을 찾은 뒤, 마지막 패스에서 정제한 청크를 바로
+    파일에 이어 씁니다. 청크 간 중복은 track_id 해시 집합으로 판별하므로 메모리는
+    청크 크기와 고유 track_id 수(ID당 16~32바이트)에만 비례합니다.
+    
+    Args:
+        input_path: 원본 CSV 파일 경로
+        output_path: 전처리된 CSV 파일 저장 경로
+        chunksize: 한 번에 읽을 행 수
+        rules: 정제 규칙 (None이면 기본 규칙). 제외된 행은 rejected_path(output_path)에 저장
+    
+    Returns:
+        전처리 결과 통계 딕셔너리
+    """
+    rules = rules or RuleSet.load()
+    print(f"청크 단위 전처리 중: {input_path} (청크 {chunksize:,}행)")
+    start = time.perf_counter()
+    
+    # 1차 패스: 행 수, 결측치 수, 숫자 컬럼 중앙값 구간
+    raw_rows = 0
+    kept_rows = 0
+    missing = None
+    required_missing = None
+    medians = {}
+    for raw_chunk, chunk in _iter_clean_chunks(input_path, chunksize, rules):
+        if missing is None:
+            numeric_cols = chunk.select_dtypes(include='number').columns.difference(
+                rules.required_columns, sort=False)
+            medians = {col: RadixMedian() for col in numeric_cols}
+            missing = pd.Series(0, index=raw_chunk.columns)
+            required_missing = pd.Series(0, index=numeric_cols)
+        raw_rows += len(raw_chunk)
+        kept_rows += len(chunk)
+        missing += raw_chunk.isnull().sum()
+        required_missing += chunk[list(medians)].isnull().sum()
+        for col, median in medians.items():
+            median.add_high(chunk[col].dropna().to_numpy(np.float32))
+    
+    if missing is None:
+        raise Exception(f"원본 데이터가 비어 있습니다: {input_path}")
+    print(f"1차 패스 완료: 중복 제거 후 {raw_rows:,}행, 필수 컬럼 규칙 통과 {kept_rows:,}행")
+    print("\n결측치 확인...")
+    print(missing[missing > 0])
+    
+    # 2차 패스 (결측치가 있는 숫자 컬럼만): 중앙값 구간 안의 정확한 값
+    fill_cols = [col for col in medians if required_missing[col] > 0]
+    if fill_cols:
+        for _, chunk in _iter_clean_chunks(input_path, chunksize, rules):
+            for col in fill_cols:
+                medians[col].add_low(chunk[col].dropna().to_numpy(np.float32))
+    fill_values = {}
+    for col in fill_cols:
+        value = medians[col].median()
+        if value is not None:
+            fill_values[col] = value
+            print(f"{col}: 결측치를 중앙값({value})으로 대체")
+    
+    # 마지막 패스: 결측치 대체, 파생 컬럼, 정제 규칙 적용 후 임시 파일에 이어 쓰기
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = output_path + '.tmp'
+    rejected_file = rejected_path(output_path)
+    rejected_tmp_path = rejected_file + '.tmp'
+    artists = CompactHashSet()
+    genres = CompactHashSet()
+    albums = CompactHashSet()
+    total_rows = 0
+    columns = None
+    
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f, \
+            open(rejected_tmp_path, 'w', encoding='utf-8', newline='') as rejected_f:
+        for chunk, _ in _iter_clean_chunks(input_path, chunksize, rules):
+            for col, value in fill_values.items():
+                # 정수 컬럼의 중앙값이 소수이면 원본 방식과 같이 실수 컬럼으로 대체
+                if pd.api.types.is_integer_dtype(chunk[col]) and not float(value).is_integer():
+                    chunk[col] = chunk[col].astype('float32')
+                chunk[col] = chunk[col].fillna(value)
+            if 'duration_ms' in chunk.columns:
+                chunk['duration_sec'] = (chunk['duration_ms'].astype('float64') / 1000).round(2)
+            chunk, rejected = rules.split(chunk)
+    
+            chunk.to_csv(f, index=False, header=columns is None, float_format=FLOAT32_FORMAT)
+            rejected.to_csv(rejected_f, index=False, header=columns is None,
+                            float_format=FLOAT32_FORMAT)
+            columns = chunk.columns.tolist()
+            total_rows += len(chunk)
+            artists.add(chunk['artists'].dropna())
+            if 'track_genre' in chunk.columns:
+                genres.add(chunk['track_genre'].dropna().astype(str))
+            if 'album_name' in chunk.columns:
+                albums.add(chunk['album_name'].dropna())
+            print(f"  {total_rows:,}행 기록")
+        for handle in (f, rejected_f):
+            handle.flush()
+            os.fsync(handle.fileno())
+    os.replace(tmp_path, output_path)
+    os.replace(rejected_tmp_path, rejected_file)
+    rules.print_report()
+    
+    elapsed = time.perf_counter() - start
+    print(f"\n전처리 완료! 최종 데이터 크기: ({total_rows}, {len(columns)}) ({elapsed:.2f}초)")
+    print(f"저장 완료: {output_path}")
+    print(f"제외 행 저장: {rejected_file} ({rules.rejected:,}행)")
+    
+    # 기본 통계
+    print("\n=== 기본 통계 ===")
+    print(f"총 트랙 수: {total_rows:,}")
+    print(f"고유 아티스트 수: {len(artists):,}")
+    if 'track_genre' in columns:
+        print(f"고유 장르 수: {len(genres):,}")
+    if 'album_name' in columns:
+        print(f"고유 앨범 수: {len(albums):,}")
+    
+    return {
+        'rows': total_rows,
+        'columns': columns,
+        'medians': fill_values,
+        'rejected': rules.rejected,
+        'artists': len(artists),
+        'genres': len(genres),
+        'albums': len(albums),
+    }
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spotify 데이터셋 전처리")
+    parser.add_argument("--chunked", action="store_true",
+                        help="원본을 청크 단위로 처리 (대용량 입력에서 메모리 사용량 고정)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"청크 모드에서 한 번에 읽을 행 수 (기본 {DEFAULT_CHUNK_SIZE:,}행)")
+    parser.add_argument("--rules",
+                        help="정제 규칙 JSON 파일 경로 (기본: modules/cleaning_rules.py의 DEFAULT_RULES)")
+    args = parser.parse_args()
+    
     # 경로 설정
     project_root = Path(__file__).parent.parent
     input_file = project_root / "data" / "raw" / "dataset.csv"
@@ -96,6 +426,8 @@ if __name__ == "__main__":
         print("\nKaggle에서 데이터셋을 다운로드하세요:")
         print("https://www.kaggle.com/datasets/maharshipandya/-spotify-tracks-dataset")
         print(f"\n다운로드한 dataset.csv 파일을 {input_file.parent} 폴더에 저장하세요.")
+    elif args.chunked:
+        preprocess_spotify_data_chunked(str(input_file), str(output_file), args.chunksize,
+                                        RuleSet.load(args.rules))
     else:
-        preprocess_spotify_data(str(input_file), str(output_file))
-
+        preprocess_spotify_data(str(input_file), str(output_file), RuleSet.load(args.rules))
@@ -0,0 +1,359 @@
+"""
+다운로드 확인 → 전처리 → DB 구축 파이프라인 실행 스크립트
+
+각 단계의 입력 파일 내용 해시와 단계 코드/설정 해시로 단계 키를 만들고, 키와
+출력 파일이 매니페스트에 기록된 것과 같으면 해당 단계를 건너뜁니다.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Callable
+
+import pandas as pd
+
+from build_database import (
+    DEFAULT_CHUNK_SIZE, FEATURE_STORE_DIRNAME, create_database, update_database
+)
+from preprocess_data import preprocess_spotify_data
+from modules.cleaning_rules import rejected_path
+from modules.index_advisor import ADVISED_INDEXES_FILENAME
+
+
+# 매니페스트 형식/단계 키 계산 방식이 바뀌면 올려서 모든 단계를 다시 실행
+PIPELINE_VERSION = 1
+
+MANIFEST_FILENAME = 'pipeline_manifest.json'
+
+# 해시 계산 시 한 번에 읽을 크기
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# 원본 데이터셋에 반드시 있어야 하는 컬럼
+REQUIRED_RAW_COLUMNS = ['track_id', 'artists', 'track_name', 'track_genre']
+
+
+class Stage:
+    """파이프라인 단계 (입력/출력 파일, 단계 코드 파일, 설정)"""
+
+    def __init__(self, name: str, run: Callable[[Optional[Dict[str, Any]], Dict[str, Any]], None],
+                 inputs: List[str], outputs: List[str], code: List[str],
+                 config: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            name: 단계 이름
+            run: 실행 함수 (이전 실행 기록(없으면 None)과 현재 단계 키 정보를 받음)
+            inputs: 입력 파일 경로 목록 (프로젝트 루트 기준, 없는 파일은 '없음'으로 해시)
+            outputs: 출력 파일 경로 목록 (프로젝트 루트 기준)
+            code: 결과에 영향을 주는 소스 파일 경로 목록 (프로젝트 루트 기준)
+            config: 결과에 영향을 주는 설정 값
+        """
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs
+        self.code = code
+        self.config = config or {}
+
+
+class Pipeline:
+    """단계 키를 매니페스트와 비교해 필요한 단계만 실행하는 파이프라인"""
+
+    def __init__(self, project_root: Path, manifest_path: Optional[Path] = None):
+        """
+        Args:
+            project_root: 프로젝트 루트 경로
+            manifest_path: 매니페스트 파일 경로 (None이면 data/pipeline_manifest.json)
+        """
+        self.root = project_root
+        self.manifest_path = manifest_path or project_root / "data" / MANIFEST_FILENAME
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        if manifest.get('version') != PIPELINE_VERSION:
+            manifest = {'version': PIPELINE_VERSION, 'stages': {}, 'file_hashes': {}}
+        return manifest
+
+    def _save_manifest(self):
+        """매니페스트를 임시 파일에 쓴 뒤 교체 (중간에 중단돼도 이전 매니페스트 유지)"""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = str(self.manifest_path) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def file_digest(self, rel_path: str) -> Optional[str]:
+        """
+        파일 내용 SHA-256 (크기와 수정 시각이 기록과 같으면 저장된 해시 재사용)
+
+        Args:
+            rel_path: 프로젝트 루트 기준 경로
+
+        Returns:
+            16진수 해시 (파일이 없으면 None)
+        """
+        path = self.root / rel_path
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        cached = self.manifest['file_hashes'].get(rel_path)
+        if cached and cached['size'] == st.st_size and cached['mtime_ns'] == st.st_mtime_ns:
+            return cached['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+        self.manifest['file_hashes'][rel_path] = {
+            'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest.hexdigest()
+        }
+        return digest.hexdigest()
+
+    def stage_key(self, stage: Stage) -> Dict[str, Any]:
+        """단계 입력/코드/설정 해시와 이를 합친 단계 키"""
+        inputs = {path: self.file_digest(path) for path in stage.inputs}
+        code = {path: self.file_digest(path) for path in stage.code}
+        payload = json.dumps({'inputs': inputs, 'code': code, 'config': stage.config},
+                             sort_keys=True)
+        return {
+            'key': hashlib.sha256(payload.encode('utf-8')).hexdigest(),
+            'inputs': inputs,
+            'code': code,
+            'config': stage.config,
+        }
+
+    def is_up_to_date(self, stage: Stage, key: str) -> bool:
+        """단계 키가 같고 출력 파일이 모두 기록된 내용 그대로인지 여부"""
+        record = self.manifest['stages'].get(stage.name)
+        if not record or record['key'] != key:
+            return False
+        return all(self.file_digest(path) == digest and digest is not None
+                   for path, digest in record['outputs'].items())
+
+    def run(self, stages: List[Stage], force: Optional[List[str]] = None,
+            dry_run: bool = False) -> List[Dict[str, Any]]:
+        """
+        단계를 순서대로 확인하고 필요한 단계만 실행
+
+        Args:
+            stages: 실행 순서대로의 단계 목록
+            force: 최신이어도 다시 실행할 단계 이름 목록 ('all'이면 전체)
+            dry_run: 실행하지 않고 실행 여부만 출력
+
+        Returns:
+            단계별 {'stage', 'status', 'elapsed'} 목록 (status: 'skipped', 'ran', 'pending')
+        """
+        force = set(force or [])
+        report = []
+        pending_outputs = set()
+        for stage in stages:
+            start = time.perf_counter()
+            key_info = self.stage_key(stage)
+            previous = self.manifest['stages'].get(stage.name)
+
+            # dry-run에서는 상위 단계가 아직 실행되지 않았으므로 그 출력을 쓰는 단계도 실행 예정
+            upstream = [path for path in stage.inputs if path in pending_outputs]
+            if upstream:
+                print(f"\n[{stage.name}] 실행 예정: 상위 단계 출력 변경 {upstream}")
+                pending_outputs.update(stage.outputs)
+                report.append({'stage': stage.name, 'status': 'pending', 'elapsed': 0.0})
+                continue
+
+            if 'all' not in force and stage.name not in force \
+                    and self.is_up_to_date(stage, key_info['key']):
+                print(f"[{stage.name}] 최신 상태 - 건너뜀 (키 {key_info['key'][:12]})")
+                report.append({'stage': stage.name, 'status': 'skipped',
+                               'elapsed': time.perf_counter() - start})
+                continue
+
+            changed = self._describe_changes(previous, key_info)
+            print(f"\n[{stage.name}] 실행 필요: {changed}")
+            if dry_run:
+                pending_outputs.update(stage.outputs)
+                report.append({'stage': stage.name, 'status': 'pending', 'elapsed': 0.0})
+                continue
+
+            stage.run(previous, key_info)
+            elapsed = time.perf_counter() - start
+            self.manifest['stages'][stage.name] = {
+                **key_info,
+                'outputs': {path: self.file_digest(path) for path in stage.outputs},
+                'completed_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'elapsed': round(elapsed, 3),
+            }
+            self._save_manifest()
+            report.append({'stage': stage.name, 'status': 'ran', 'elapsed': elapsed})
+
+        # 건너뛴 단계만 있어도 파일 해시 캐시는 갱신
+        if not dry_run:
+            self._save_manifest()
+        return report
+
+    @staticmethod
+    def _describe_changes(previous: Optional[Dict[str, Any]], key_info: Dict[str, Any]) -> str:
+        """이전 기록과 달라진 입력/코드/설정 요약"""
+        if not previous:
+            return "이전 실행 기록 없음"
+        changed = [path for group in ('inputs', 'code')
+                   for path, digest in key_info[group].items()
+                   if previous[group].get(path) != digest]
+        if previous['config'] != key_info['config']:
+            changed.append('설정')
+        return f"변경됨 {changed}" if changed else "출력 파일이 없거나 변경됨"
+
+
+def validate_raw_data(raw_path: str):
+    """원본 CSV가 읽히고 필수 컬럼이 있는지 확인"""
+    columns = pd.read_csv(raw_path, nrows=5).columns
+    missing = [col for col in REQUIRED_RAW_COLUMNS if col not in columns]
+    if missing:
+        raise Exception(f"원본 데이터에 필수 컬럼이 없습니다: {missing}")
+    print(f"원본 데이터 확인 완료: {raw_path} ({os.path.getsize(raw_path) / (1024 * 1024):.2f} MB)")
+
+
+def code_dependencies(project_root: Path, script: str) -> List[str]:
+    """
+    스크립트와 스크립트가 (간접적으로) 가져오는 modules/ 파일 목록
+
+    모듈 파일이 바뀌어도 단계가 다시 실행되도록 import 문을 따라가 모읍니다.
+
+    Args:
+        project_root: 프로젝트 루트 경로
+        script: 프로젝트 루트 기준 스크립트 경로
+
+    Returns:
+        프로젝트 루트 기준 경로 목록 (스크립트가 맨 앞, 모듈은 정렬)
+    """
+    found = set()
+    pending = [script]
+    while pending:
+        rel_path = pending.pop()
+        try:
+            tree = ast.parse((project_root / rel_path).read_text(encoding='utf-8'))
+        except (OSError, SyntaxError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module:
+                names = [node.module]
+            elif isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            else:
+                continue
+            for name in names:
+                if name.split('.')[0] != 'modules' or name == 'modules':
+                    continue
+                module_path = name.replace('.', '/') + '.py'
+                if module_path not in found and (project_root / module_path).exists():
+                    found.add(module_path)
+                    pending.append(module_path)
+    return [script] + sorted(found)
+
+
+def build_stages(project_root: Path, chunksize: int = DEFAULT_CHUNK_SIZE,
+                 workers: Optional[int] = None, full_rebuild: bool = False) -> List[Stage]:
+    """
+    다운로드 확인 → 전처리 → DB 구축 단계 목록
+
+    Args:
+        project_root: 프로젝트 루트 경로
+        chunksize: DB 구축 청크 크기 (결과에는 영향 없음)
+        workers: DB 구축 작업자 프로세스 수 (결과에는 영향 없음)
+        full_rebuild: 이전 DB가 있어도 항상 전체 재구축할지 여부
+
+    Returns:
+        Stage 목록
+    """
+    raw_file = "data/raw/dataset.csv"
+    cleaned_file = "data/processed/spotify_cleaned.csv"
+    db_file = "data/spotify.db"
+
+    def run_download(previous, current):
+        validate_raw_data(str(project_root / raw_file))
+
+    def run_preprocess(previous, current):
+        preprocess_spotify_data(str(project_root / raw_file), str(project_root / cleaned_file))
+
+    def run_build(previous, current):
+        # 빌드 코드가 그대로면 바뀐 CSV 행만 반영하는 증분 갱신으로 충분
+        same_code = previous is not None and previous['code'] == current['code']
+        if same_code and not full_rebuild and (project_root / db_file).exists():
+            update_database(str(project_root / cleaned_file), str(project_root / db_file),
+                            chunksize, workers)
+        else:
+            create_database(str(project_root / cleaned_file), str(project_root / db_file),
+                            chunksize, workers)
+
+    return [
+        Stage('download', run_download, inputs=[raw_file], outputs=[raw_file],
+              code=["scripts/run_pipeline.py"]),
+        Stage('preprocess', run_preprocess, inputs=[raw_file],
+              outputs=[cleaned_file, rejected_path(cleaned_file)],
+              code=code_dependencies(project_root, "scripts/preprocess_data.py")),
+        Stage('build', run_build,
+              inputs=[cleaned_file, f"data/{ADVISED_INDEXES_FILENAME}"],
+              outputs=[db_file, f"data/{FEATURE_STORE_DIRNAME}/manifest.json"],
+              code=code_dependencies(project_root, "scripts/build_database.py")),
+    ]
+
+
+def run_pipeline(project_root: Path, force: Optional[List[str]] = None, dry_run: bool = False,
+                 chunksize: int = DEFAULT_CHUNK_SIZE, workers: Optional[int] = None,
+                 full_rebuild: bool = False) -> List[Dict[str, Any]]:
+    """
+    파이프라인 실행
+
+    Args:
+        project_root: 프로젝트 루트 경로
+        force: 최신이어도 다시 실행할 단계 이름 목록 ('all'이면 전체)
+        dry_run: 실행하지 않고 실행 여부만 출력
+        chunksize: DB 구축 청크 크기
+        workers: DB 구축 작업자 프로세스 수
+        full_rebuild: DB를 항상 전체 재구축할지 여부
+
+    Returns:
+        단계별 실행 결과 목록
+    """
+    pipeline = Pipeline(project_root)
+    stages = build_stages(project_root, chunksize, workers, full_rebuild)
+
+    start = time.perf_counter()
+    report = pipeline.run(stages, force=force, dry_run=dry_run)
+
+    print("\n=== 파이프라인 요약 ===")
+    labels = {'skipped': '건너뜀', 'ran': '실행', 'pending': '실행 예정'}
+    for item in report:
+        print(f"  - {item['stage']}: {labels[item['status']]} ({item['elapsed']:.2f}초)")
+    print(f"전체 소요 시간: {time.perf_counter() - start:.2f}초")
+    print(f"매니페스트: {pipeline.manifest_path}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="다운로드 확인 → 전처리 → DB 구축 파이프라인")
+    parser.add_argument("--force", action="append", choices=['download', 'preprocess', 'build', 'all'],
+                        help="최신이어도 다시 실행할 단계 (여러 번 지정 가능)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="실행하지 않고 다시 실행될 단계만 표시")
+    parser.add_argument("--full", action="store_true",
+                        help="DB를 증분 갱신 대신 항상 전체 재구축")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"DB 구축 청크 크기 (기본 {DEFAULT_CHUNK_SIZE:,}행)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="DB 구축 작업자 프로세스 수 (기본 CPU 수)")
+    args = parser.parse_args()
+
+    project_root = Path(__file__).parent.parent
+    if not (project_root / "data" / "raw" / "dataset.csv").exists():
+        print("오류: 원본 데이터가 없습니다. 먼저 다운로드 안내를 확인하세요:")
+        print("python scripts/download_data.py")
+    else:
+        run_pipeline(project_root, args.force, args.dry_run, args.chunksize, args.workers, args.full)